@@ -0,0 +1,489 @@
+"""Micro-benchmarks of the CPU-bound parts of the checks, with regression gates.
+
+Each benchmark runs on synthetic inputs at several sizes. A run writes the
+per call timings as JSON, kept as the baseline for a later comparison, which
+exits 1 when a benchmark is slower than the baseline by more than the
+threshold. Baselines are only comparable on the same machine and Python.
+
+    python benchmarks/bench_checks.py run --output baseline.json
+    python benchmarks/bench_checks.py run --output current.json --filter 'sort_lower*'
+    python benchmarks/bench_checks.py compare baseline.json current.json --threshold 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import copy
+import fnmatch
+import json
+import os
+import platform
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+import timeit
+
+from argparse import Namespace
+from collections.abc import Callable
+from pathlib import Path
+from typing import TypeVar
+
+import tomlkit
+import tomllib
+import yaml
+
+from ansiblelint.yaml_utils import FormattedYAML
+
+from ftf.checks import full_file, pre_commit, py_project
+from ftf.checks.check_base import CheckBase
+from ftf.checks.merge_rules import compile_rules
+from ftf.checks.sort_lower import _lower_word
+from ftf.config import Config
+from ftf.extsort import sort_unique
+from ftf.inventory import Inventory
+from ftf.output import Level, Output, TermFeatures
+from ftf.repo import Repo
+from ftf.report import CheckResult
+from ftf.utils import path_to_data_file
+
+
+#: The format of the results files
+RESULTS_FORMAT = "ftf-benchmarks"
+#: The version of the results files
+RESULTS_VERSION = 1
+
+T = TypeVar("T", bound=CheckBase)
+#: Prepares the inputs of a given size, returning the benchmarked call
+Benchmark = Callable[[int, contextlib.ExitStack], Callable[[], object]]
+
+
+def make_config(tmp_path: Path) -> Config:
+    """Build a configuration for the checks, quiet and without side effects.
+
+    Args:
+        tmp_path: The temporary directory of the run
+
+    Returns:
+        The configuration
+    """
+    args = Namespace(
+        bulk_review=True,
+        dry_run=True,
+        jobs=1,
+        pr_mode="update",
+        repo_timeout=None,
+        shard=None,
+        tag_ttl=0,
+        update_revs=False,
+        verbose=0,
+    )
+    output = Output(
+        log_file="",
+        log_level="notset",
+        log_append="true",
+        term_features=TermFeatures(color=False, links=False),
+        verbosity=0,
+    )
+    return Config(
+        args=args,
+        editor="",
+        inventory=Inventory.from_settings(),
+        output=output,
+        tmp_path=tmp_path,
+    )
+
+
+def start_check(cls: type[T], file_name: str, stack: contextlib.ExitStack) -> T:
+    """Create a check with a current repository, as during a run.
+
+    Args:
+        cls: The check class
+        file_name: The file checked
+        stack: Cleans up after the benchmark
+
+    Returns:
+        The check
+    """
+    tmp_path = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="ftf_bench_")))
+    config = make_config(tmp_path=tmp_path)
+    repo = Repo(config=config, origin="bench/bench", upstream="bench/bench", name="bench")
+    check = cls(file_name=file_name, config=config, repo_list=[repo])
+    check._current_repo = repo
+    check._results[repo.name] = CheckResult(
+        repo=repo.name,
+        check=check.check_name,
+        file=file_name,
+    )
+    return check
+
+
+def pre_commit_files(size: int, seed: int = 0) -> tuple[str, str]:
+    """Generate a base and a repository pre-commit file.
+
+    The repository pins other revs, keeps extra fields, misses some entries
+    and carries entries of its own, so the merge takes the round trip path.
+
+    Args:
+        size: The number of pre-commit repositories
+        seed: The random seed
+
+    Returns:
+        The base and repository file contents
+    """
+    rng = random.Random(seed)  # noqa: S311
+    base_repos = []
+    repo_repos = []
+    for i in range(size):
+        hooks = [
+            {"id": f"hook-{i}-{j}", "args": [f"--option-{k}" for k in range(rng.randint(0, 3))]}
+            for j in range(rng.randint(1, 6))
+        ]
+        base_repos.append({"repo": f"https://github.com/bench/hooks-{i}", "rev": "v1.0.0"})
+        base_repos[-1]["hooks"] = hooks
+        if i % 10 == 9:  # noqa: PLR2004
+            continue
+        repo_hooks = copy.deepcopy(hooks)
+        for hook in repo_hooks:
+            hook["additional_dependencies"] = [f"package-{rng.randrange(100)}"]
+        repo_repos.append(
+            {
+                "repo": f"https://github.com/bench/hooks-{i}",
+                "rev": f"v1.{rng.randrange(10)}.0",
+                "hooks": repo_hooks,
+            },
+        )
+    repo_repos.extend(
+        {"repo": f"https://github.com/bench/local-{i}", "rev": "v0.1.0", "hooks": [{"id": "x"}]}
+        for i in range(size // 10)
+    )
+    return (
+        yaml.safe_dump({"ci": {"autoupdate_schedule": "monthly"}, "repos": base_repos}),
+        yaml.safe_dump({"repos": repo_repos}),
+    )
+
+
+def bench_pre_commit_merge(size: int, stack: contextlib.ExitStack) -> Callable[[], object]:
+    """Merge a repository pre-commit file into the base, as the pre_commit check does.
+
+    Args:
+        size: The number of pre-commit repositories
+        stack: Cleans up after the benchmark
+
+    Returns:
+        The benchmarked call
+    """
+    check = start_check(pre_commit.Check, ".pre-commit-config.yaml", stack)
+    check.base_file_content, repo_content = pre_commit_files(size=size)
+    check.yaml = FormattedYAML()
+    check._base_data = pre_commit.load_yaml(check.base_file_content)  # noqa: SLF001
+    check._keep = pre_commit.KeepRules(rules=check.config.inventory.pre_commit_keep)  # noqa: SLF001
+    return lambda: check._evaluate(repo_file_content=repo_content, skips=frozenset())  # noqa: SLF001
+
+
+def pyproject_files(size: int) -> tuple[str, str]:
+    """Generate a base and a repository pyproject.toml from the template.
+
+    The repository has its own dependencies, per-file ignores and pylint
+    ignores, so the merge takes the round trip path through toml-sort.
+
+    Args:
+        size: The number of entries in each of the grown tables and arrays
+
+    Returns:
+        The base and repository file contents
+    """
+    base = tomlkit.parse(path_to_data_file("pyproject.toml").read_text())
+    repo = copy.deepcopy(base)
+    base["tool"]["ruff"]["lint"]["per-file-ignores"].update(  # type: ignore[index,union-attr]
+        {f"src/base_{i}/**": ["ANN", "D"] for i in range(size)},
+    )
+    repo["project"]["dependencies"] = [f"package-{i}>={i % 7}.0" for i in range(size)]  # type: ignore[index]
+    repo["tool"]["ruff"]["lint"]["per-file-ignores"].update(  # type: ignore[index,union-attr]
+        {f"tests/unit_{i}/**": ["S101"] for i in range(size)},
+    )
+    repo["tool"]["pylint"]["master"]["ignore"] = [  # type: ignore[index]
+        f"module_{i}.py" for i in reversed(range(size))
+    ]
+    return tomlkit.dumps(base), tomlkit.dumps(repo)
+
+
+def bench_py_project_merge(size: int, stack: contextlib.ExitStack) -> Callable[[], object]:
+    """Merge a repository pyproject.toml into the base and sort it with toml-sort.
+
+    Args:
+        size: The number of entries in each of the grown tables and arrays
+        stack: Cleans up after the benchmark
+
+    Returns:
+        The benchmarked call
+    """
+    check = start_check(py_project.Check, "pyproject.toml", stack)
+    check.base_file_content, repo_content = pyproject_files(size=size)
+    check._base_file_data = tomllib.loads(check.base_file_content)  # noqa: SLF001
+    check._plan = compile_rules(check.config.inventory.py_project_rules)  # noqa: SLF001
+    repo = check._current_repo  # noqa: SLF001
+    return lambda: check._evaluate(repo=repo, repo_file_content=repo_content)  # noqa: SLF001
+
+
+def bench_sort_lower(size: int, stack: contextlib.ExitStack) -> Callable[[], object]:
+    """Sort, lowercase and deduplicate a word list, as the sort_lower check does.
+
+    Args:
+        size: The number of lines
+        stack: Cleans up after the benchmark
+
+    Returns:
+        The benchmarked call
+    """
+    work_dir = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix="ftf_bench_")))
+    rng = random.Random(0)  # noqa: S311
+    vocabulary = [
+        "".join(rng.choices(string.ascii_letters, k=rng.randint(3, 14)))
+        for _ in range(max(1, size // 4))
+    ]
+    src = work_dir / "words.txt"
+    dest = work_dir / "sorted.txt"
+    src.write_text(
+        "".join(
+            f"# {word}\n" if i % 97 == 0 else f"{word}\n"
+            for i, word in enumerate(rng.choices(vocabulary, k=size))
+        ),
+    )
+    return lambda: sort_unique(src=src, dest=dest, transform=_lower_word, tmp_dir=work_dir)
+
+
+def bench_compare(size: int, stack: contextlib.ExitStack) -> Callable[[], object]:
+    """Hash and diff the current and desired content of a file, one line in a hundred changed.
+
+    Args:
+        size: The number of lines
+        stack: Cleans up after the benchmark
+
+    Returns:
+        The benchmarked call
+    """
+    check = start_check(full_file.Check, "tox.ini", stack)
+    rng = random.Random(0)  # noqa: S311
+    current = [f"line {i} {rng.randrange(1 << 30):x}" for i in range(size)]
+    desired = [f"{line} changed" if i % 100 == 0 else line for i, line in enumerate(current)]
+    current_text = "\n".join(current) + "\n"
+    desired_text = "\n".join(desired) + "\n"
+
+    def compare_once() -> bool:
+        check._diffs.clear()  # noqa: SLF001
+        return check._compare(current=current_text, desired=desired_text)  # noqa: SLF001
+
+    return compare_once
+
+
+def bench_output_log(size: int, stack: contextlib.ExitStack) -> Callable[[], object]:
+    """Format and print a colored warning, wrapped to the console width.
+
+    Args:
+        size: The number of words in the message
+        stack: Cleans up after the benchmark
+
+    Returns:
+        The benchmarked call
+    """
+    del stack
+    output = Output(
+        log_file="",
+        log_level="notset",
+        log_append="true",
+        term_features=TermFeatures(color=True, links=True),
+        verbosity=1,
+    )
+    rng = random.Random(0)  # noqa: S311
+    message = " ".join(
+        "".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 12))) for _ in range(size)
+    )
+    return lambda: output.log(msg=f"[bench] {message}", level=Level.WARNING)
+
+
+#: The benchmarks, with the sizes each runs at
+BENCHMARKS: dict[str, tuple[Benchmark, tuple[int, ...]]] = {
+    "pre_commit_merge": (bench_pre_commit_merge, (10, 50, 200)),
+    "py_project_merge": (bench_py_project_merge, (10, 100, 1000)),
+    "sort_lower": (bench_sort_lower, (10_000, 100_000, 1_000_000)),
+    "compare": (bench_compare, (1_000, 10_000, 30_000)),
+    "output_log": (bench_output_log, (10, 100, 1000)),
+}
+
+
+def measure(setup: Callable[[], object], repeat: int) -> dict[str, float]:
+    """Time a call, calibrating the number of calls per sample.
+
+    Args:
+        setup: The benchmarked call
+        repeat: The number of samples
+
+    Returns:
+        The fastest and median seconds per call, and the calls per sample
+    """
+    timer = timeit.Timer(setup)
+    number, _ = timer.autorange()
+    samples = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {"min": min(samples), "median": statistics.median(samples), "number": number}
+
+
+def selected(name: str, size: int, pattern: str) -> bool:
+    """Determine if a benchmark is selected by a filter.
+
+    The brackets of a benchmark ID are not a glob character class, a filter
+    of name[size] matches the name and size globs separately, any other
+    filter matches the name at any size.
+
+    Args:
+        name: The name of the benchmark
+        size: The size of its input
+        pattern: The filter, e.g. sort_lower*, compare[1000] or *[10]
+
+    Returns:
+        True if the benchmark is selected
+    """
+    name_pattern, size_pattern = pattern, "*"
+    if pattern.endswith("]") and "[" in pattern:
+        name_pattern, _, size_pattern = pattern[:-1].partition("[")
+    return fnmatch.fnmatchcase(name, name_pattern) and fnmatch.fnmatchcase(str(size), size_pattern)
+
+
+def run(args: Namespace) -> int:
+    """Run the selected benchmarks and write the results.
+
+    Args:
+        args: The parsed arguments
+
+    Returns:
+        The exit code, 2 if the filter selects no benchmark
+    """
+    selection = [
+        (name, setup, size)
+        for name, (setup, sizes) in BENCHMARKS.items()
+        for size in sizes
+        if selected(name=name, size=size, pattern=args.filter)
+    ]
+    if not selection:
+        sys.stderr.write(f"No benchmark matches the filter {args.filter!r}.\n")
+        return 2
+    results: dict[str, dict[str, float]] = {}
+    for name, setup, size in selection:
+        bench_id = f"{name}[{size}]"
+        with contextlib.ExitStack() as stack:
+            # The checks report to the console, keep it out of the results
+            quiet = stack.enter_context(Path(os.devnull).open("w"))
+            stack.enter_context(contextlib.redirect_stdout(quiet))
+            stack.enter_context(contextlib.redirect_stderr(quiet))
+            results[bench_id] = measure(setup=setup(size, stack), repeat=args.repeat)
+        sys.stdout.write(
+            f"{bench_id:<28} {results[bench_id]['min'] * 1000:>12.3f} ms"
+            f" (median {results[bench_id]['median'] * 1000:.3f} ms)\n",
+        )
+    document = {
+        "format": RESULTS_FORMAT,
+        "version": RESULTS_VERSION,
+        "created": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2) + "\n")
+    return 0
+
+
+def load_results(path: Path) -> dict[str, dict[str, float]]:
+    """Load the results of a run.
+
+    Args:
+        path: The results file
+
+    Raises:
+        ValueError: If the file is not a results file of a supported version
+
+    Returns:
+        The timings of each benchmark
+    """
+    document = json.loads(path.read_text())
+    if document.get("format") != RESULTS_FORMAT or document.get("version") != RESULTS_VERSION:
+        err = f"{path} is not an {RESULTS_FORMAT} version {RESULTS_VERSION} file."
+        raise ValueError(err)
+    return document["results"]
+
+
+def compare(args: Namespace) -> int:
+    """Compare the results of a run with a baseline, by the fastest time per call.
+
+    Args:
+        args: The parsed arguments
+
+    Returns:
+        The exit code, 1 if any benchmark regressed past the threshold, 2 on error
+    """
+    try:
+        baseline = load_results(Path(args.baseline))
+        current = load_results(Path(args.current))
+    except (OSError, KeyError, ValueError) as exc:
+        sys.stderr.write(f"Unable to load the results: {exc}\n")
+        return 2
+    if not current:
+        sys.stderr.write(f"{args.current} has no results to compare.\n")
+        return 2
+    regressed = 0
+    for bench_id, timing in current.items():
+        if bench_id not in baseline:
+            sys.stdout.write(f"{bench_id:<28} new, no baseline\n")
+            continue
+        change = timing["min"] / baseline[bench_id]["min"] - 1
+        verdict = "ok"
+        if change * 100 > args.threshold:
+            verdict = "REGRESSED"
+            regressed += 1
+        elif change * 100 < -args.threshold:
+            verdict = "improved"
+        sys.stdout.write(
+            f"{bench_id:<28} {baseline[bench_id]['min'] * 1000:>12.3f} ms"
+            f" -> {timing['min'] * 1000:>12.3f} ms {change:>+8.1%}  {verdict}\n",
+        )
+    sys.stdout.write(
+        f"{regressed} of {len(current)} benchmarks regressed by more than {args.threshold:g}%.\n",
+    )
+    return 1 if regressed else 0
+
+
+def main() -> None:
+    """Run the benchmarks or compare the results with a baseline."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--output", default=None, help="Write the results to this JSON file")
+    run_parser.add_argument(
+        "--filter",
+        default="*",
+        help="Run the benchmarks matching the glob, of the name or name[size]",
+    )
+    run_parser.add_argument("--repeat", type=int, default=5, help="The samples per benchmark")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="Compare the results with a baseline")
+    compare_parser.add_argument("baseline", help="The baseline results file")
+    compare_parser.add_argument("current", help="The current results file")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="The percent slower than the baseline failing the comparison",
+    )
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == "__main__":
+    main()
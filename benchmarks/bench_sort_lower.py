@@ -0,0 +1,97 @@
+"""Benchmark the external memory sort used by sort_lower.
+
+Generates a word list of the requested size, sorts it and reports the time
+taken and the peak memory used, which should stay near --max-memory no
+matter how large the input is.
+
+    python benchmarks/bench_sort_lower.py --size-mb 4096
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import resource
+import string
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+from ftf.extsort import DEFAULT_MEMORY, sort_unique
+
+
+def generate(path: Path, size: int, seed: int) -> int:
+    """Generate a word list with duplicates, mixed case and comments.
+
+    Args:
+        path: The file to write
+        size: The approximate size of the file in bytes
+        seed: The random seed
+
+    Returns:
+        The number of lines written
+    """
+    rng = random.Random(seed)  # noqa: S311
+    alphabet = string.ascii_letters
+    vocabulary = ["".join(rng.choices(alphabet, k=rng.randint(3, 14))) for _ in range(1 << 16)]
+    written = lines = 0
+    with path.open(mode="w") as f:
+        while written < size:
+            block = [
+                f"# {word}" if i % 97 == 0 else f"{word}{rng.randrange(1 << 20)}"
+                for i, word in enumerate(rng.choices(vocabulary, k=10_000))
+            ]
+            text = "\n".join(block) + "\n"
+            f.write(text)
+            written += len(text)
+            lines += len(block)
+    return lines
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size-mb", type=int, default=2048, help="The input size in MiB")
+    parser.add_argument(
+        "--max-memory-mb",
+        type=int,
+        default=DEFAULT_MEMORY // (1024 * 1024),
+        help="The memory used for a single run in MiB",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="The random seed")
+    parser.add_argument("--tmp-dir", type=Path, default=None, help="Where to write the files")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="ftf_bench_", dir=args.tmp_dir) as work_dir:
+        src = Path(work_dir) / "words.txt"
+        dest = Path(work_dir) / "sorted.txt"
+        start = time.perf_counter()
+        lines = generate(path=src, size=args.size_mb * 1024 * 1024, seed=args.seed)
+        generated = time.perf_counter() - start
+
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        start = time.perf_counter()
+        sort_unique(
+            src=src,
+            dest=dest,
+            transform=lambda line: None if line.startswith("#") else line.lower(),
+            max_memory=args.max_memory_mb * 1024 * 1024,
+            tmp_dir=Path(work_dir),
+        )
+        duration = time.perf_counter() - start
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+        src_size = src.stat().st_size
+        sys.stdout.write(
+            f"input:     {src_size / 2**20:,.0f} MiB, {lines:,} lines"
+            f" (generated in {generated:.1f}s)\n"
+            f"output:    {dest.stat().st_size / 2**20:,.0f} MiB\n"
+            f"sort:      {duration:.1f}s, {src_size / 2**20 / duration:,.1f} MiB/s\n"
+            f"peak RSS:  {peak / 1024:,.0f} MiB (before sort {baseline / 1024:,.0f} MiB)\n",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,9 @@ from argparse import HelpFormatter
 from pathlib import Path
 from typing import TYPE_CHECKING
 
+from ftf.inventory import parse_shard
+from ftf.settings import REPO_TIMEOUT, TMP_MAX_AGE
+
 
 if TYPE_CHECKING:
     from typing import Any
@@ -73,6 +76,24 @@ def parse_args() -> argparse.Namespace:
         help="Append to log file.",
     )
 
+    parser.add_argument(
+        "--lm",
+        "--log-max-bytes <bytes>",
+        dest="log_max_bytes",
+        default=0,
+        type=int,
+        help="Rotate the log file at this size, 0 to never rotate.",
+    )
+
+    parser.add_argument(
+        "--lb",
+        "--log-backups <count>",
+        dest="log_backups",
+        default=5,
+        type=int,
+        help="The number of rotated log files kept.",
+    )
+
     parser.add_argument(
         "-v",
         dest="verbose",
@@ -97,6 +118,15 @@ def parse_args() -> argparse.Namespace:
         dest="check_forks",
     )
 
+    parser.add_argument(
+        "--br",
+        "--bulk-review",
+        action="store_true",
+        default=False,
+        help="Review each distinct change once for all affected repositories",
+        dest="bulk_review",
+    )
+
     parser.add_argument(
         "--dr",
         "--dry-run",
@@ -106,6 +136,17 @@ def parse_args() -> argparse.Namespace:
         dest="dry_run",
     )
 
+    _add_inventory_arguments(parser)
+
+    parser.add_argument(
+        "--pm",
+        "--pr-mode <mode>",
+        dest="pr_mode",
+        default="update",
+        choices=["update", "supersede", "new"],
+        help="How an open ftf PR for the same file with different content is handled",
+    )
+
     parser.add_argument(
         "--nt",
         "--new-temp",
@@ -115,6 +156,120 @@ def parse_args() -> argparse.Namespace:
         dest="new_temp",
     )
 
+    parser.add_argument(
+        "--ta",
+        "--tmp-max-age <days>",
+        dest="tmp_max_age",
+        default=TMP_MAX_AGE,
+        type=float,
+        help="Remove the temporary directories of earlier sessions older than this, 0 to keep them",
+    )
+
+    parser.add_argument(
+        "--ts",
+        "--tmp-max-size <GiB>",
+        dest="tmp_max_size",
+        default=0.0,
+        type=float,
+        help="Remove the oldest temporary directories until all fit in this size, 0 for no limit",
+    )
+
+    parser.add_argument(
+        "--ur",
+        "--update-revs",
+        action="store_true",
+        default=False,
+        help="Update the pre-commit hook revs to the latest release tags",
+        dest="update_revs",
+    )
+
+    parser.add_argument(
+        "--tt",
+        "--tag-ttl <seconds>",
+        dest="tag_ttl",
+        default=3600,
+        type=float,
+        help="The number of seconds cached hook repository tags are valid for",
+    )
+
+    parser.add_argument(
+        "--jo",
+        "--jobs <count>",
+        dest="jobs",
+        default=8,
+        type=int,
+        help="The maximum number of remotes queried, or pushes and PRs sent, at once",
+    )
+
+    parser.add_argument(
+        "--rt",
+        "--repo-timeout <seconds>",
+        dest="repo_timeout",
+        default=REPO_TIMEOUT,
+        type=float,
+        help="The number of seconds the commands for a repository may run, per check",
+    )
+
+    parser.add_argument(
+        "--sr",
+        "--submit-rate <per-second>",
+        dest="submit_rate",
+        default=1.0,
+        type=positive_float,
+        help="The sustained number of pushes and PR changes sent to GitHub per second",
+    )
+
+    parser.add_argument(
+        "--mf",
+        "--metrics-file <file>",
+        dest="metrics_file",
+        default=None,
+        help="Write Prometheus text format metrics of the run to the file",
+    )
+
+    parser.add_argument(
+        "--pf",
+        "--profile <directory>",
+        dest="profile",
+        default=None,
+        help="Profile the sync phase and each check, writing their pstats files to the directory",
+    )
+
+    parser.add_argument(
+        "--pfm",
+        "--profile-memory",
+        action="store_true",
+        default=False,
+        help="Also trace the memory allocations of each profiled phase with tracemalloc",
+        dest="profile_memory",
+    )
+
+    parser.add_argument(
+        "--pft",
+        "--profile-top <count>",
+        dest="profile_top",
+        default=20,
+        type=int,
+        help="The number of functions and allocations in the profile summary",
+    )
+
+    parser.add_argument(
+        "--nh",
+        "--no-history",
+        action="store_true",
+        default=False,
+        help="Do not save the run to the local history used by ftf history",
+        dest="no_history",
+    )
+
+    parser.add_argument(
+        "--rp",
+        "--report <file>",
+        dest="report",
+        default=None,
+        help="Write a report of the run to the file, gzip compressed if the name ends with .gz",
+    )
+
     parser.add_argument(
         "--oo",
         "--origin-org",
@@ -126,6 +281,265 @@ def parse_args() -> argparse.Namespace:
     return parser.parse_args()
 
 
+def parse_merge_reports_args(argv: list[str]) -> argparse.Namespace:
+    """Parse the arguments for the merge-reports command.
+
+    Args:
+        argv: The arguments following the command name.
+
+    Returns:
+        The parsed arguments.
+    """
+    parser = ArgumentParser(
+        prog="ftf merge-reports",
+        description="Merge the reports of multiple runs into a fleet summary",
+        formatter_class=CustomHelpFormatter,
+    )
+    _add_common_arguments(parser)
+
+    parser.add_argument(
+        "--mo",
+        "--merged <file>",
+        dest="merged",
+        default=None,
+        help="Write all results to a single merged report",
+    )
+
+    parser.add_argument(
+        "--so",
+        "--summary <file>",
+        dest="summary",
+        default=None,
+        help="Write the fleet summary as JSON to the file",
+    )
+
+    parser.add_argument(
+        "reports",
+        nargs="+",
+        help="The report files to merge",
+    )
+
+    return parser.parse_args(argv)
+
+
+def parse_history_args(argv: list[str]) -> argparse.Namespace:
+    """Parse the arguments for the history command.
+
+    Args:
+        argv: The arguments following the command name.
+
+    Returns:
+        The parsed arguments.
+    """
+    parser = ArgumentParser(
+        prog="ftf history",
+        description="Report the slowest steps, drift frequency and regressions of recent runs",
+        formatter_class=CustomHelpFormatter,
+    )
+    _add_common_arguments(parser)
+
+    parser.add_argument(
+        "--ru",
+        "--runs <count>",
+        dest="runs",
+        default=10,
+        type=int,
+        help="The number of recent runs considered, and forming the baseline for regressions",
+    )
+
+    parser.add_argument(
+        "--to",
+        "--top <count>",
+        dest="top",
+        default=10,
+        type=int,
+        help="The number of slowest steps and most drifted files shown",
+    )
+
+    parser.add_argument(
+        "--th",
+        "--threshold <percent>",
+        dest="threshold",
+        default=25.0,
+        type=float,
+        help="Report steps of the latest run this much slower than the baseline median",
+    )
+
+    parser.add_argument(
+        "--ms",
+        "--min-seconds <seconds>",
+        dest="min_seconds",
+        default=1.0,
+        type=float,
+        help="Ignore regressions smaller than this many seconds",
+    )
+
+    return parser.parse_args(argv)
+
+
+def parse_status_args(argv: list[str]) -> argparse.Namespace:
+    """Parse the arguments for the status command.
+
+    Args:
+        argv: The arguments following the command name.
+
+    Returns:
+        The parsed arguments.
+    """
+    parser = ArgumentParser(
+        prog="ftf status",
+        description="Show which forks are out of sync and the open PRs, without cloning",
+        formatter_class=CustomHelpFormatter,
+    )
+    _add_common_arguments(parser)
+    _add_inventory_arguments(parser)
+
+    parser.add_argument(
+        "--jo",
+        "--jobs <count>",
+        dest="jobs",
+        default=8,
+        type=int,
+        help="The maximum number of repositories queried at once",
+    )
+
+    parser.add_argument(
+        "--np",
+        "--no-prs",
+        action="store_false",
+        default=True,
+        dest="prs",
+        help="Do not list the open PRs, for remotes not hosted on GitHub",
+    )
+
+    parser.add_argument(
+        "--pt",
+        "--pr-ttl <seconds>",
+        dest="pr_ttl",
+        default=300,
+        type=float,
+        help="The number of seconds a cached PR listing is valid for",
+    )
+
+    parser.add_argument(
+        "--oo",
+        "--origin-org",
+        help="The github origin organization",
+        required=True,
+        dest="origin_org",
+    )
+
+    return parser.parse_args(argv)
+
+
+def _add_inventory_arguments(parser: ArgumentParser) -> None:
+    """Add the arguments used to load and narrow the inventory.
+
+    Args:
+        parser: The parser to add the arguments to.
+    """
+    parser.add_argument(
+        "--inv",
+        "--inventory <file>",
+        dest="inventory",
+        default=None,
+        help="Fleet inventory file (TOML or YAML), the built-in settings are used if not provided",
+    )
+
+    parser.add_argument(
+        "--sel",
+        "--select <pattern>",
+        action="append",
+        dest="select",
+        default=[],
+        help="Only include repositories matching the pattern, use tag:<pattern> to match tags."
+        " Can be used multiple times",
+    )
+
+    parser.add_argument(
+        "--exc",
+        "--exclude <pattern>",
+        action="append",
+        dest="exclude",
+        default=[],
+        help="Exclude repositories matching the pattern, use tag:<pattern> to match tags."
+        " Can be used multiple times",
+    )
+
+    parser.add_argument(
+        "--sh",
+        "--shard <i/n>",
+        dest="shard",
+        default=None,
+        type=shard_type,
+        help="Only include the repositories in shard i of n, used to split a fleet run",
+    )
+
+
+def _add_common_arguments(parser: ArgumentParser) -> None:
+    """Add the arguments shared by the commands.
+
+    Args:
+        parser: The parser to add the arguments to.
+    """
+    parser.add_argument(
+        "--na",
+        "--no-ansi",
+        action="store_true",
+        default=False,
+        dest="no_ansi",
+        help="Disable the use of ANSI codes for terminal color.",
+    )
+
+    parser.add_argument(
+        "-v",
+        dest="verbose",
+        action="count",
+        default=1,
+        help="Give more Cli output. Option is additive, and can be used up to 3 times.",
+    )
+
+
+def shard_type(value: str) -> tuple[int, int]:
+    """Convert a shard argument.
+
+    Args:
+        value: The shard argument in the form i/n
+
+    Raises:
+        ArgumentTypeError: If the argument is invalid
+
+    Returns:
+        The one based shard index and the number of shards
+    """
+    try:
+        return parse_shard(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from exc
+
+
+def positive_float(value: str) -> float:
+    """Convert an argument that must be a number above zero.
+
+    Args:
+        value: The argument
+
+    Raises:
+        ArgumentTypeError: If the argument is not a number above zero
+
+    Returns:
+        The number
+    """
+    try:
+        number = float(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from exc
+    if number <= 0:
+        err = f"{value} is not above zero"
+        raise argparse.ArgumentTypeError(err)
+    return number
+
+
 class ArgumentParser(argparse.ArgumentParser):
     """A custom argument parser."""
 
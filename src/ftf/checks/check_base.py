@@ -2,19 +2,34 @@
 
 from __future__ import annotations
 
-import difflib
 import subprocess
+import time
 
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING, TypedDict, Unpack
 
-from ftf.output import Color
-from ftf.utils import ask_yes_no, tmp_file
+from ftf.checks.diff_strategies import DIFF_SIZE_LIMIT, DiffStrategy, size_summary
+from ftf.deadlines import deadline
+from ftf.pull_requests import BRANCH_PREFIX, PullRequest, pr_marker, pr_number
+from ftf.report import CheckResult, Status
+from ftf.scratch import SCRATCH
+from ftf.utils import (
+    ask_yes_no,
+    content_hash,
+    file_hash,
+    files_equal,
+    is_text_file,
+    render_diff,
+    tmp_file,
+)
 
 
 if TYPE_CHECKING:
+    from collections.abc import Callable
     from pathlib import Path
 
     from ftf.config import Config
+    from ftf.output import Msg
     from ftf.repo import Repo
 
 
@@ -26,9 +41,43 @@ class CheckBaseParams(TypedDict):
     repo_list: list[Repo]
 
 
+@dataclass
+class PendingUpdate:
+    """An update held back for bulk review."""
+
+    #: The repository to update
+    repo: Repo
+    #: The diff lines shown to the user
+    diff: list[str]
+    #: A callable that writes the desired content to the repository
+    write: Callable[[], object]
+
+    @property
+    def diff_hash(self: PendingUpdate) -> str:
+        """Return a hash of the diff, used to group identical updates.
+
+        Returns:
+            The hex digest of the diff
+        """
+        return content_hash("\n".join(self.diff))
+
+
+@dataclass
+class Evaluation:
+    """The outcome of evaluating a check against the content of a repository file."""
+
+    #: The desired content of the repository file
+    desired: str
+    #: Messages to present for the repository, without the repository name
+    messages: list[Msg] = field(default_factory=list)
+
+
 class CheckBase:
     """The base class with helpers for the checks."""
 
+    #: How the difference between the current and desired content is shown
+    diff_strategy: DiffStrategy = DiffStrategy()
+
     def __init__(
         self: CheckBase,
         **kwargs: Unpack[CheckBaseParams],
@@ -45,8 +94,81 @@ class CheckBase:
         self.commit_text_file: Path
         self._revision_branch: str
         self._current_repo: Repo
+        self._diff: list[str] = []
+        self._pending: list[PendingUpdate] = []
+        self._evaluations: dict[tuple[str, str, str], Evaluation] = {}
+        self._diffs: dict[tuple[str, str], list[str]] = {}
+        self._results: dict[str, CheckResult] = {}
+        self._base_hash = ""
         self._prs_made = False
 
+    @property
+    def check_name(self: CheckBase) -> str:
+        """Return the name of the check.
+
+        Returns:
+            The name of the check module, e.g. full_file
+        """
+        return type(self).__module__.rsplit(".", maxsplit=1)[-1]
+
+    @property
+    def _result(self: CheckBase) -> CheckResult:
+        """Return the result for the current repository.
+
+        Returns:
+            The result
+        """
+        return self._results[self._current_repo.name]
+
+    def _check_repos(self: CheckBase, each: Callable[[], None]) -> None:
+        """Run the check for each repository and record the results.
+
+        Args:
+            each: A callable checking the current repository.
+        """
+        for repo in self.repo_list:
+            self._current_repo = repo
+            self._results[repo.name] = CheckResult(
+                repo=repo.name,
+                check=self.check_name,
+                file=self.file_name,
+                base_hash=self._base_hash,
+            )
+            if repo.failed:
+                self._result.status = Status.FAILED
+                self.config.output.error(f"[{repo.name}] Skipped, {repo.failed}")
+                continue
+            start = time.monotonic()
+            try:
+                with deadline(self.config.args.repo_timeout):
+                    each()
+            except subprocess.TimeoutExpired as exc:
+                self._timed_out(repo=repo, result=self._result, exc=exc)
+            self._result.duration = time.monotonic() - start
+        self._review_pending()
+        for result in self._results.values():
+            self.config.report.record(result)
+        self._results = {}
+
+    def _timed_out(
+        self: CheckBase,
+        repo: Repo,
+        result: CheckResult,
+        exc: subprocess.TimeoutExpired,
+    ) -> None:
+        """Mark a repository failed after a command outlived its deadline.
+
+        The repository may be left mid-change, it is skipped for the rest of the run.
+
+        Args:
+            repo: The repository
+            result: The result of the check for the repository
+            exc: The exception raised for the command
+        """
+        repo.failed = f"{exc.cmd} timed out after {exc.timeout:.0f}s."
+        result.status = Status.FAILED
+        self.config.output.error(f"[{repo.name}] {self.file_name} failed, {repo.failed}")
+
     def _author_commit_msg(self: CheckBase) -> bool:
         """Allow the user to author a commit message.
 
@@ -59,11 +181,10 @@ class CheckBase:
         command = f"{self.config.editor} {commit_text_file}"
         subprocess.Popen(args=command, shell=True).wait()
         post_ts = commit_text_file.stat().st_mtime
-        if initial_ts == post_ts:
-            return False
         with commit_text_file.open(mode="r") as f:
             commit_msg = f.read().strip()
-        if commit_msg == "":
+        if initial_ts == post_ts or commit_msg == "":
+            SCRATCH.release(commit_text_file)
             return False
         self.commit_msg = commit_msg
 
@@ -78,10 +199,69 @@ class CheckBase:
             desired: The desired content.
 
         Returns:
-            True if the content is different, False otherwise.
+            True if the content is the same, False otherwise.
+        """
+        return self._compare_hashes(
+            repo_hash=content_hash(current),
+            desired_hash=content_hash(desired),
+            diff=lambda: self.diff_strategy.diff(current=current, desired=desired),
+        )
+
+    def _compare_files(
+        self: CheckBase,
+        current_path: Path,
+        desired_path: Path,
+        desired_hash: str | None = None,
+    ) -> bool:
+        """Compare and diff the current and desired files.
+
+        Identical files are found without reading them into memory. Text files
+        are diffed, binary and large files are summarized by size.
+
+        Args:
+            current_path: The current file, which may not exist.
+            desired_path: The desired file.
+            desired_hash: The hash of the desired file, if already known.
+
+        Returns:
+            True if the files are the same, False otherwise.
         """
-        same = current == desired
-        if same:
+        current_exists = current_path.exists()
+        if current_exists and files_equal(left=current_path, right=desired_path):
+            same_hash = desired_hash or file_hash(desired_path)
+            return self._compare_hashes(repo_hash=same_hash, desired_hash=same_hash, diff=list)
+        if _is_small_text(desired_path) and (not current_exists or _is_small_text(current_path)):
+            current = current_path.read_text() if current_exists else ""
+            return self._compare(current=current, desired=desired_path.read_text())
+        current_size = current_path.stat().st_size if current_exists else 0
+        return self._compare_hashes(
+            repo_hash=file_hash(current_path) if current_exists else content_hash(""),
+            desired_hash=desired_hash or file_hash(desired_path),
+            diff=lambda: size_summary(
+                current_size=current_size,
+                desired_size=desired_path.stat().st_size,
+            ),
+        )
+
+    def _compare_hashes(
+        self: CheckBase,
+        repo_hash: str,
+        desired_hash: str,
+        diff: Callable[[], list[str]],
+    ) -> bool:
+        """Compare the current and desired content by hash, diffing if they differ.
+
+        Args:
+            repo_hash: The hash of the current content.
+            desired_hash: The hash of the desired content.
+            diff: Produces the diff, called once per distinct pair of hashes.
+
+        Returns:
+            True if the content is the same, False otherwise.
+        """
+        self._result.repo_hash = repo_hash
+        self._result.desired_hash = desired_hash
+        if repo_hash == desired_hash:
             self.config.output.info(
                 f"[{self._current_repo.name}] {self.file_name} no update needed.",
             )
@@ -90,44 +270,89 @@ class CheckBase:
         self.config.output.warning(
             f"[{self._current_repo.name}] {self.file_name} needs to be updated.",
         )
-        diff = difflib.unified_diff(
-            current.splitlines(),
-            desired.splitlines(),
-            n=5,
-            fromfile="base",
-            tofile="repo",
-        )
-        for line in diff:
-            if line.startswith("---"):
-                color = Color.BRIGHT_MAGENTA
-            elif line.startswith("+++"):
-                color = Color.BRIGHT_CYAN
-            elif line.startswith("@@"):
-                color = Color.BRIGHT_YELLOW
-            elif line.startswith("-"):
-                color = Color.BRIGHT_RED
-            elif line.startswith("+"):
-                color = Color.BRIGHT_GREEN
-            else:
-                color = Color.GREY
-            print(f"{color}{line}{Color.END}")  # noqa: T201
+        key = (repo_hash, desired_hash)
+        if key not in self._diffs:
+            self._diffs[key] = diff()
+        self._diff = self._diffs[key]
+        self._result.status = Status.DRIFT
+        self._result.diff = self._diff
+        if self.config.args.bulk_review:
+            return False
+        render_diff(diff=self._diff, term_features=self.config.output.term_features)
         return False
 
-    def _make_branch(self: CheckBase) -> None:
-        """Make a new branch."""
-        self._revision_branch = f"chore/file_{self.file_name}_{self.config.session_id}"
-        self._current_repo.branch_in_origin(new_branch=self._revision_branch)
+    def _evaluate_memoized(
+        self: CheckBase,
+        base_content: str,
+        repo_content: str,
+        evaluate: Callable[[], Evaluation],
+        variant: str = "",
+    ) -> Evaluation:
+        """Evaluate the check once per distinct set of inputs within a run.
+
+        Repositories with byte identical files share a single evaluation, the
+        messages of the evaluation are presented for each repository.
+
+        Args:
+            base_content: The content of the template file.
+            repo_content: The content of the repository file.
+            evaluate: A callable performing the evaluation.
+            variant: Any repository specific settings influencing the evaluation.
+
+        Returns:
+            The evaluation.
+        """
+        key = (content_hash(base_content), content_hash(repo_content), variant)
+        if key in self._evaluations:
+            self.config.output.debug(
+                f"[{self._current_repo.name}] Reusing evaluation of an identical {self.file_name}.",
+            )
+        else:
+            self._evaluations[key] = evaluate()
+        evaluation = self._evaluations[key]
+        for message in evaluation.messages:
+            log = getattr(self.config.output, message.prefix.name.lower())
+            log(f"[{self._current_repo.name}] {message.message}")
+        return evaluation
+
+    def _make_branch(self: CheckBase, reuse: PullRequest | None = None) -> None:
+        """Make a new branch, or reset the branch of an open PR.
 
-    def _get_commit_msg(self: CheckBase) -> bool:
+        Args:
+            reuse: The open PR whose branch is updated, None for a new branch.
+        """
+        if reuse is not None:
+            self._revision_branch = reuse.branch
+        else:
+            self._revision_branch = f"{BRANCH_PREFIX}{self.file_name}_{self.config.session_id}"
+        self._current_repo.branch_in_origin(
+            new_branch=self._revision_branch,
+            reset=reuse is not None,
+        )
+
+    def _get_commit_msg(self: CheckBase, target: str) -> bool:
         """Get a commit/PR message from the user.
 
+        Args:
+            target: The name of the repository or repositories being updated.
+
         Returns:
             True if a PR was made, False otherwise.
         """
-        q = f"Do you want to update the {self.file_name} file in {self._current_repo.name}?"
+        q = f"Do you want to update the {self.file_name} file in {target}?"
         if not ask_yes_no(q):
             return False
+        return self._ensure_commit_msg(target=target)
+
+    def _ensure_commit_msg(self: CheckBase, target: str) -> bool:
+        """Ensure a commit/PR message is available, reusing the previous one if desired.
+
+        Args:
+            target: The name of the repository or repositories being updated.
 
+        Returns:
+            True if a commit message is available, False otherwise.
+        """
         have_commit_msg = True
         if not self.commit_msg:
             have_commit_msg = self._author_commit_msg()
@@ -139,19 +364,190 @@ class CheckBase:
         if have_commit_msg:
             return True
 
-        err = f"[{self._current_repo.name}] No commit message provided or updated, PR skipped."
+        err = f"[{target}] No commit message provided or updated, PR skipped."
         self.config.output.error(err)
         return False
 
-    def _make_pr(self: CheckBase) -> None:
-        """Make the PR."""
-        self._current_repo.stage_file(file_name=self.file_name)
-        self._current_repo.commit_file(commit_text_file=self.commit_text_file)
-        self._current_repo.push_origin(new_branch=self._revision_branch)
-        self._current_repo.create_pr(
+    def _propose(self: CheckBase, write: Callable[[], object]) -> None:
+        """Propose an update to the current repository.
+
+        In bulk review mode the update is held back and reviewed together with
+        all other repositories sharing the same diff.
+
+        Args:
+            write: A callable that writes the desired content to the repository.
+        """
+        if self.config.args.bulk_review:
+            self._pending.append(
+                PendingUpdate(repo=self._current_repo, diff=self._diff, write=write),
+            )
+            return
+
+        if not self._get_commit_msg(target=self._current_repo.name):
+            return
+        submit = self._apply(write=write)
+        if submit is not None:
+            submit()
+
+    def _apply(
+        self: CheckBase,
+        write: Callable[[], object],
+        quiet: bool = False,  # noqa: FBT001, FBT002
+    ) -> Callable[[], None] | None:
+        """Branch, write and commit the update for the current repository.
+
+        Args:
+            write: A callable that writes the desired content to the repository.
+            quiet: Submit without a spinner, used when submitting concurrently.
+
+        Returns:
+            Pushes the branch and makes the PR, None if an open PR already
+            proposes the update.
+        """
+        existing = self.config.pr_index.for_file(
+            repo_name=self._current_repo.name,
             file_name=self.file_name,
-            new_branch=self._revision_branch,
-            commit_text_file=self.commit_text_file,
         )
-        self._current_repo.ensure_main()
-        self._prs_made = True
+        for pr in existing:
+            if pr.content_hash and pr.content_hash == self._result.desired_hash:
+                msg = f"[{self._current_repo.name}] PR #{pr.number} already proposes this update."
+                self.config.output.info(msg)
+                self._result.pr_url = pr.url
+                return None
+
+        pr_mode = self.config.args.pr_mode
+        reuse = existing[0] if existing and pr_mode == "update" else None
+        self._make_branch(reuse=reuse)
+        write()
+        msg = f"[{self._current_repo.name}] Updated {self.file_name}."
+        self.config.output.info(msg)
+        return self._make_pr(
+            reuse=reuse,
+            supersede=existing if pr_mode == "supersede" else [],
+            quiet=quiet,
+        )
+
+    def _review_pending(self: CheckBase) -> None:
+        """Review the held back updates, once per distinct diff."""
+        groups: dict[str, list[PendingUpdate]] = {}
+        for update in self._pending:
+            groups.setdefault(update.diff_hash, []).append(update)
+        self._pending = []
+
+        for updates in groups.values():
+            names = ", ".join(update.repo.name for update in updates)
+            msg = f"{self.file_name} needs the following update in {len(updates)} repos: {names}"
+            self.config.output.warning(msg)
+            render_diff(diff=updates[0].diff, term_features=self.config.output.term_features)
+            if not self._get_commit_msg(target=names):
+                continue
+            submissions = []
+            for update in updates:
+                self._current_repo = update.repo
+                start = time.monotonic()
+                submit = None
+                try:
+                    with deadline(self.config.args.repo_timeout):
+                        submit = self._apply(write=update.write, quiet=True)
+                except subprocess.TimeoutExpired as exc:
+                    self._timed_out(repo=update.repo, result=self._result, exc=exc)
+                self._result.duration += time.monotonic() - start
+                if submit is not None:
+                    submissions.append(submit)
+            self.config.submit_queue.run_all(submissions)
+
+    def _make_pr(
+        self: CheckBase,
+        reuse: PullRequest | None,
+        supersede: list[PullRequest],
+        quiet: bool,  # noqa: FBT001
+    ) -> Callable[[], None]:
+        """Commit the update, returning the submission of the PR.
+
+        The branch is pushed and the PR made by the returned callable, so the
+        submissions of several repositories can run concurrently through the
+        submission queue, which paces them to the GitHub rate limits.
+
+        Args:
+            reuse: The open PR to update, None to make a new one.
+            supersede: The open PRs to close in favor of the new one.
+            quiet: Submit without a spinner, used when submitting concurrently.
+
+        Returns:
+            Pushes the branch and makes, or updates, the PR.
+        """
+        repo = self._current_repo
+        result = self._result
+        branch = self._revision_branch
+        body_file = tmp_file()
+        marker = pr_marker(file_name=self.file_name, content_hash=result.desired_hash)
+        body_file.write_text(f"{self.commit_text_file.read_text().rstrip()}\n\n{marker}\n")
+        repo.stage_file(file_name=self.file_name)
+        repo.commit_file(commit_text_file=self.commit_text_file)
+        repo.ensure_main()
+
+        def submit() -> None:
+            """Push the branch and make, or update, the PR."""
+            start = time.monotonic()
+            try:
+                # Run by the worker threads of the queue, outside the deadline of the check
+                with deadline(self.config.args.repo_timeout):
+                    publish()
+            except subprocess.TimeoutExpired as exc:
+                self._timed_out(repo=repo, result=result, exc=exc)
+            finally:
+                SCRATCH.release(body_file)
+            result.duration += time.monotonic() - start
+
+        def publish() -> None:
+            """Push the branch and make, or update, the PR, recording it in the index."""
+            if repo.failed:
+                # Syncing main failed after the commit, nothing to base a PR on
+                result.status = Status.FAILED
+                return
+            repo.push_origin(new_branch=branch, force=reuse is not None, quiet=quiet)
+            if reuse is not None:
+                repo.edit_pr(number=reuse.number, body_file=body_file, quiet=quiet)
+                result.pr_url = reuse.url
+                repo.config.output.info(f"[{repo.name}] PR #{reuse.number} updated. {reuse.url}")
+            else:
+                result.pr_url = repo.create_pr(
+                    file_name=self.file_name,
+                    new_branch=branch,
+                    body_file=body_file,
+                    quiet=quiet,
+                )
+            for pr in supersede:
+                repo.close_pr(
+                    number=pr.number,
+                    comment=f"Superseded by {result.pr_url}",
+                    quiet=quiet,
+                )
+            self.config.pr_index.record(
+                repo_name=repo.name,
+                pr=PullRequest(
+                    number=reuse.number if reuse else pr_number(result.pr_url),
+                    title=f"chore: Update {self.file_name}",
+                    url=result.pr_url,
+                    branch=branch,
+                    file=self.file_name,
+                    content_hash=result.desired_hash,
+                ),
+                closed=supersede,
+            )
+            result.status = Status.UPDATED
+            self._prs_made = True
+
+        return submit
+
+
+def _is_small_text(file_path: Path) -> bool:
+    """Determine if a file is text and small enough to diff in memory.
+
+    Args:
+        file_path: The path to the file.
+
+    Returns:
+        True if the file should be diffed as text.
+    """
+    return file_path.stat().st_size <= DIFF_SIZE_LIMIT and is_text_file(file_path)
@@ -0,0 +1,227 @@
+"""Strategies used by the checks to show the difference between two contents."""
+
+from __future__ import annotations
+
+import collections
+import difflib
+import json
+
+from typing import TYPE_CHECKING, Any
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterator
+
+
+#: Above this size, in characters, either content is summarized rather than diffed
+DIFF_SIZE_LIMIT = 1_000_000
+#: The label of the current content of the repository file in a diff
+CURRENT_LABEL = "repo"
+#: The label of the desired content of the repository file in a diff
+DESIRED_LABEL = "desired"
+
+
+class DiffStrategy:
+    """A line based unified diff."""
+
+    def diff(self: DiffStrategy, current: str, desired: str) -> list[str]:
+        """Diff the current and desired content.
+
+        Args:
+            current: The current content
+            desired: The desired content
+
+        Returns:
+            The diff lines
+        """
+        if max(len(current), len(desired)) > DIFF_SIZE_LIMIT:
+            return stat_summary(current=current, desired=desired)
+        return self._diff(current=current, desired=desired)
+
+    def _diff(self: DiffStrategy, current: str, desired: str) -> list[str]:
+        """Diff the current and desired content.
+
+        Args:
+            current: The current content
+            desired: The desired content
+
+        Returns:
+            The diff lines
+        """
+        return list(
+            difflib.unified_diff(
+                current.splitlines(),
+                desired.splitlines(),
+                n=5,
+                fromfile=CURRENT_LABEL,
+                tofile=DESIRED_LABEL,
+            ),
+        )
+
+
+class SetDiff(DiffStrategy):
+    """The lines added and removed, for files that are sorted lists of words."""
+
+    def _diff(self: SetDiff, current: str, desired: str) -> list[str]:
+        """Diff the current and desired content as sets of lines.
+
+        Args:
+            current: The current content
+            desired: The desired content
+
+        Returns:
+            The diff lines
+        """
+        current_lines = set(current.splitlines())
+        desired_lines = set(desired.splitlines())
+        removed = sorted(current_lines - desired_lines)
+        added = sorted(desired_lines - current_lines)
+        lines = [*_header(), f"@@ {len(removed)} removed, {len(added)} added @@"]
+        lines.extend(f"-{line}" for line in removed)
+        lines.extend(f"+{line}" for line in added)
+        if not removed and not added:
+            lines.append(" Order or duplicates changed only.")
+        return lines
+
+
+class StructuralDiff(DiffStrategy):
+    """The key paths changed, for YAML and TOML files that are merged."""
+
+    def __init__(self: StructuralDiff, loader: Callable[[str], Any]) -> None:
+        """Initialize the strategy.
+
+        Args:
+            loader: Parses the content into plain data
+        """
+        self._loader = loader
+
+    def _diff(self: StructuralDiff, current: str, desired: str) -> list[str]:
+        """Diff the current and desired content by key path, then line by line.
+
+        The key paths changed summarize the update, the unified diff that
+        follows shows exactly what is written, including comment and formatting
+        changes. Only the unified diff is given if either content cannot be
+        parsed or the change is formatting only.
+
+        Args:
+            current: The current content
+            desired: The desired content
+
+        Returns:
+            The diff lines
+        """
+        try:
+            current_data = self._loader(current)
+            desired_data = self._loader(desired)
+        except Exception:  # pylint: disable=broad-except # noqa: BLE001
+            return super()._diff(current=current, desired=desired)
+        changes = list(walk(path="", current=current_data, desired=desired_data))
+        text_diff = super()._diff(current=current, desired=desired)
+        if not changes:
+            return text_diff
+        return [*_header(), *changes, *text_diff[len(_header()) :]]
+
+
+def walk(path: str, current: Any, desired: Any) -> Iterator[str]:  # noqa: ANN401
+    """Walk two data structures and describe the differences by key path.
+
+    Args:
+        path: The key path of the values
+        current: The current value
+        desired: The desired value
+
+    Yields:
+        The diff lines
+    """
+    if isinstance(current, dict) and isinstance(desired, dict):
+        for key in current:
+            if key not in desired:
+                yield f"-{_join(path, key)}: {_dump(current[key])}"
+        for key, value in desired.items():
+            if key not in current:
+                yield f"+{_join(path, key)}: {_dump(value)}"
+            else:
+                yield from walk(path=_join(path, key), current=current[key], desired=value)
+    elif (
+        isinstance(current, list)
+        and isinstance(desired, list)
+        and len(current) == len(desired)
+        and any(isinstance(entry, dict | list) for entry in current)
+    ):
+        for index, (current_entry, desired_entry) in enumerate(
+            zip(current, desired, strict=True),
+        ):
+            yield from walk(path=f"{path}[{index}]", current=current_entry, desired=desired_entry)
+    elif current != desired:
+        yield f"@@ {path or '.'} @@"
+        yield f"-{_dump(current)}"
+        yield f"+{_dump(desired)}"
+
+
+def stat_summary(current: str, desired: str) -> list[str]:
+    """Summarize the change between two large contents without diffing them.
+
+    Args:
+        current: The current content
+        desired: The desired content
+
+    Returns:
+        The summary lines
+    """
+    current_lines = collections.Counter(current.splitlines())
+    desired_lines = collections.Counter(desired.splitlines())
+    removed = sum((current_lines - desired_lines).values())
+    added = sum((desired_lines - current_lines).values())
+    summary = (
+        f"@@ {len(current)} -> {len(desired)} characters,"
+        f" {removed} lines removed, {added} lines added @@"
+    )
+    return [*_header(), summary]
+
+
+def size_summary(current_size: int, desired_size: int) -> list[str]:
+    """Summarize the change to a binary or large file, without reading it.
+
+    Args:
+        current_size: The size of the current file in bytes
+        desired_size: The size of the desired file in bytes
+
+    Returns:
+        The summary lines
+    """
+    summary = f"@@ {current_size} -> {desired_size} bytes, content differs @@"
+    return [*_header(), summary]
+
+
+def _join(path: str, key: object) -> str:
+    """Join a key to a key path.
+
+    Args:
+        path: The key path
+        key: The key
+
+    Returns:
+        The joined key path
+    """
+    return f"{path}.{key}" if path else str(key)
+
+
+def _dump(value: Any) -> str:  # noqa: ANN401
+    """Render a value compactly.
+
+    Args:
+        value: The value
+
+    Returns:
+        The rendered value
+    """
+    return json.dumps(value, default=str, sort_keys=True)
+
+
+def _header() -> list[str]:
+    """Return the file header lines of a diff.
+
+    Returns:
+        The lines labelling the current and desired content
+    """
+    return [f"--- {CURRENT_LABEL}", f"+++ {DESIRED_LABEL}"]
@@ -2,12 +2,11 @@
 
 from __future__ import annotations
 
-import shutil
-
 from typing import TYPE_CHECKING, Unpack
 
 from ftf.checks.check_base import CheckBase, CheckBaseParams
-from ftf.utils import load_txt_file, path_to_data_file
+from ftf.report import Status
+from ftf.utils import copy_file, file_hash, path_to_data_file
 
 
 if TYPE_CHECKING:
@@ -25,14 +24,13 @@ class Check(CheckBase):
         """
         super().__init__(**kwargs)
 
-        self._base_file_content: str
         self._base_file_path: Path
 
-    def run(self: Check, file_data: dict[str, list[str]]) -> bool:
+    def run(self: Check, skip: frozenset[str]) -> bool:
         """Run the check.
 
         Args:
-            file_data: The data for the file.
+            skip: The repositories configured as skip for the file.
 
         Returns:
             True if PRs were made, False otherwise.
@@ -42,15 +40,14 @@ class Check(CheckBase):
             self.file_name = self.file_name[2:]
 
         self._base_file_path = path_to_data_file(src_file_name)
-        self._base_file_content = load_txt_file(self._base_file_path)
-        skip = file_data.get("skip", [])
+        self._base_hash = file_hash(self._base_file_path)
 
-        for repo in self.repo_list:
-            self._current_repo = repo
-            self._each_repo(repo_name=repo.name, skip=skip)
+        self._check_repos(
+            each=lambda: self._each_repo(repo_name=self._current_repo.name, skip=skip),
+        )
         return self._prs_made
 
-    def _each_repo(self: Check, repo_name: str, skip: list[str]) -> None:
+    def _each_repo(self: Check, repo_name: str, skip: frozenset[str]) -> None:
         """Run the check for each repository.
 
         Args:
@@ -61,12 +58,11 @@ class Check(CheckBase):
             f"[{self._current_repo.name}] Checking {self.file_name}...",
         )
         repo_file_path = self._current_repo.work_dir.joinpath(self.file_name)
-        try:
-            repo_content = repo_file_path.read_text()
-        except FileNotFoundError:
-            repo_content = ""
-
-        if self._compare(current=self._base_file_content, desired=repo_content):
+        if self._compare_files(
+            current_path=repo_file_path,
+            desired_path=self._base_file_path,
+            desired_hash=self._base_hash,
+        ):
             return
 
         if self.config.args.dry_run:
@@ -75,16 +71,8 @@ class Check(CheckBase):
         if repo_name in skip:
             msg = f"[{repo_name}] Configured as skip for {self.file_name}, check manually"
             self.config.output.warning(msg)
+            self._result.status = Status.SKIPPED
             input("Press Enter to continue...")
             return
 
-        if not self._get_commit_msg():
-            return
-
-        self._make_branch()
-
-        shutil.copy(self._base_file_path, repo_file_path)
-        msg = f"[{self._current_repo.name}] Updated {self.file_name}."
-        self.config.output.info(msg)
-
-        self._make_pr()
+        self._propose(write=lambda: copy_file(src=self._base_file_path, dest=repo_file_path))
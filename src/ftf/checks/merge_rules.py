@@ -0,0 +1,227 @@
+"""Declarative merge rules for TOML documents, keyed by dotted path."""
+
+from __future__ import annotations
+
+import re
+
+from dataclasses import dataclass, field, fields
+from enum import Enum
+from typing import TYPE_CHECKING, Any
+
+from ftf.output import Level, Msg
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Mapping, MutableMapping
+
+
+#: A bare or double quoted key in a dotted path
+_KEY = re.compile(r'"([^"]*)"|([^."]+)')
+#: A dotted path, keys separated by dots
+_PATH = re.compile(rf"(?:{_KEY.pattern})(?:\.(?:{_KEY.pattern}))*")
+
+
+class Action(Enum):
+    """How the desired value is determined from the base and repository."""
+
+    #: Keep the base table, adding the keys only found in the repository
+    UNION = "union"
+    #: Use the repository value if present, otherwise keep the base value
+    REPO = "repo"
+    #: Use the repository value, an error if missing
+    REQUIRE = "require"
+    #: Keep the base value, removed if missing from the repository
+    DROP_IF_MISSING = "drop_if_missing"
+
+
+@dataclass(frozen=True)
+class Rule:
+    """A merge rule for a single dotted path."""
+
+    #: How the desired value is determined
+    action: Action
+    #: Sort the resulting array
+    sort: bool = False
+    #: Warn if the repository value does not start with the base value
+    warn_unless_prefix: bool = False
+
+
+@dataclass
+class PlanNode:
+    """A table in the execution plan, with the rules for its keys."""
+
+    #: The rules for the keys of the table
+    rules: dict[str, Rule] = field(default_factory=dict)
+    #: The plans for the sub-tables of the table
+    children: dict[str, PlanNode] = field(default_factory=dict)
+
+
+def split_path(path: str) -> list[str]:
+    """Split a dotted path into keys, keys containing dots may be double quoted.
+
+    Args:
+        path: The dotted path
+
+    Raises:
+        ValueError: If the path is empty or malformed
+
+    Returns:
+        The keys
+    """
+    if not _PATH.fullmatch(path):
+        err = f"Invalid dotted path {path!r}."
+        raise ValueError(err)
+    return [
+        match.group(1) if match.group(1) is not None else match.group(2)
+        for match in _KEY.finditer(path)
+    ]
+
+
+def compile_rules(rules: Mapping[str, Mapping[str, Any]]) -> PlanNode:
+    """Compile the merge rules into an execution plan.
+
+    Args:
+        rules: The rules, keyed by dotted path
+
+    Raises:
+        ValueError: If a rule is invalid
+
+    Returns:
+        The root of the execution plan
+    """
+    root = PlanNode()
+    options = {option.name for option in fields(Rule)}
+    for path, spec in rules.items():
+        unknown = set(spec) - options
+        if unknown:
+            err = f"Unknown option {', '.join(sorted(unknown))} in the merge rule for {path}."
+            raise ValueError(err)
+        try:
+            action = Action(spec.get("action"))
+        except ValueError:
+            err = f"Unknown action {spec.get('action')!r} in the merge rule for {path}."
+            raise ValueError(err) from None
+        *parents, key = split_path(path)
+        node = root
+        for parent in parents:
+            node = node.children.setdefault(parent, PlanNode())
+        node.rules[key] = Rule(
+            action=action,
+            sort=bool(spec.get("sort", False)),
+            warn_unless_prefix=bool(spec.get("warn_unless_prefix", False)),
+        )
+    return root
+
+
+def apply_plan(
+    plan: PlanNode,
+    base: MutableMapping[str, Any],
+    repo: Mapping[str, Any],
+    new_table: Callable[[], MutableMapping[str, Any]],
+    path: str = "",
+) -> list[Msg]:
+    """Apply the execution plan to a document, in a single walk.
+
+    Works with both tomlkit documents and the plain data from tomllib.
+
+    Args:
+        plan: The execution plan for the table
+        base: The base table, updated to the desired table
+        repo: The repository table
+        new_table: Creates an empty table, used when the base is missing one
+        path: The dotted path of the table, for messages
+
+    Returns:
+        The messages for the user
+    """
+    messages: list[Msg] = []
+    for key, rule in plan.rules.items():
+        messages.extend(
+            _apply_rule(rule=rule, base=base, repo=repo, key=key, path=f"{path}{key}"),
+        )
+    for key, child in plan.children.items():
+        repo_table = repo.get(key, {})
+        if not isinstance(repo_table, dict):
+            continue
+        if key not in base:
+            if not repo_table:
+                continue
+            base[key] = new_table()
+        base_table = base[key]
+        if isinstance(base_table, dict):
+            messages.extend(
+                apply_plan(
+                    plan=child,
+                    base=base_table,
+                    repo=repo_table,
+                    new_table=new_table,
+                    path=f"{path}{key}.",
+                ),
+            )
+    return messages
+
+
+def _apply_rule(
+    rule: Rule,
+    base: MutableMapping[str, Any],
+    repo: Mapping[str, Any],
+    key: str,
+    path: str,
+) -> list[Msg]:
+    """Apply a single rule to a key of a table.
+
+    Args:
+        rule: The rule
+        base: The base table, updated to the desired table
+        repo: The repository table
+        key: The key in the table
+        path: The dotted path of the key, for messages
+
+    Returns:
+        The messages for the user
+    """
+    if key not in repo:
+        return _apply_missing(rule=rule, base=base, key=key, path=path)
+
+    messages: list[Msg] = []
+    if rule.action is Action.UNION:
+        base_table = base.get(key)
+        if isinstance(base_table, dict) and isinstance(repo[key], dict):
+            for repo_key, value in repo[key].items():
+                if repo_key not in base_table:
+                    base_table[repo_key] = value
+        else:
+            base.setdefault(key, repo[key])
+        return messages
+    if rule.action is Action.DROP_IF_MISSING:
+        return messages
+
+    if rule.warn_unless_prefix and not str(repo[key]).startswith(str(base.get(key, ""))):
+        msg = f"Check {path} manually."
+        messages.append(Msg(message=msg, prefix=Level.WARNING))
+    base[key] = repo[key]
+    if rule.sort and isinstance(base[key], list):
+        base[key].sort()
+    return messages
+
+
+def _apply_missing(rule: Rule, base: MutableMapping[str, Any], key: str, path: str) -> list[Msg]:
+    """Apply a single rule to a key missing from the repository table.
+
+    Args:
+        rule: The rule
+        base: The base table, updated to the desired table
+        key: The key in the table
+        path: The dotted path of the key, for messages
+
+    Returns:
+        The messages for the user
+    """
+    if rule.action is Action.REQUIRE:
+        msg = f"{path} not found in the repository, check manually."
+        return [Msg(message=msg, prefix=Level.ERROR)]
+    if rule.action is Action.DROP_IF_MISSING and key in base:
+        del base[key]
+        msg = f"{path} removed."
+        return [Msg(message=msg, prefix=Level.WARNING)]
+    return []
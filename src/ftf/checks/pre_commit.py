@@ -2,22 +2,52 @@
 
 from __future__ import annotations
 
+import collections
+import copy
+import fnmatch
 import io
 
-from typing import Unpack
+from typing import TYPE_CHECKING, Any, Unpack
+
+import yaml
 
 from ansiblelint.yaml_utils import FormattedYAML
 
-from ftf.checks.check_base import CheckBase, CheckBaseParams
-from ftf.settings import PRE_COMMIT
+from ftf.checks.check_base import CheckBase, CheckBaseParams, Evaluation
+from ftf.checks.diff_strategies import StructuralDiff
+from ftf.output import Level, Msg
+from ftf.tags import TagIndex
 from ftf.utils import (
+    content_hash,
     path_to_data_file,
 )
 
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+#: The C accelerated safe loader, falling back to the pure Python one
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_yaml(content: str) -> Any:  # noqa: ANN401
+    """Load YAML as plain data, with the libyaml loader if available.
+
+    Args:
+        content: The YAML content.
+
+    Returns:
+        The data.
+    """
+    return yaml.load(content, Loader=SafeLoader)  # noqa: S506
+
+
 class Check(CheckBase):
     """Check the pre-commit yaml file."""
 
+    diff_strategy = StructuralDiff(loader=load_yaml)
+
     def __init__(self: Check, **kwargs: Unpack[CheckBaseParams]) -> None:
         """Initialize the class.
 
@@ -28,6 +58,9 @@ class Check(CheckBase):
 
         self.base_file_content: str
         self.yaml: FormattedYAML
+        self._base_data: dict[str, Any]
+        self._keep: KeepRules
+        self._tags: TagIndex | None = None
 
     def run(self: Check) -> bool:
         """Run the check.
@@ -39,91 +72,34 @@ class Check(CheckBase):
         base_file_path = path_to_data_file(self.file_name)
         with base_file_path.open() as f:
             self.base_file_content = f.read()
-
-        for repo in self.repo_list:
-            self._current_repo = repo
-            self._each_repo()
+        self._base_data = load_yaml(self.base_file_content)
+        self._keep = KeepRules(rules=self.config.inventory.pre_commit_keep)
+        if self.config.args.update_revs:
+            self._tags = TagIndex(
+                config=self.config,
+                ttl=self.config.args.tag_ttl,
+                jobs=self.config.args.jobs,
+            )
+            self._tags.prefetch(uris=[pc_repo["repo"] for pc_repo in self._base_data["repos"]])
+        self._base_hash = content_hash(self.base_file_content)
+
+        self._check_repos(each=self._each_repo)
         return self._prs_made
 
-    def _each_repo(self: Check) -> None:  # noqa: C901, PLR0912
-        """Run the check for each repository.
-
-        Returns:
-            True if PRs were made, False otherwise.
-        """
-        base_data_content = self.yaml.load(self.base_file_content)
-
+    def _each_repo(self: Check) -> None:
+        """Run the check for each repository."""
         repo_file_path = self._current_repo.work_dir.joinpath(self.file_name)
         with repo_file_path.open() as f:
             repo_file_content = f.read()
-        repo_data_content = self.yaml.load(repo_file_content)
-
-        new_repo_list = []
-        expected_repos = []
-        for base_pc_repo in base_data_content["repos"]:
-            expected_repos.append(base_pc_repo["repo"])
-            pc_repo_uri = base_pc_repo["repo"]
-            found = [
-                pc_repo for pc_repo in repo_data_content["repos"] if pc_repo["repo"] == pc_repo_uri
-            ]
-            if len(found) > 1:
-                err = (
-                    f"[{self._current_repo.name}] Multiple entries for"
-                    " {pc_repo_uri} in {self.file_name}."
-                )
-                self.config.output.error(err)
-                continue
-
-            if not found:
-                err = (
-                    f"[{self._current_repo.name}] Entry not found for"
-                    " {pc_repo_uri} in {self.file_name}."
-                )
-                self.config.output.error(err)
-                found = [base_pc_repo]
-
-            if (
-                self._current_repo.name in PRE_COMMIT
-                and base_pc_repo["repo"] in PRE_COMMIT[self._current_repo.name]["skip"]
-            ):
-                new_repo_list.append(found[0])
-                continue
-
-            new_base = {
-                "repo": pc_repo_uri,
-                "rev": found[0]["rev"],
-                "hooks": base_pc_repo["hooks"],
-            }
-
-            if pc_repo_uri.endswith("mypy.git"):
-                uniq = "additional_dependencies"
-                new_base["hooks"][0][uniq] = found[0]["hooks"][0][uniq]
-
-            if pc_repo_uri.endswith("pylint.git"):
-                uniq = "additional_dependencies"
-                new_base["hooks"][0][uniq] = found[0]["hooks"][0][uniq]
-
-            new_repo_list.append(new_base)
-
-        if self._current_repo.name in PRE_COMMIT:
-            for skip in PRE_COMMIT[self._current_repo.name]["skip"]:
-                if skip in expected_repos:
-                    continue
-                found = [r for r in repo_data_content["repos"] if r["repo"] == skip]
-                if not found:
-                    err = (
-                        f"[{self._current_repo.name}] Entry not found for"
-                        f" {skip} in {self.file_name}."
-                    )
-                    self.config.output.error(err)
-                    continue
-                new_repo_list.append(found[0])
-
-        base_data_content["repos"] = new_repo_list
+        skips = self.config.inventory.pre_commit_skips.get(self._current_repo.name, frozenset())
 
-        buf = io.BytesIO()
-        self.yaml.dump(data=base_data_content, stream=buf)
-        new_content = buf.getvalue().decode()
+        evaluation = self._evaluate_memoized(
+            base_content=self.base_file_content,
+            repo_content=repo_file_content,
+            evaluate=lambda: self._evaluate(repo_file_content=repo_file_content, skips=skips),
+            variant=",".join(sorted(skips)),
+        )
+        new_content = evaluation.desired
 
         if self._compare(current=repo_file_content, desired=new_content):
             return
@@ -131,14 +107,246 @@ class Check(CheckBase):
         if self.config.args.dry_run:
             return
 
-        if not self._get_commit_msg():
-            return
+        self._propose(write=lambda: repo_file_path.write_text(new_content))
+
+    def _evaluate(
+        self: Check,
+        repo_file_content: str,
+        skips: frozenset[str],
+    ) -> Evaluation:
+        """Build the desired pre-commit file for a repository.
+
+        The merge is first applied to the plain data from the libyaml loader, if
+        the result is the same as the repository data, the repository file is
+        kept as is. Otherwise the merge is repeated on the round trip data to
+        preserve the formatting.
+
+        Args:
+            repo_file_content: The content of the repository file.
+            skips: The pre-commit repositories to keep as found in the repository.
 
-        self._make_branch()
+        Returns:
+            The evaluation.
+        """
+        base_data = copy.deepcopy(self._base_data)
+        repo_data = load_yaml(repo_file_content)
+        messages = merge(
+            base_data_content=base_data,
+            repo_data_content=repo_data,
+            skips=skips,
+            keep=self._keep,
+            file_name=self.file_name,
+            update_rev=self._tags.update_rev if self._tags else None,
+        )
+        if base_data == repo_data:
+            # The same once parsed, skip the round trip load and dump
+            return Evaluation(desired=repo_file_content, messages=messages)
 
-        repo_file_path.write_text(new_content)
-        self.config.output.debug(
-            f"[{self._current_repo.name}] Updated {self.file_name}.",
+        base_data_content = self.yaml.load(self.base_file_content)
+        repo_data_content = self.yaml.load(repo_file_content)
+        messages = merge(
+            base_data_content=base_data_content,
+            repo_data_content=repo_data_content,
+            skips=skips,
+            keep=self._keep,
+            file_name=self.file_name,
+            update_rev=self._tags.update_rev if self._tags else None,
         )
 
-        self._make_pr()
+        buf = io.BytesIO()
+        self.yaml.dump(data=base_data_content, stream=buf)
+        return Evaluation(desired=buf.getvalue().decode(), messages=messages)
+
+
+class KeepRules:
+    """The fields kept from the repository rather than taken from the template."""
+
+    def __init__(self: KeepRules, rules: dict[str, frozenset[str]]) -> None:
+        """Initialize the rules.
+
+        Args:
+            rules: The fields, keyed by a glob of the hook repository URI for the
+                fields of the repository entry, or <uri glob>#<hook id glob> for
+                the fields of the hooks.
+        """
+        self._repo_rules: list[tuple[str, frozenset[str]]] = []
+        self._hook_rules: list[tuple[str, str, frozenset[str]]] = []
+        for key, fields in rules.items():
+            uri, sep, hook_id = key.partition("#")
+            if sep:
+                self._hook_rules.append((uri, hook_id, fields))
+            else:
+                self._repo_rules.append((uri, fields))
+        self._repo_cache: dict[str, frozenset[str]] = {}
+        self._hook_cache: dict[tuple[str, str], frozenset[str]] = {}
+
+    def repo_fields(self: KeepRules, uri: str) -> frozenset[str]:
+        """Return the fields of a repository entry to keep.
+
+        Args:
+            uri: The hook repository URI.
+
+        Returns:
+            The fields to keep.
+        """
+        if uri not in self._repo_cache:
+            self._repo_cache[uri] = frozenset().union(
+                *(fields for glob, fields in self._repo_rules if fnmatch.fnmatchcase(uri, glob)),
+            )
+        return self._repo_cache[uri]
+
+    def hook_fields(self: KeepRules, uri: str, hook_id: str) -> frozenset[str]:
+        """Return the fields of a hook to keep.
+
+        Args:
+            uri: The hook repository URI.
+            hook_id: The hook id.
+
+        Returns:
+            The fields to keep.
+        """
+        key = (uri, hook_id)
+        if key not in self._hook_cache:
+            self._hook_cache[key] = frozenset().union(
+                *(
+                    fields
+                    for uri_glob, id_glob, fields in self._hook_rules
+                    if fnmatch.fnmatchcase(uri, uri_glob) and fnmatch.fnmatchcase(hook_id, id_glob)
+                ),
+            )
+        return self._hook_cache[key]
+
+
+def merge(  # noqa: PLR0913
+    base_data_content: dict[str, Any],
+    repo_data_content: dict[str, Any],
+    *,
+    skips: frozenset[str],
+    keep: KeepRules,
+    file_name: str,
+    update_rev: Callable[[str, str], str] | None = None,
+) -> list[Msg]:
+    """Merge the repository pre-commit repos into the base, in place.
+
+    Works with both the round trip data from ruamel and the plain data from
+    the safe loader. The repository entries are indexed by URI once, entries
+    repeated for the same URI are merged and hooks are matched by id, in
+    order for repeated ids.
+
+    Args:
+        base_data_content: The base data, updated to the desired data.
+        repo_data_content: The repository data.
+        skips: The pre-commit repositories to keep as found in the repository.
+        keep: The fields kept from the repository.
+        file_name: The name of the file, for messages.
+        update_rev: Picks the rev to update to from the URI and current rev, if any.
+
+    Returns:
+        The messages for the user.
+    """
+    messages: list[Msg] = []
+    index: dict[str, list[dict[str, Any]]] = {}
+    for pc_repo in repo_data_content["repos"]:
+        index.setdefault(pc_repo["repo"], []).append(pc_repo)
+
+    new_repo_list = []
+    for base_pc_repo in base_data_content["repos"]:
+        pc_repo_uri = base_pc_repo["repo"]
+        found = index.get(pc_repo_uri)
+        if not found:
+            err = f"Entry not found for {pc_repo_uri} in {file_name}."
+            messages.append(Msg(message=err, prefix=Level.ERROR))
+            messages.extend(_update_rev(base_pc_repo=base_pc_repo, update_rev=update_rev))
+            new_repo_list.append(base_pc_repo)
+            continue
+
+        if pc_repo_uri in skips:
+            new_repo_list.extend(found)
+            continue
+
+        messages.extend(
+            _keep_fields(base_pc_repo=base_pc_repo, found=found, keep=keep, file_name=file_name),
+        )
+        messages.extend(_update_rev(base_pc_repo=base_pc_repo, update_rev=update_rev))
+        new_repo_list.append(base_pc_repo)
+
+    expected_repos = {base_pc_repo["repo"] for base_pc_repo in base_data_content["repos"]}
+    for skip in sorted(skips - expected_repos):
+        if skip not in index:
+            err = f"Entry not found for {skip} in {file_name}."
+            messages.append(Msg(message=err, prefix=Level.ERROR))
+            continue
+        new_repo_list.extend(index[skip])
+
+    base_data_content["repos"] = new_repo_list
+    return messages
+
+
+def _keep_fields(
+    base_pc_repo: dict[str, Any],
+    found: list[dict[str, Any]],
+    keep: KeepRules,
+    file_name: str,
+) -> list[Msg]:
+    """Copy the fields to keep from the repository entries into a base entry.
+
+    Args:
+        base_pc_repo: The base entry, updated in place.
+        found: The repository entries with the same URI.
+        keep: The fields kept from the repository.
+        file_name: The name of the file, for messages.
+
+    Returns:
+        The messages for the user.
+    """
+    messages: list[Msg] = []
+    pc_repo_uri = base_pc_repo["repo"]
+    for field in sorted(keep.repo_fields(pc_repo_uri)):
+        values = [pc_repo[field] for pc_repo in found if field in pc_repo]
+        if not values:
+            continue
+        if any(value != values[0] for value in values):
+            msg = f"Entries for {pc_repo_uri} in {file_name} differ in {field}, using the first."
+            messages.append(Msg(message=msg, prefix=Level.WARNING))
+        base_pc_repo[field] = values[0]
+
+    hooks: dict[str, list[dict[str, Any]]] = {}
+    for pc_repo in found:
+        for hook in pc_repo.get("hooks", []):
+            hooks.setdefault(hook["id"], []).append(hook)
+    seen: collections.Counter[str] = collections.Counter()
+    for hook in base_pc_repo.get("hooks", []):
+        fields = keep.hook_fields(uri=pc_repo_uri, hook_id=hook["id"])
+        occurrence = seen[hook["id"]]
+        seen[hook["id"]] += 1
+        candidates = hooks.get(hook["id"], [])
+        if not fields or occurrence >= len(candidates):
+            continue
+        for field in sorted(fields):
+            if field in candidates[occurrence]:
+                hook[field] = candidates[occurrence][field]
+    return messages
+
+
+def _update_rev(
+    base_pc_repo: dict[str, Any],
+    update_rev: Callable[[str, str], str] | None,
+) -> list[Msg]:
+    """Update the rev of a base entry, in place.
+
+    Args:
+        base_pc_repo: The base entry.
+        update_rev: Picks the rev to update to from the URI and current rev, if any.
+
+    Returns:
+        The messages for the user.
+    """
+    if update_rev is None or "rev" not in base_pc_repo:
+        return []
+    current = str(base_pc_repo["rev"])
+    rev = update_rev(base_pc_repo["repo"], current)
+    if rev == current:
+        return []
+    base_pc_repo["rev"] = rev
+    msg = f"{base_pc_repo['repo']} rev updated from {current} to {rev}."
+    return [Msg(message=msg, prefix=Level.INFO)]
@@ -5,12 +5,18 @@ from __future__ import annotations
 from typing import Unpack
 
 from ftf.checks.check_base import CheckBase, CheckBaseParams
-from ftf.utils import ask_yes_no, tmp_file
+from ftf.checks.diff_strategies import SetDiff
+from ftf.extsort import sort_unique
+from ftf.report import Status
+from ftf.scratch import SCRATCH
+from ftf.utils import copy_file, tmp_file
 
 
 class Check(CheckBase):
     """Sort and lowercase a file."""
 
+    diff_strategy = SetDiff()
+
     def __init__(self: Check, **kwargs: Unpack[CheckBaseParams]) -> None:
         """Initialize the class.
 
@@ -27,46 +33,59 @@ class Check(CheckBase):
         Returns:
             True if PRs were made, False otherwise.
         """
-        for repo in self.repo_list:
-            self._current_repo = repo
-            self._each_repo()
+        self._check_repos(each=self._each_repo)
         return self._prs_made
 
     def _each_repo(self: Check) -> None:
         """Run the check for each repository."""
         repo_file_path = self._current_repo.work_dir / self.file_name
 
-        try:
-            orig_content = repo_file_path.read_text()
-        except FileNotFoundError:
+        if not repo_file_path.exists():
             msg = f"{self.file_name} not found in {self._current_repo.name}."
             self.config.output.warning(msg)
+            self._result.status = Status.SKIPPED
             input("Press Enter to continue...")
             return
 
-        revised_lines = sorted(
-            {line.lower() for line in orig_content.splitlines() if not line.startswith("#")},
+        revised_file_path = tmp_file()
+        sort_unique(
+            src=repo_file_path,
+            dest=revised_file_path,
+            transform=_lower_word,
+            tmp_dir=SCRATCH.directory,
         )
-        revised_content = "\n".join(revised_lines) + "\n"
 
-        if self._compare(current=orig_content, desired=revised_content):
+        if (
+            self._compare_files(current_path=repo_file_path, desired_path=revised_file_path)
+            or self.config.args.dry_run
+        ):
+            SCRATCH.release(revised_file_path)
             return
 
-        if self.config.args.dry_run:
-            return
+        self._propose(write=lambda: copy_file(src=revised_file_path, dest=repo_file_path))
+
+    def _ensure_commit_msg(self: Check, target: str) -> bool:  # noqa: ARG002
+        """Use the fixed commit message, no need to ask the user.
+
+        Args:
+            target: The name of the repository or repositories being updated.
 
+        Returns:
+            Always True, the commit message is fixed.
+        """
         if not hasattr(self, "commit_text_file"):
             self.commit_text_file = tmp_file()
             self.commit_text_file.write_text(self.commit_msg)
+        return True
 
-        q = f"Do you want to update the {self.file_name} file in {self._current_repo.name}?"
-        if not ask_yes_no(q):
-            return
 
-        self._make_branch()
+def _lower_word(line: str) -> str | None:
+    """Lowercase a line of the file, dropping comments.
 
-        repo_file_path.write_text(revised_content)
-        msg = f"[{self._current_repo.name}] Updated {self.file_name}."
-        self.config.output.info(msg)
+    Args:
+        line: The line
 
-        self._make_pr()
+    Returns:
+        The lowercased line, None for a comment
+    """
+    return None if line.startswith("#") else line.lower()
@@ -1,24 +1,57 @@
 """The cli entrypoint for the ftf package."""
 
+from __future__ import annotations
+
+import json
 import os
 import shutil
+import sqlite3
+import subprocess
 import sys
 
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from ftf.args import parse_args
+from ftf.args import (
+    parse_args,
+    parse_history_args,
+    parse_merge_reports_args,
+    parse_status_args,
+)
 from ftf.checks import full_file, pre_commit, py_project, sort_lower
 from ftf.config import Config
+from ftf.deadlines import LATENCY, deadline
+from ftf.history import (
+    RunHistory,
+    connect,
+    drift_frequency,
+    history_path,
+    regressions,
+    slowest_steps,
+)
+from ftf.inventory import Inventory
+from ftf.metrics import run_metrics, write_metrics
 from ftf.output import Output, TermFeatures
+from ftf.profiling import Profiler
+from ftf.pull_requests import PrIndex
 from ftf.repo import Repo
-from ftf.settings import FULL_FILES, REPOS, SORT_LOWER
+from ftf.report import merge_reports
+from ftf.scratch import SCRATCH, claim, collect_garbage
+from ftf.status import fleet_status, status_table
+from ftf.submit_queue import SubmitQueue
 from ftf.utils import (
     ask_yes_no,
+    format_size,
+    format_table,
     tmp_path,
     xdg_cache_home,
 )
 
 
+if TYPE_CHECKING:
+    from argparse import Namespace
+
+
 def fork_clone_all(config: Config, repo_list: list[Repo]) -> None:
     """Fork all the repositories.
 
@@ -27,15 +60,30 @@ def fork_clone_all(config: Config, repo_list: list[Repo]) -> None:
         repo_list: The list of repositories.
     """
     for repo in repo_list:
-        if config.args.check_forks:
-            shutil.rmtree(repo.work_dir, ignore_errors=True)
-            repo.clone_upstream()
-            repo.fork()
-            shutil.rmtree(repo.work_dir)
+        try:
+            with deadline(config.args.repo_timeout):
+                fork_clone(config, repo)
+        except subprocess.TimeoutExpired as exc:  # noqa: PERF203
+            repo.failed = f"{exc.cmd} timed out after {exc.timeout:.0f}s."
+            config.output.error(f"[{repo.name}] Sync failed, {repo.failed}")
+
 
-        repo.clone_origin()
-        repo.work_dir = config.tmp_path.joinpath(repo.name)
-        repo.ensure_main()
+def fork_clone(config: Config, repo: Repo) -> None:
+    """Fork and clone a repository, syncing its main branch with upstream.
+
+    Args:
+        config: The configuration data.
+        repo: The repository.
+    """
+    if config.args.check_forks:
+        shutil.rmtree(repo.work_dir, ignore_errors=True)
+        repo.clone_upstream()
+        repo.fork()
+        shutil.rmtree(repo.work_dir)
+
+    repo.clone_origin()
+    repo.work_dir = config.tmp_path.joinpath(repo.name)
+    repo.ensure_main()
 
 
 def reuse_or_new_tmp(new_temp: bool) -> Path:  # noqa: FBT001
@@ -69,42 +117,249 @@ def generate_repo_list(config: Config) -> list[Repo]:
         The list of repositories.
     """
     repo_list = []
-    for name, data in REPOS.items():
+    for name, data in config.inventory.repos.items():
         repo_list.append(
             Repo(
                 config=config,
                 name=name,
-                origin=data["origin"].format(origin_org=config.args.origin_org),
-                upstream=data["upstream"],
+                origin=data.origin.format(origin_org=config.args.origin_org),
+                upstream=data.upstream,
             ),
         )
     return repo_list
 
 
-def main() -> None:
-    """Load the configuration data file."""
-    args = parse_args()
-    term_features = TermFeatures(
+def load_inventory(args: Namespace, output: Output) -> Inventory:
+    """Load the inventory and reduce it to the selected repositories.
+
+    Args:
+        args: The parsed arguments.
+        output: The output object.
+
+    Returns:
+        The inventory.
+    """
+    if args.inventory:
+        try:
+            inventory = Inventory.from_file(Path(args.inventory))
+        except (OSError, TypeError, ValueError) as exc:
+            output.critical(f"Unable to load the inventory: {exc}")
+    else:
+        inventory = Inventory.from_settings()
+    inventory = inventory.select(select=args.select, exclude=args.exclude)
+    if args.shard:
+        inventory = inventory.shard(*args.shard)
+    if not inventory.repos:
+        output.critical("No repositories selected.")
+    return inventory
+
+
+def term_features_from_args(args: Namespace) -> TermFeatures:
+    """Determine the terminal features.
+
+    Args:
+        args: The parsed arguments.
+
+    Returns:
+        The terminal features.
+    """
+    return TermFeatures(
         color=False if os.environ.get("NO_COLOR") else not args.no_ansi,
         links=not args.no_ansi,
     )
+
+
+def merge_reports_main(argv: list[str]) -> None:
+    """Merge the reports of multiple runs into a fleet summary.
+
+    Args:
+        argv: The arguments following the command name.
+    """
+    args = parse_merge_reports_args(argv)
+    output = Output(
+        log_file="",
+        log_level="notset",
+        log_append="true",
+        term_features=term_features_from_args(args),
+        verbosity=args.verbose,
+    )
+    try:
+        summary = merge_reports(
+            paths=[Path(report) for report in args.reports],
+            merged=Path(args.merged) if args.merged else None,
+        )
+    except (OSError, KeyError, ValueError) as exc:
+        output.critical(f"Unable to merge the reports: {exc}")
+
+    if args.summary:
+        Path(args.summary).write_text(json.dumps(summary, indent=2) + "\n")
+        output.info(f"Fleet summary written to {args.summary}")
+    output.info(
+        f"Merged {summary['reports']} reports, {summary['results']} results,"
+        f" {summary['prs']} PRs, longest run {summary['duration']:.1f}s.",
+    )
+    for name, check in summary["checks"].items():
+        counts = ", ".join(f"{key} {value}" for key, value in check.items() if key != "duration")
+        output.info(f"{name}: {counts} ({check['duration']:.1f}s)")
+    for name, phase in summary["phases"].items():
+        output.info(f"Phase {name}: total {phase['total']:.1f}s, longest {phase['max']:.1f}s")
+
+
+def history_main(argv: list[str]) -> None:
+    """Report the trends and regressions of the runs saved in the local history.
+
+    Args:
+        argv: The arguments following the command name.
+    """
+    args = parse_history_args(argv)
+    output = Output(
+        log_file="",
+        log_level="notset",
+        log_append="true",
+        term_features=term_features_from_args(args),
+        verbosity=args.verbose,
+    )
+    path = history_path()
+    if not path.exists():
+        output.warning(f"No runs saved in {path} yet.")
+        return
+    runs = max(1, args.runs)
+    try:
+        with connect(path) as conn:
+            sections = (
+                (
+                    f"Slowest steps over the last {runs} runs:",
+                    ("Check", "Repository", "Runs", "Mean", "Max"),
+                    slowest_steps(conn=conn, runs=runs, top=args.top),
+                ),
+                (
+                    f"Most drifted files over the last {runs} runs:",
+                    ("File", "Drifted", "Checked", "Rate", "Repositories"),
+                    drift_frequency(conn=conn, runs=runs, top=args.top),
+                ),
+                (
+                    f"Regressions of the latest run against the median of the {runs} before it:",
+                    ("Step", "Baseline", "Latest", "Change"),
+                    regressions(
+                        conn=conn,
+                        runs=runs,
+                        threshold=args.threshold / 100,
+                        min_seconds=args.min_seconds,
+                    ),
+                ),
+            )
+    except sqlite3.Error as exc:
+        output.critical(f"Unable to read the history: {exc}")
+    for title, header, rows in sections:
+        output.info(title)
+        print("\n".join(format_table([header, *rows])) if rows else "  None")  # noqa: T201
+
+
+def status_main(argv: list[str]) -> None:
+    """Show the state of the fleet without cloning any repository.
+
+    Args:
+        argv: The arguments following the command name.
+    """
+    args = parse_status_args(argv)
+    output = Output(
+        log_file="",
+        log_level="notset",
+        log_append="true",
+        term_features=term_features_from_args(args),
+        verbosity=args.verbose,
+    )
+    config = Config(
+        args=args,
+        editor="",
+        inventory=load_inventory(args=args, output=output),
+        output=output,
+        tmp_path=xdg_cache_home(),
+    )
+    repo_list = generate_repo_list(config=config)
+    statuses = fleet_status(
+        repo_list=repo_list,
+        jobs=max(1, args.jobs),
+        pr_ttl=args.pr_ttl,
+        with_prs=args.prs,
+    )
+    print("\n".join(status_table(statuses)))  # noqa: T201
+    out_of_sync = sum(status.sync != "in sync" for status in statuses)
+    output.info(f"{out_of_sync} of {len(statuses)} forks are not in sync with upstream.")
+
+
+COMMANDS = {
+    "history": history_main,
+    "merge-reports": merge_reports_main,
+    "status": status_main,
+}
+
+
+def load_config(args: Namespace) -> Config:
+    """Set up the output, temporary directory and inventory of a fleet run.
+
+    Args:
+        args: The parsed arguments.
+
+    Returns:
+        The configuration data.
+    """
     output = Output(
         log_file=args.log_file,
         log_level=args.log_level,
         log_append=args.log_append,
-        term_features=term_features,
+        term_features=term_features_from_args(args),
         verbosity=args.verbose,
+        log_max_bytes=args.log_max_bytes,
+        log_backups=args.log_backups,
     )
 
     _tmp_path = reuse_or_new_tmp(new_temp=args.new_temp)
     output.info(f"Using temporary directory {_tmp_path}")
+    claim(_tmp_path)
+    reclaimed = collect_garbage(
+        keep=[_tmp_path, SCRATCH.directory],
+        max_age=args.tmp_max_age * 86400,
+        max_size=int(args.tmp_max_size * 2**30),
+    )
+    if reclaimed.paths:
+        output.info(
+            f"Removed {len(reclaimed.paths)} temporary files and directories of earlier"
+            f" sessions, reclaiming {format_size(reclaimed.size)}.",
+        )
+    inventory = load_inventory(args=args, output=output)
+    output.info(f"Selected {len(inventory.repos)} repositories.")
     editor = os.environ.get("EDITOR", "vi")
     config = Config(
         args=args,
         editor=editor,
+        inventory=inventory,
         output=output,
         tmp_path=_tmp_path,
+        report_path=Path(args.report) if args.report else None,
+        submit_queue=SubmitQueue(rate=args.submit_rate, max_jobs=args.jobs),
     )
+    if not args.no_history:
+        config.report.history = RunHistory(path=history_path())
+    if args.profile:
+        config.report.profiler = Profiler(
+            directory=Path(args.profile),
+            top=args.profile_top,
+            memory=args.profile_memory,
+        )
+    return config
+
+
+def main() -> None:
+    """Load the configuration data file."""
+    if len(sys.argv) > 1 and sys.argv[1] in COMMANDS:
+        COMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
+    args = parse_args()
+    config = load_config(args)
+    output = config.output
+    inventory = config.inventory
     repo_list = generate_repo_list(config=config)
 
     output.info(f"The current session ID is {config.session_id}.")
@@ -117,24 +372,29 @@ def main() -> None:
         return
     try:
         q = "PRs have been made. Do you want to continue with the next file?"
-        fork_clone_all(config, repo_list)
-        for file_name, file_data in FULL_FILES.items():
+        with config.report.phase("sync"):
+            fork_clone_all(config, repo_list)
+        with config.report.phase("pr_index"):
+            config.pr_index = PrIndex.fetch(repos=repo_list, config=config)
+        for file_name, skip in inventory.full_files.items():
             cls_full_file = full_file.Check(
                 file_name=file_name,
                 config=config,
                 repo_list=repo_list,
             )
-            changed = cls_full_file.run(file_data=file_data)
+            with config.report.phase(cls_full_file.check_name):
+                changed = cls_full_file.run(skip=skip)
             if changed and not ask_yes_no(q):
                 sys.exit(0)
 
-        for file_name in SORT_LOWER:
+        for file_name in inventory.sort_lower:
             cls_sort_lower = sort_lower.Check(
                 file_name=file_name,
                 config=config,
                 repo_list=repo_list,
             )
-            changed = cls_sort_lower.run()
+            with config.report.phase(cls_sort_lower.check_name):
+                changed = cls_sort_lower.run()
             if changed and not ask_yes_no(q):
                 sys.exit(0)
 
@@ -143,7 +403,8 @@ def main() -> None:
             config=config,
             repo_list=repo_list,
         )
-        changed = cls_pre_commit.run()
+        with config.report.phase(cls_pre_commit.check_name):
+            changed = cls_pre_commit.run()
         if changed and not ask_yes_no(q):
             sys.exit(0)
 
@@ -152,7 +413,8 @@ def main() -> None:
             config=config,
             repo_list=repo_list,
         )
-        changed = cls_pyproject.run()
+        with config.report.phase(cls_pyproject.check_name):
+            changed = cls_pyproject.run()
         if changed and not ask_yes_no(q):
             sys.exit(0)
 
@@ -160,6 +422,34 @@ def main() -> None:
         print("/n")  # noqa: T201
         output.warning("Dirty exit. Some operations may not have completed.")
         return
+    finally:
+        finish_run(config)
+
+
+def finish_run(config: Config) -> None:
+    """Show the command latencies and profile, write the metrics and close the report.
+
+    Args:
+        config: The configuration data.
+    """
+    table = LATENCY.table()
+    if table:
+        config.output.info("Command latencies:")
+        print("\n".join(table))  # noqa: T201
+        config.report.latency(LATENCY.summary())
+    profiler = config.report.profiler
+    if profiler is not None:
+        summary = profiler.summary()
+        if summary:
+            paths = profiler.save()
+            config.output.info(f"Wrote {len(paths)} phase profiles to {profiler.directory}")
+            print("\n".join(summary))  # noqa: T201
+    if config.args.metrics_file:
+        write_metrics(path=Path(config.args.metrics_file), metrics=run_metrics(config))
+    try:
+        config.report.close()
+    except sqlite3.Error as exc:
+        config.output.warning(f"Unable to save the run to the history: {exc}")
 
 
 if __name__ == "__main__":
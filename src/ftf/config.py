@@ -4,14 +4,19 @@ from __future__ import annotations
 
 import datetime
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import TYPE_CHECKING
 
+from ftf.pull_requests import PrIndex
+from ftf.report import Report
+from ftf.submit_queue import SubmitQueue
+
 
 if TYPE_CHECKING:
     from argparse import Namespace
     from pathlib import Path
 
+    from ftf.inventory import Inventory
     from ftf.output import Output
 
 
@@ -21,12 +26,22 @@ class Config:
 
     args: Namespace
     editor: str
+    inventory: Inventory
     output: Output
     tmp_path: Path
+    report_path: Path | None = None
     session_id: str = ""
+    report: Report = field(init=False)
+    pr_index: PrIndex = field(default_factory=PrIndex)
+    submit_queue: SubmitQueue = field(default_factory=SubmitQueue)
 
     def __post_init__(self: Config) -> None:
         """Post initialization."""
         self.session_id = datetime.datetime.now(datetime.timezone.utc).strftime(
             "%y%m%d-%H%M%S",
         )
+        self.report = Report(
+            path=self.report_path,
+            session_id=self.session_id,
+            shard=self.args.shard,
+        )
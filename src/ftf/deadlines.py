@@ -0,0 +1,209 @@
+"""Deadlines for the commands run, per command and per repository, and their latencies."""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import subprocess
+import threading
+import time
+
+from typing import TYPE_CHECKING
+
+from ftf.settings import COMMAND_TIMEOUTS
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+#: The monotonic time by which the commands for the current repository must complete
+_DEADLINE: contextvars.ContextVar[float | None] = contextvars.ContextVar(
+    "deadline",
+    default=None,
+)
+
+
+def command_type(command: str) -> str:
+    """Return the type of a command, the longest matching prefix in the timeouts.
+
+    Args:
+        command: The command
+
+    Returns:
+        The command type, e.g. git clone, or the program if no prefix matches
+    """
+    words = command.split()
+    for length in range(len(words), 0, -1):
+        prefix = " ".join(words[:length])
+        if prefix in COMMAND_TIMEOUTS:
+            return prefix
+    return words[0] if words else ""
+
+
+def command_timeout(command: str) -> float | None:
+    """Return the seconds a command may run, the sooner of its own and the repository deadline.
+
+    Args:
+        command: The command
+
+    Raises:
+        subprocess.TimeoutExpired: If the repository deadline has already passed
+
+    Returns:
+        The timeout in seconds, None if the command may run forever
+    """
+    timeout = COMMAND_TIMEOUTS.get(command_type(command), COMMAND_TIMEOUTS.get(""))
+    deadline_at = _DEADLINE.get()
+    if deadline_at is None:
+        return timeout
+    remaining = deadline_at - time.monotonic()
+    if remaining <= 0:
+        raise subprocess.TimeoutExpired(cmd=command, timeout=0)
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+@contextlib.contextmanager
+def deadline(seconds: float | None) -> Iterator[None]:
+    """Set a deadline for all the commands run within the context.
+
+    Nested deadlines never extend an outer one.
+
+    Args:
+        seconds: The seconds from now, None for no deadline
+
+    Yields:
+        Nothing
+    """
+    current = _DEADLINE.get()
+    deadline_at = current
+    if seconds is not None:
+        deadline_at = time.monotonic() + seconds
+        if current is not None:
+            deadline_at = min(current, deadline_at)
+    token = _DEADLINE.set(deadline_at)
+    try:
+        yield
+    finally:
+        _DEADLINE.reset(token)
+
+
+class LatencyStats:
+    """The durations of the commands run, by command type."""
+
+    def __init__(self: LatencyStats) -> None:
+        """Initialize the stats."""
+        self._durations: dict[str, list[float]] = {}
+        self._timeouts: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self: LatencyStats, command: str, seconds: float, timed_out: bool) -> None:  # noqa: FBT001
+        """Record the duration of a command.
+
+        Args:
+            command: The command
+            seconds: The duration in seconds
+            timed_out: Whether the command was killed when its timeout expired
+        """
+        kind = command_type(command)
+        with self._lock:
+            self._durations.setdefault(kind, []).append(seconds)
+            if timed_out:
+                self._timeouts[kind] = self._timeouts.get(kind, 0) + 1
+
+    def summary(self: LatencyStats) -> dict[str, dict[str, float]]:
+        """Summarize the durations by command type.
+
+        Returns:
+            The count, timeouts and the p50, p95, p99 and max durations of each type
+        """
+        with self._lock:
+            durations = {kind: sorted(values) for kind, values in self._durations.items()}
+            timeouts = dict(self._timeouts)
+        return {
+            kind: {
+                "count": len(values),
+                "timeouts": timeouts.get(kind, 0),
+                "p50": _percentile(values, 50),
+                "p95": _percentile(values, 95),
+                "p99": _percentile(values, 99),
+                "max": values[-1],
+            }
+            for kind, values in sorted(durations.items())
+        }
+
+    def histogram(
+        self: LatencyStats,
+        buckets: tuple[float, ...],
+    ) -> dict[str, tuple[list[int], float, int]]:
+        """Count the durations into cumulative buckets by command type.
+
+        Args:
+            buckets: The ascending upper bounds of the buckets, in seconds
+
+        Returns:
+            The cumulative count for each bucket, the sum and the count of each type
+        """
+        with self._lock:
+            durations = {kind: list(values) for kind, values in self._durations.items()}
+        return {
+            kind: (
+                [sum(value <= bound for value in values) for bound in buckets],
+                sum(values),
+                len(values),
+            )
+            for kind, values in sorted(durations.items())
+        }
+
+    def timeouts(self: LatencyStats) -> dict[str, int]:
+        """Return the number of commands killed on timeout by command type.
+
+        Returns:
+            The timeouts of each type that had any
+        """
+        with self._lock:
+            return dict(sorted(self._timeouts.items()))
+
+    def table(self: LatencyStats) -> list[str]:
+        """Format the summary as a table.
+
+        Returns:
+            The lines of the table, empty if no commands were run
+        """
+        summary = self.summary()
+        if not summary:
+            return []
+        rows: list[tuple[str, ...]] = [
+            ("Command", "Count", "Timeouts", "p50", "p95", "p99", "Max"),
+        ]
+        rows.extend(
+            (
+                kind,
+                str(int(stats["count"])),
+                str(int(stats["timeouts"])),
+                *(f"{stats[key]:.2f}s" for key in ("p50", "p95", "p99", "max")),
+            )
+            for kind, stats in summary.items()
+        )
+        # Imported here, utils runs its commands under the deadlines
+        from ftf.utils import format_table  # noqa: PLC0415
+
+        return format_table(rows)
+
+
+def _percentile(values: list[float], percent: int) -> float:
+    """Return a percentile of sorted values, by the nearest rank.
+
+    Args:
+        values: The sorted values, not empty
+        percent: The percentile
+
+    Returns:
+        The value at the percentile
+    """
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[rank - 1]
+
+
+#: The latencies of all the commands run in this process
+LATENCY = LatencyStats()
@@ -0,0 +1,141 @@
+"""An external memory sort, for files larger than the memory available."""
+
+from __future__ import annotations
+
+import contextlib
+import heapq
+import operator
+import tempfile
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+
+
+#: The approximate memory, in bytes, used to sort a run before spilling it to disk
+DEFAULT_MEMORY = 64 * 1024 * 1024
+#: The most runs merged at once, more are merged in several passes
+MAX_FAN_IN = 64
+#: The approximate memory used by a str object in addition to its characters
+STR_OVERHEAD = 64
+
+#: Compare run lines without their newline, so the order matches sorted()
+_WITHOUT_NEWLINE = operator.itemgetter(slice(None, -1))
+
+
+def sort_unique(
+    src: Path,
+    dest: Path,
+    transform: Callable[[str], str | None],
+    max_memory: int = DEFAULT_MEMORY,
+    tmp_dir: Path | None = None,
+) -> None:
+    """Sort the lines of a file and remove duplicates, in bounded memory.
+
+    The lines are read in runs that fit in memory, each run is sorted and
+    spilled to disk, then the runs are merged, dropping duplicates, straight
+    into the destination. A file that fits in a single run is never spilled.
+
+    Args:
+        src: The file to sort
+        dest: The file to write the sorted lines to
+        transform: Applied to each line without its newline, None drops the line
+        max_memory: The approximate memory, in bytes, used for a single run
+        tmp_dir: The directory for the spilled runs, the system default if None
+    """
+    with tempfile.TemporaryDirectory(prefix="ftf_sort_", dir=tmp_dir) as work_dir:
+        runs = _spill_runs(
+            src=src,
+            dest=dest,
+            transform=transform,
+            max_memory=max_memory,
+            work_dir=Path(work_dir),
+        )
+        if not runs:
+            return
+        passes = 0
+        while len(runs) > MAX_FAN_IN:
+            passes += 1
+            merged = []
+            for index in range(0, len(runs), MAX_FAN_IN):
+                merged_run = Path(work_dir) / f"merge_{passes}_{index}"
+                _merge(runs=runs[index : index + MAX_FAN_IN], dest=merged_run)
+                merged.append(merged_run)
+            runs = merged
+        _merge(runs=runs, dest=dest)
+
+
+def _spill_runs(
+    src: Path,
+    dest: Path,
+    transform: Callable[[str], str | None],
+    max_memory: int,
+    work_dir: Path,
+) -> list[Path]:
+    """Read the file in runs, sort and deduplicate each and spill it to disk.
+
+    Args:
+        src: The file to sort
+        dest: The destination, written directly if the file fits in a single run
+        transform: Applied to each line without its newline, None drops the line
+        max_memory: The approximate memory, in bytes, used for a single run
+        work_dir: The directory for the spilled runs
+
+    Returns:
+        The spilled runs, empty if the destination was written directly
+    """
+    runs: list[Path] = []
+    run: set[str] = set()
+    size = 0
+    with src.open() as src_f:
+        for line in src_f:
+            value = transform(line.removesuffix("\n"))
+            if value is None or value in run:
+                continue
+            run.add(value)
+            size += len(value) + STR_OVERHEAD
+            if size >= max_memory:
+                runs.append(work_dir / f"run_{len(runs)}")
+                _write_lines(path=runs[-1], lines=sorted(run))
+                run = set()
+                size = 0
+    if not runs:
+        _write_lines(path=dest, lines=sorted(run))
+        return []
+    if run:
+        runs.append(work_dir / f"run_{len(runs)}")
+        _write_lines(path=runs[-1], lines=sorted(run))
+    return runs
+
+
+def _merge(runs: list[Path], dest: Path) -> None:
+    """Merge sorted runs into a single sorted file, dropping duplicates.
+
+    Args:
+        runs: The sorted runs
+        dest: The file to write the merged lines to
+    """
+    with contextlib.ExitStack() as stack:
+        streams = [stack.enter_context(run.open()) for run in runs]
+        dest_f = stack.enter_context(dest.open(mode="w"))
+        previous = None
+        for line in heapq.merge(*streams, key=_WITHOUT_NEWLINE):
+            if line != previous:
+                dest_f.write(line)
+                previous = line
+    for run in runs:
+        run.unlink()
+
+
+def _write_lines(path: Path, lines: Iterable[str]) -> None:
+    """Write lines to a file, each followed by a newline.
+
+    Args:
+        path: The file
+        lines: The lines
+    """
+    with path.open(mode="w") as f:
+        f.writelines(f"{line}\n" for line in lines)
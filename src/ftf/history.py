@@ -0,0 +1,270 @@
+"""A local SQLite history of the runs, for trend and regression queries."""
+
+from __future__ import annotations
+
+import contextlib
+import sqlite3
+import statistics
+
+from typing import TYPE_CHECKING
+
+from ftf.utils import xdg_cache_home
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+    from ftf.report import CheckResult
+
+
+#: The version of the database schema, stored as the user_version
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL,
+    shard TEXT NOT NULL,
+    started REAL NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    repo TEXT NOT NULL,
+    check_name TEXT NOT NULL,
+    file TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration REAL NOT NULL,
+    pr_url TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS phases (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    duration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_started ON runs (started);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+CREATE INDEX IF NOT EXISTS results_step ON results (check_name, repo, run_id);
+CREATE INDEX IF NOT EXISTS results_file ON results (file, status);
+CREATE INDEX IF NOT EXISTS phases_name ON phases (name, run_id);
+"""
+
+
+def history_path() -> Path:
+    """Return the path to the history database.
+
+    Returns:
+        The path in the cache directory
+    """
+    return xdg_cache_home() / "history.sqlite3"
+
+
+@contextlib.contextmanager
+def connect(path: Path) -> Iterator[sqlite3.Connection]:
+    """Open the history database, creating the schema if needed.
+
+    Args:
+        path: The path to the database
+
+    Raises:
+        sqlite3.DatabaseError: If the database is from a newer version of ftf
+
+    Yields:
+        The connection, committed on success and rolled back on error
+    """
+    conn = sqlite3.connect(path, timeout=30)
+    try:
+        conn.execute("PRAGMA foreign_keys = ON")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version > SCHEMA_VERSION:
+            err = f"{path} is history schema version {version}, {SCHEMA_VERSION} is supported."
+            raise sqlite3.DatabaseError(err)
+        conn.executescript(_SCHEMA)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+
+class RunHistory:
+    """Collects the results of a run, saved to the history in one transaction."""
+
+    def __init__(self: RunHistory, path: Path) -> None:
+        """Initialize the history of the run.
+
+        Args:
+            path: The path to the history database
+        """
+        self.path = path
+        self._results: list[tuple[str, str, str, str, float, str]] = []
+        self._phases: list[tuple[str, float]] = []
+
+    def add_result(self: RunHistory, result: CheckResult) -> None:
+        """Add the result of a check for a repository.
+
+        Args:
+            result: The result
+        """
+        self._results.append(
+            (
+                result.repo,
+                result.check,
+                result.file,
+                result.status.value,
+                result.duration,
+                result.pr_url,
+            ),
+        )
+
+    def add_phase(self: RunHistory, name: str, duration: float) -> None:
+        """Add the duration of a phase.
+
+        Args:
+            name: The name of the phase
+            duration: The duration in seconds
+        """
+        self._phases.append((name, duration))
+
+    def save(
+        self: RunHistory,
+        session_id: str,
+        shard: str,
+        started: float,
+        duration: float,
+    ) -> None:
+        """Save the run, nothing is saved if no phase or result was added.
+
+        Args:
+            session_id: The session ID of the run
+            shard: The shard of the run, empty if not sharded
+            started: The time the run started
+            duration: The duration of the run in seconds
+        """
+        if not self._results and not self._phases:
+            return
+        with connect(self.path) as conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (session_id, shard, started, duration) VALUES (?, ?, ?, ?)",
+                (session_id, shard, started, duration),
+            )
+            run_id = cursor.lastrowid
+            conn.executemany(
+                "INSERT INTO results (run_id, repo, check_name, file, status, duration, pr_url)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, *result) for result in self._results],
+            )
+            conn.executemany(
+                "INSERT INTO phases (run_id, name, duration) VALUES (?, ?, ?)",
+                [(run_id, *phase) for phase in self._phases],
+            )
+        self._results = []
+        self._phases = []
+
+
+def slowest_steps(conn: sqlite3.Connection, runs: int, top: int) -> list[tuple[str, ...]]:
+    """Find the slowest check and repository pairs over the recent runs.
+
+    Args:
+        conn: The connection to the history
+        runs: The number of recent runs considered
+        top: The number of steps returned
+
+    Returns:
+        The check, repository, runs, mean and max duration of each step, slowest first
+    """
+    rows = conn.execute(
+        "SELECT check_name, repo, COUNT(*), AVG(duration), MAX(duration) FROM results"
+        " WHERE run_id IN (SELECT id FROM runs ORDER BY started DESC LIMIT ?)"
+        " GROUP BY check_name, repo ORDER BY AVG(duration) DESC LIMIT ?",
+        (runs, top),
+    )
+    return [
+        (check, repo, str(count), f"{mean:.2f}s", f"{longest:.2f}s")
+        for check, repo, count, mean, longest in rows
+    ]
+
+
+def drift_frequency(conn: sqlite3.Connection, runs: int, top: int) -> list[tuple[str, ...]]:
+    """Find the files needing updates most often over the recent runs.
+
+    Args:
+        conn: The connection to the history
+        runs: The number of recent runs considered
+        top: The number of files returned
+
+    Returns:
+        The file, drifted count, checks, rate and repositories of each file, most drifted first
+    """
+    rows = conn.execute(
+        "SELECT file, SUM(status IN ('drift', 'updated')) AS drifted, COUNT(*),"
+        " COUNT(DISTINCT CASE WHEN status IN ('drift', 'updated') THEN repo END)"
+        " FROM results"
+        " WHERE run_id IN (SELECT id FROM runs ORDER BY started DESC LIMIT ?)"
+        " GROUP BY file HAVING drifted > 0 ORDER BY drifted DESC, file LIMIT ?",
+        (runs, top),
+    )
+    return [
+        (file, str(drifted), str(total), f"{drifted / total:.0%}", str(repos))
+        for file, drifted, total, repos in rows
+    ]
+
+
+def regressions(
+    conn: sqlite3.Connection,
+    runs: int,
+    threshold: float,
+    min_seconds: float,
+) -> list[tuple[str, ...]]:
+    """Compare the latest run to the median of the runs before it.
+
+    Args:
+        conn: The connection to the history
+        runs: The number of runs before the latest forming the baseline
+        threshold: The fraction slower than the baseline reported, e.g. 0.25
+        min_seconds: The smallest slowdown in seconds reported
+
+    Returns:
+        The step, baseline, latest duration and change of each regression, worst first
+    """
+    run_ids = [
+        row[0]
+        for row in conn.execute("SELECT id FROM runs ORDER BY started DESC LIMIT ?", (runs + 1,))
+    ]
+    if len(run_ids) < 2:  # noqa: PLR2004
+        return []
+    latest, baseline_ids = run_ids[0], run_ids[1:]
+    placeholders = ", ".join("?" * len(run_ids))
+    steps: dict[str, dict[int, float]] = {}
+    # Only the placeholders are formatted into the query, the run IDs are bound
+    query = (
+        "SELECT 'phase ' || name, run_id, SUM(duration) FROM phases"  # noqa: S608
+        f" WHERE run_id IN ({placeholders}) GROUP BY name, run_id"
+        " UNION ALL"
+        " SELECT check_name || ' ' || repo, run_id, SUM(duration) FROM results"
+        f" WHERE run_id IN ({placeholders}) GROUP BY check_name, repo, run_id"
+    )
+    for step, run_id, duration in conn.execute(query, (*run_ids, *run_ids)):
+        steps.setdefault(step, {})[run_id] = duration
+
+    found = []
+    for step, durations in steps.items():
+        baseline_values = [durations[run_id] for run_id in baseline_ids if run_id in durations]
+        if latest not in durations or not baseline_values:
+            continue
+        baseline = statistics.median(baseline_values)
+        current = durations[latest]
+        if current - baseline >= min_seconds and current > baseline * (1 + threshold):
+            found.append((current - baseline, step, baseline, current))
+    found.sort(reverse=True)
+    return [
+        (
+            step,
+            f"{baseline:.2f}s",
+            f"{current:.2f}s",
+            f"+{current - baseline:.2f}s"
+            + (f" ({current / baseline - 1:+.0%})" if baseline else ""),
+        )
+        for _, step, baseline, current in found
+    ]
@@ -0,0 +1,328 @@
+"""The fleet inventory, the repositories managed and the per file exceptions."""
+
+from __future__ import annotations
+
+import fnmatch
+
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+import yaml
+
+from ftf.settings import (
+    FULL_FILES,
+    PRE_COMMIT,
+    PRE_COMMIT_KEEP,
+    PY_PROJECT,
+    REPOS,
+    SORT_LOWER,
+)
+from ftf.utils import content_hash, load_toml_file
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    from ftf.utils import JSONVal
+
+
+TAG_PREFIX = "tag:"
+
+
+@dataclass(frozen=True, slots=True)
+class RepoEntry:
+    """A repository in the inventory."""
+
+    #: The short name of the repository, used as the work directory name
+    name: str
+    #: The origin (fork) of the repository, may contain {origin_org}
+    origin: str
+    #: The upstream repository
+    upstream: str
+    #: Tags used to select groups of repositories
+    tags: frozenset[str] = frozenset()
+
+    def matches(self: RepoEntry, pattern: str) -> bool:
+        """Determine if the repository matches a pattern.
+
+        Args:
+            pattern: A glob pattern for the name, or tag:<glob> for the tags
+
+        Returns:
+            True if the repository matches the pattern
+        """
+        if pattern.startswith(TAG_PREFIX):
+            tag_pattern = pattern[len(TAG_PREFIX) :]
+            return any(fnmatch.fnmatchcase(tag, tag_pattern) for tag in self.tags)
+        return fnmatch.fnmatchcase(self.name, pattern)
+
+
+@dataclass
+class Inventory:
+    """The fleet inventory."""
+
+    #: The repositories, indexed by name
+    repos: dict[str, RepoEntry]
+    #: The full files, indexed by file name, with the repositories to skip
+    full_files: dict[str, frozenset[str]] = field(default_factory=dict)
+    #: The files to sort and lowercase
+    sort_lower: tuple[str, ...] = ()
+    #: The pre-commit repositories to leave untouched, indexed by repository name
+    pre_commit_skips: dict[str, frozenset[str]] = field(default_factory=dict)
+    #: The pre-commit fields kept from the repository, indexed by URI glob or URI glob#hook id
+    pre_commit_keep: dict[str, frozenset[str]] = field(default_factory=dict)
+    #: The pyproject.toml merge rules, indexed by dotted path
+    py_project_rules: dict[str, dict[str, JSONVal]] = field(default_factory=dict)
+
+    @classmethod
+    def from_settings(cls: type[Inventory]) -> Inventory:
+        """Build the inventory from the built-in settings.
+
+        Returns:
+            The inventory
+        """
+        return cls(
+            repos={
+                name: RepoEntry(name=name, origin=data["origin"], upstream=data["upstream"])
+                for name, data in REPOS.items()
+            },
+            full_files={name: frozenset(data.get("skip", [])) for name, data in FULL_FILES.items()},
+            sort_lower=tuple(SORT_LOWER),
+            pre_commit_skips={
+                name: frozenset(data.get("skip", [])) for name, data in PRE_COMMIT.items()
+            },
+            pre_commit_keep={key: frozenset(fields) for key, fields in PRE_COMMIT_KEEP.items()},
+            py_project_rules={path: dict(rule) for path, rule in PY_PROJECT.items()},
+        )
+
+    @classmethod
+    def from_file(cls: type[Inventory], path: Path) -> Inventory:
+        """Load the inventory from a TOML or YAML file.
+
+        Sections missing from the file fall back to the built-in settings.
+
+        Args:
+            path: The path to the inventory file
+
+        Raises:
+            TypeError: If a section of the inventory file has the wrong type
+            ValueError: If the inventory file has no valid repositories
+
+        Returns:
+            The inventory
+        """
+        if path.suffix in (".yml", ".yaml"):
+            with path.open() as f:
+                data = yaml.safe_load(f) or {}
+        else:
+            data = load_toml_file(path)
+        if not isinstance(data, dict):
+            err = f"Expected the inventory {path} to be a mapping."
+            raise TypeError(err)
+
+        default = cls.from_settings()
+        repos = _repos(data, path)
+
+        full_files = default.full_files
+        if "full_files" in data:
+            full_files = {
+                name: frozenset(_strings(entry, "skip", path))
+                for name, entry in _mapping(data, "full_files", path).items()
+            }
+        pre_commit_skips = default.pre_commit_skips
+        if "pre_commit" in data:
+            pre_commit_skips = {
+                name: frozenset(_strings(entry, "skip", path))
+                for name, entry in _mapping(data, "pre_commit", path).items()
+            }
+        sort_lower = default.sort_lower
+        if "sort_lower" in data:
+            sort_lower = tuple(_strings(data, "sort_lower", path))
+        pre_commit_keep = default.pre_commit_keep
+        if "pre_commit_keep" in data:
+            section = _mapping(data, "pre_commit_keep", path)
+            pre_commit_keep = {key: frozenset(_strings(section, key, path)) for key in section}
+        py_project_rules = default.py_project_rules
+        if "py_project" in data:
+            py_project_rules = _rules(data, "py_project", path)
+
+        return cls(
+            repos=repos,
+            full_files=full_files,
+            sort_lower=sort_lower,
+            pre_commit_skips=pre_commit_skips,
+            pre_commit_keep=pre_commit_keep,
+            py_project_rules=py_project_rules,
+        )
+
+    def select(self: Inventory, select: list[str], exclude: list[str]) -> Inventory:
+        """Reduce the inventory to the selected repositories.
+
+        Args:
+            select: Patterns, a repository is kept if it matches any, all if empty
+            exclude: Patterns, a repository is removed if it matches any
+
+        Returns:
+            A new inventory with the selected repositories
+        """
+        repos = {
+            name: repo
+            for name, repo in self.repos.items()
+            if (not select or any(repo.matches(pattern) for pattern in select))
+            and not any(repo.matches(pattern) for pattern in exclude)
+        }
+        return self._with_repos(repos)
+
+    def shard(self: Inventory, index: int, count: int) -> Inventory:
+        """Reduce the inventory to a single shard.
+
+        The repositories are ordered by a hash of their name and dealt out in
+        turn, so the shards are balanced and the partitioning does not depend
+        on the order of the inventory file or the machine running it.
+
+        Args:
+            index: The one based shard index
+            count: The number of shards
+
+        Returns:
+            A new inventory with the repositories of the shard
+        """
+        dealt = set(sorted(self.repos, key=content_hash)[index - 1 :: count])
+        repos = {name: repo for name, repo in self.repos.items() if name in dealt}
+        return self._with_repos(repos)
+
+    def _with_repos(self: Inventory, repos: dict[str, RepoEntry]) -> Inventory:
+        """Copy the inventory with a different set of repositories.
+
+        Args:
+            repos: The repositories
+
+        Returns:
+            The new inventory
+        """
+        return Inventory(
+            repos=repos,
+            full_files=self.full_files,
+            sort_lower=self.sort_lower,
+            pre_commit_skips=self.pre_commit_skips,
+            pre_commit_keep=self.pre_commit_keep,
+            py_project_rules=self.py_project_rules,
+        )
+
+
+def _repos(data: dict[str, JSONVal], path: Path) -> dict[str, RepoEntry]:
+    """Return the repositories from the inventory data.
+
+    Args:
+        data: The inventory data
+        path: The path to the inventory file, for error messages
+
+    Raises:
+        ValueError: If a repository is invalid or there are none
+
+    Returns:
+        The repositories, indexed by name
+    """
+    repos = {}
+    for name, repo in _mapping(data, "repos", path).items():
+        if not isinstance(repo, dict) or not {"origin", "upstream"} <= repo.keys():
+            err = f"Expected repos.{name} in {path} to have an origin and upstream."
+            raise ValueError(err)
+        repos[name] = RepoEntry(
+            name=name,
+            origin=str(repo["origin"]),
+            upstream=str(repo["upstream"]),
+            tags=frozenset(_strings(repo, "tags", path)),
+        )
+    if not repos:
+        err = f"No repos found in the inventory {path}."
+        raise ValueError(err)
+    return repos
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """Parse a shard specification in the form i/n.
+
+    Args:
+        value: The shard specification
+
+    Raises:
+        ValueError: If the specification is invalid
+
+    Returns:
+        The one based shard index and the number of shards
+    """
+    index, _, count = value.partition("/")
+    try:
+        shard = int(index), int(count)
+    except ValueError:
+        shard = (0, 0)
+    if not 1 <= shard[0] <= shard[1]:
+        err = f"Invalid shard {value}, expected i/n with 1 <= i <= n."
+        raise ValueError(err)
+    return shard
+
+
+def _mapping(data: dict[str, JSONVal], key: str, path: Path) -> dict[str, JSONVal]:
+    """Return a mapping from the inventory data.
+
+    Args:
+        data: The inventory data
+        key: The key of the mapping
+        path: The path to the inventory file, for error messages
+
+    Raises:
+        TypeError: If the value is not a mapping
+
+    Returns:
+        The mapping, empty if missing
+    """
+    value = data.get(key, {})
+    if not isinstance(value, dict):
+        err = f"Expected {key} in {path} to be a mapping."
+        raise TypeError(err)
+    return value
+
+
+def _strings(data: JSONVal, key: str, path: Path) -> list[str]:
+    """Return a list of strings from the inventory data.
+
+    Args:
+        data: The inventory data containing the list
+        key: The key of the list
+        path: The path to the inventory file, for error messages
+
+    Raises:
+        TypeError: If the value is not a list of strings
+
+    Returns:
+        The list of strings, empty if missing
+    """
+    value = data.get(key, []) if isinstance(data, dict) else None
+    if not isinstance(value, list) or not all(isinstance(entry, str) for entry in value):
+        err = f"Expected {key} in {path} to be a list of strings."
+        raise TypeError(err)
+    return [str(entry) for entry in value]
+
+
+def _rules(data: dict[str, JSONVal], key: str, path: Path) -> dict[str, dict[str, JSONVal]]:
+    """Return a mapping of rules from the inventory data.
+
+    Args:
+        data: The inventory data
+        key: The key of the rules
+        path: The path to the inventory file, for error messages
+
+    Raises:
+        TypeError: If a rule is not a mapping
+
+    Returns:
+        The rules, indexed by dotted path
+    """
+    rules = {}
+    for dotted, rule in _mapping(data, key, path).items():
+        if not isinstance(rule, dict):
+            err = f"Expected {key}.{dotted} in {path} to be a mapping."
+            raise TypeError(err)
+        rules[dotted] = rule
+    return rules
@@ -0,0 +1,142 @@
+"""Metrics of a run in the Prometheus text format, for the node exporter textfile collector."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+import time
+
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from ftf.deadlines import LATENCY
+from ftf.report import Status
+
+
+if TYPE_CHECKING:
+    from ftf.config import Config
+
+
+#: The upper bounds of the command duration histogram buckets, in seconds
+DURATION_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+
+class Metrics:
+    """A set of metric families, rendered in the Prometheus text format."""
+
+    def __init__(self: Metrics) -> None:
+        """Initialize an empty set."""
+        self._lines: list[str] = []
+
+    def family(self: Metrics, name: str, kind: str, doc: str) -> None:
+        """Start a metric family.
+
+        Args:
+            name: The name of the metric
+            kind: The type, gauge, counter or histogram
+            doc: The help text
+        """
+        self._lines.append(f"# HELP {name} {doc}")
+        self._lines.append(f"# TYPE {name} {kind}")
+
+    def sample(self: Metrics, name: str, value: float, **labels: str) -> None:
+        """Add a sample to the current family.
+
+        Args:
+            name: The name of the sample
+            value: The value
+            **labels: The labels of the sample
+        """
+        label_set = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+        self._lines.append(f"{name}{{{label_set}}} {value}" if label_set else f"{name} {value}")
+
+    def render(self: Metrics) -> str:
+        """Render the metrics.
+
+        Returns:
+            The metrics in the Prometheus text format
+        """
+        return "\n".join(self._lines) + "\n"
+
+
+def run_metrics(config: Config) -> Metrics:
+    """Collect the metrics of the run.
+
+    Args:
+        config: The configuration data
+
+    Returns:
+        The metrics
+    """
+    report = config.report
+    metrics = Metrics()
+    metrics.family("ftf_run_duration_seconds", "gauge", "The duration of the run.")
+    metrics.sample("ftf_run_duration_seconds", report.duration)
+    metrics.family("ftf_run_timestamp_seconds", "gauge", "The time the run finished.")
+    metrics.sample("ftf_run_timestamp_seconds", time.time())
+
+    metrics.family("ftf_phase_duration_seconds", "gauge", "The duration of each phase.")
+    for phase, duration in report.phases.items():
+        metrics.sample("ftf_phase_duration_seconds", duration, phase=phase)
+    metrics.family("ftf_check_duration_seconds", "gauge", "The time spent in each check.")
+    for check, duration in report.durations.items():
+        metrics.sample("ftf_check_duration_seconds", duration, check=check)
+
+    metrics.family("ftf_repos", "gauge", "The repositories by check and outcome.")
+    for (check, status), count in sorted(report.counts.items()):
+        metrics.sample("ftf_repos", count, check=check, status=status)
+    metrics.family("ftf_prs_total", "counter", "The PRs opened or updated by each check.")
+    for (check, status), count in sorted(report.counts.items()):
+        if status == Status.UPDATED.value:
+            metrics.sample("ftf_prs_total", count, check=check)
+
+    metrics.family("ftf_command_duration_seconds", "histogram", "The duration of the commands.")
+    for command, (buckets, total, count) in LATENCY.histogram(DURATION_BUCKETS).items():
+        for bound, cumulative in zip(DURATION_BUCKETS, buckets, strict=True):
+            metrics.sample(
+                "ftf_command_duration_seconds_bucket",
+                cumulative,
+                command=command,
+                le=f"{bound:g}",
+            )
+        metrics.sample("ftf_command_duration_seconds_bucket", count, command=command, le="+Inf")
+        metrics.sample("ftf_command_duration_seconds_sum", total, command=command)
+        metrics.sample("ftf_command_duration_seconds_count", count, command=command)
+    metrics.family("ftf_command_timeouts_total", "counter", "The commands killed on timeout.")
+    for command, count in LATENCY.timeouts().items():
+        metrics.sample("ftf_command_timeouts_total", count, command=command)
+
+    metrics.family("ftf_messages_total", "counter", "The messages output by level.")
+    for level, count in config.output.call_count.items():
+        metrics.sample("ftf_messages_total", count, level=level)
+    return metrics
+
+
+def write_metrics(path: Path, metrics: Metrics) -> None:
+    """Write the metrics atomically, so the collector never reads a partial file.
+
+    Args:
+        path: The metrics file
+        metrics: The metrics
+    """
+    fd, tmp_name = tempfile.mkstemp(prefix=f".{path.name}.", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(metrics.render())
+        Path(tmp_name).chmod(0o644)
+        Path(tmp_name).replace(path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+def _escape(value: str) -> str:
+    """Escape a label value.
+
+    Args:
+        value: The label value
+
+    Returns:
+        The escaped value
+    """
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
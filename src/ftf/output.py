@@ -2,13 +2,17 @@
 
 from __future__ import annotations
 
+import atexit
 import decimal
 import json
 import logging
+import logging.handlers
 import os
+import queue
 import shutil
 import sys
 import textwrap
+import time
 
 from dataclasses import dataclass
 from enum import Enum
@@ -18,6 +22,10 @@ from typing import TypeVar
 
 T = TypeVar("T", bound="Level")
 GOLDEN_RATIO = 1.61803398875
+#: The log records written before the log file is flushed
+LOG_FLUSH_RECORDS = 100
+#: The seconds the log file may go unflushed while records are pending
+LOG_FLUSH_INTERVAL = 1.0
 
 
 def round_half_up(number: float) -> int:
@@ -221,10 +229,17 @@ class Output:
         log_append: str,
         term_features: TermFeatures,
         verbosity: int,
+        *,
         display: str = "text",
+        log_max_bytes: int = 0,
+        log_backups: int = 0,
     ) -> None:
         """Initialize the output object.
 
+        Log records are handed to a background thread through a queue, which
+        writes them to the log file in batches. The thread is stopped and the
+        file flushed at exit.
+
         Args:
             log_file: The path to the log file
             log_level: The log level
@@ -232,6 +247,8 @@ class Output:
             term_features: Terminal features
             verbosity: The verbosity level
             display: Whether to output as text or JSON
+            log_max_bytes: Rotate the log file at this size, 0 to never rotate
+            log_backups: The number of rotated log files kept
         """
         self._verbosity = verbosity
         self.call_count: dict[str, int] = {
@@ -245,6 +262,7 @@ class Output:
         }
         self.term_features = term_features
         self.logger = logging.getLogger("ansible_creator")
+        self._log_listener: logging.handlers.QueueListener | None = None
         if log_level != "notset":
             self.logger.setLevel(log_level.upper())
             log_file_path = Path(log_file)
@@ -253,15 +271,32 @@ class Output:
             formatter = logging.Formatter(
                 fmt="%(asctime)s %(levelname)s '%(name)s.%(module)s.%(funcName)s' %(message)s",
             )
-            handler = logging.FileHandler(log_file)
+            handler = BatchedFileHandler(
+                filename=log_file,
+                max_bytes=log_max_bytes,
+                backups=log_backups,
+            )
             handler.setFormatter(formatter)
             handler.setLevel(log_level.upper())
-            self.logger.addHandler(handler)
+            records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+            self.logger.addHandler(logging.handlers.QueueHandler(records))
+            self._log_listener = FlushingListener(records, handler)
+            self._log_listener.start()
+            atexit.register(self.close)
             self.log_to_file = True
         else:
             self.log_to_file = False
         self.display = display
 
+    def close(self: Output) -> None:
+        """Write the pending log records and close the log file."""
+        if self._log_listener is None:
+            return
+        listener, self._log_listener = self._log_listener, None
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+
     def critical(self: Output, msg: str) -> None:
         """Print a critical message to the console.
 
@@ -362,6 +397,104 @@ class Output:
         print(final_msg, file=file)
 
 
+class BatchedFileHandler(logging.handlers.RotatingFileHandler):
+    """A log file handler flushing in batches, optionally rotating by size."""
+
+    def __init__(self: BatchedFileHandler, filename: str, max_bytes: int, backups: int) -> None:
+        """Initialize the handler.
+
+        Args:
+            filename: The path to the log file
+            max_bytes: Rotate the log file at this size, 0 to never rotate
+            backups: The number of rotated log files kept
+        """
+        super().__init__(filename=filename, maxBytes=max_bytes, backupCount=backups)
+        self._pending = 0
+
+    def emit(self: BatchedFileHandler, record: logging.LogRecord) -> None:
+        """Write a record, flushing once LOG_FLUSH_RECORDS are pending.
+
+        Args:
+            record: The log record
+        """
+        try:
+            if self.shouldRollover(record):
+                self.doRollover()
+            if self.stream is None:
+                self.stream = self._open()
+            self.stream.write(self.format(record) + self.terminator)
+            self._pending += 1
+            if self._pending >= LOG_FLUSH_RECORDS:
+                self.flush()
+        except Exception:  # pylint: disable=broad-except # noqa: BLE001
+            self.handleError(record)
+
+    def flush(self: BatchedFileHandler) -> None:
+        """Flush the pending records to disk."""
+        super().flush()
+        self._pending = 0
+
+
+class FlushingListener(logging.handlers.QueueListener):
+    """A queue listener flushing its handlers LOG_FLUSH_INTERVAL after the last flush."""
+
+    def __init__(
+        self: FlushingListener,
+        records: queue.SimpleQueue[logging.LogRecord],
+        *handlers: logging.Handler,
+    ) -> None:
+        """Initialize the listener.
+
+        Args:
+            records: The queue the log records are put on
+            handlers: The handlers the records are passed to
+        """
+        super().__init__(records, *handlers)
+        self._records = records
+        self._flushed_at = time.monotonic()
+        self._unflushed = False
+
+    def dequeue(self: FlushingListener, block: bool) -> logging.LogRecord:  # noqa: FBT001
+        """Take the next record, flushing the handlers once the interval has passed.
+
+        The records handled are flushed no later than LOG_FLUSH_INTERVAL after
+        the last flush, whether the queue goes idle or records keep trickling in.
+
+        Args:
+            block: Wait for a record
+
+        Raises:
+            queue.Empty: If not blocking and the queue is empty
+
+        Returns:
+            The log record, or the sentinel when stopping
+        """
+        while True:
+            timeout = None
+            if self._unflushed:
+                timeout = self._flushed_at + LOG_FLUSH_INTERVAL - time.monotonic()
+                if timeout <= 0:
+                    self._flush()
+                    timeout = None
+            try:
+                record = self._records.get(block=block, timeout=timeout)
+            except queue.Empty:
+                if self._unflushed:
+                    self._flush()
+                if not block:
+                    raise
+            else:
+                self._unflushed = True
+                return record
+
+    def _flush(self: FlushingListener) -> None:
+        """Flush the handlers."""
+        for handler in self.handlers:
+            handler.flush()
+        self._flushed_at = time.monotonic()
+        self._unflushed = False
+
+
 @dataclass
 class TermFeatures:
     """Terminal features."""
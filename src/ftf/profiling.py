@@ -0,0 +1,175 @@
+"""Profiles of the phases of a run, with cProfile and optionally tracemalloc."""
+
+from __future__ import annotations
+
+import contextlib
+import cProfile
+import pstats
+import tracemalloc
+
+from pathlib import Path
+from typing import TYPE_CHECKING, cast
+
+from ftf.utils import format_size, format_table
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+
+#: The key of a function in the pstats: file name, line number and name
+FunctionKey = tuple[str, int, str]
+#: The entry of a function in the pstats: primitive calls, calls, own time, cumulative time, callers
+FunctionStats = tuple[int, int, float, float, object]
+
+#: The frames stored for each allocation traced
+MEMORY_FRAMES = 1
+#: The allocations made by the profiler itself, excluded from the snapshots
+_MEMORY_FILTERS = (
+    tracemalloc.Filter(inclusive=False, filename_pattern=tracemalloc.__file__),
+    tracemalloc.Filter(inclusive=False, filename_pattern="<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(inclusive=False, filename_pattern=pstats.__file__),
+    tracemalloc.Filter(inclusive=False, filename_pattern=__file__),
+)
+
+
+class Profiler:
+    """Profiles each phase of a run separately, repeated phases accumulate.
+
+    Only the thread running a phase is profiled, the time it spends waiting
+    for the worker threads of the submit queue shows as waiting in the executor.
+    """
+
+    def __init__(self: Profiler, directory: Path, top: int = 20, memory: bool = False) -> None:  # noqa: FBT001, FBT002
+        """Initialize the profiler.
+
+        Args:
+            directory: The directory the profiles are written to
+            top: The number of functions and allocations in the summary
+            memory: Whether to trace the memory allocations with tracemalloc
+        """
+        self.directory = directory
+        self.top = top
+        self.memory = memory
+        self._profiles: dict[str, cProfile.Profile] = {}
+        self._peaks: dict[str, int] = {}
+        self._allocations: dict[str, dict[str, int]] = {}
+
+    @contextlib.contextmanager
+    def phase(self: Profiler, name: str) -> Iterator[None]:
+        """Profile a phase of the run.
+
+        Args:
+            name: The name of the phase
+
+        Yields:
+            Nothing
+        """
+        profile = self._profiles.setdefault(name, cProfile.Profile())
+        before = None
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(MEMORY_FRAMES)
+            tracemalloc.reset_peak()
+            start_size = tracemalloc.get_traced_memory()[0]
+            before = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            if before is not None:
+                peak = tracemalloc.get_traced_memory()[1] - start_size
+                self._peaks[name] = max(self._peaks.get(name, 0), peak)
+                after = tracemalloc.take_snapshot().filter_traces(_MEMORY_FILTERS)
+                allocations = self._allocations.setdefault(name, {})
+                for diff in after.compare_to(before, "lineno"):
+                    location = str(diff.traceback)
+                    allocations[location] = allocations.get(location, 0) + diff.size_diff
+
+    def save(self: Profiler) -> list[Path]:
+        """Write the profile of each phase as a pstats file.
+
+        Returns:
+            The paths written, one per phase
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        for name, profile in self._profiles.items():
+            path = self.directory / f"{name}.pstats"
+            profile.dump_stats(path)
+            paths.append(path)
+        return paths
+
+    def summary(self: Profiler) -> list[str]:
+        """Summarize the phases, the hottest functions and the largest allocations.
+
+        Returns:
+            The lines of the summary, empty if no phase was profiled
+        """
+        if not self._profiles:
+            return []
+        phases: list[tuple[str, str, str, str]] = [("Phase", "Calls", "Time", "Peak memory")]
+        combined = pstats.Stats()
+        for name, profile in self._profiles.items():
+            stats = pstats.Stats(profile)
+            combined.add(stats)
+            entries = _functions(stats).values()
+            calls = sum(entry[1] for entry in entries)
+            own = sum(entry[2] for entry in entries)
+            peak = format_size(self._peaks[name]) if name in self._peaks else "-"
+            phases.append((name, str(calls), f"{own:.2f}s", peak))
+        lines = format_table(phases)
+
+        hot = sorted(_functions(combined).items(), key=lambda item: item[1][2], reverse=True)
+        functions: list[tuple[str, str, str, str]] = [("Function", "Calls", "Own", "Cumulative")]
+        functions.extend(
+            (_function_name(function), str(calls), f"{own:.3f}s", f"{cumulative:.3f}s")
+            for function, (_, calls, own, cumulative, _) in hot[: self.top]
+        )
+        lines.extend(["", f"Top {self.top} functions by own time:", *format_table(functions)])
+
+        if self._allocations:
+            largest = sorted(
+                (
+                    (size, name, location)
+                    for name, allocations in self._allocations.items()
+                    for location, size in allocations.items()
+                    if size > 0
+                ),
+                reverse=True,
+            )
+            retained: list[tuple[str, str, str]] = [("Phase", "Location", "Retained")]
+            retained.extend(
+                (name, location, format_size(size)) for size, name, location in largest[: self.top]
+            )
+            lines.extend(["", f"Top {self.top} allocations retained by a phase:"])
+            lines.extend(format_table(retained))
+        return lines
+
+
+def _functions(stats: pstats.Stats) -> dict[FunctionKey, FunctionStats]:
+    """Return the entries of the functions in the pstats, not in the type stubs.
+
+    Args:
+        stats: The pstats
+
+    Returns:
+        The entry of each function
+    """
+    return cast("dict[FunctionKey, FunctionStats]", vars(stats)["stats"])
+
+
+def _function_name(function: FunctionKey) -> str:
+    """Format the key of a function in the pstats.
+
+    Args:
+        function: The file name, line number and name of the function
+
+    Returns:
+        The file base name, line and function, or the name alone for built-ins
+    """
+    file_name, line, name = function
+    if file_name == "~":
+        return name
+    return f"{Path(file_name).name}:{line}({name})"
@@ -0,0 +1,243 @@
+"""Open pull requests made by ftf, cached to avoid repeated GitHub queries."""
+
+from __future__ import annotations
+
+import json
+import re
+import shlex
+import subprocess
+import time
+
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any
+
+from ftf.utils import subprocess_run, xdg_cache_home
+
+
+if TYPE_CHECKING:
+    from ftf.config import Config
+    from ftf.repo import Repo
+
+
+BRANCH_PREFIX = "chore/file_"
+#: The marker added to the body of ftf PRs, identifying the file and the content proposed
+PR_MARKER = re.compile(r"<!-- ftf:file=(?P<file>\S+) hash=(?P<hash>[0-9a-f]+) -->")
+#: The number of repositories queried in a single GraphQL request
+QUERY_BATCH = 50
+#: The fields of each open pull request queried
+_PR_FIELDS = "number title url body headRefName headRepositoryOwner { login }"
+
+
+@dataclass
+class PullRequest:
+    """An open pull request made by ftf."""
+
+    #: The pull request number
+    number: int
+    #: The title of the pull request
+    title: str
+    #: The URL of the pull request
+    url: str
+    #: The head branch of the pull request
+    branch: str
+    #: The file updated by the pull request
+    file: str = ""
+    #: The hash of the content proposed, empty if unknown
+    content_hash: str = ""
+
+
+def pr_marker(file_name: str, content_hash: str) -> str:
+    """Return the marker added to the body of a PR.
+
+    Args:
+        file_name: The file updated by the PR
+        content_hash: The hash of the content proposed
+
+    Returns:
+        The marker, an HTML comment not shown on GitHub
+    """
+    return f"<!-- ftf:file={file_name} hash={content_hash} -->"
+
+
+def pr_number(url: str) -> int:
+    """Return the number of a PR from its URL.
+
+    Args:
+        url: The URL of the PR
+
+    Returns:
+        The number of the PR, 0 if the URL does not end with one
+    """
+    number = url.rstrip("/").rsplit("/", 1)[-1]
+    return int(number) if number.isdigit() else 0
+
+
+def to_pull_request(pr: dict[str, Any], origin_owner: str) -> PullRequest | None:
+    """Convert a PR from the GitHub API to a pull request made by ftf.
+
+    Args:
+        pr: The PR from the GitHub API
+        origin_owner: The owner of the fork ftf PRs are made from
+
+    Returns:
+        The pull request, None if not made by ftf
+    """
+    branch = pr["headRefName"]
+    owner = (pr.get("headRepositoryOwner") or {}).get("login")
+    if not branch.startswith(BRANCH_PREFIX) or owner != origin_owner:
+        return None
+    marker = PR_MARKER.search(pr.get("body") or "")
+    return PullRequest(
+        number=pr["number"],
+        title=pr["title"],
+        url=pr["url"],
+        branch=branch,
+        file=marker["file"] if marker else branch.removeprefix(BRANCH_PREFIX).rsplit("_", 1)[0],
+        content_hash=marker["hash"] if marker else "",
+    )
+
+
+class PrIndex:
+    """The open ftf pull requests of the fleet, indexed by repository name."""
+
+    def __init__(self: PrIndex) -> None:
+        """Initialize an empty index."""
+        self._prs: dict[str, list[PullRequest]] = {}
+
+    @classmethod
+    def fetch(cls: type[PrIndex], repos: list[Repo], config: Config) -> PrIndex:
+        """Build the index with batched GraphQL queries, one per QUERY_BATCH repositories.
+
+        Repositories that could not be queried are left out of the index, and
+        nothing is queried for a dry run, since no PRs are made.
+
+        Args:
+            repos: The repositories, those not on GitHub are ignored
+            config: The configuration object
+
+        Returns:
+            The index
+        """
+        index = cls()
+        if config.args.dry_run:
+            return index
+        github = [repo for repo in repos if repo.on_github]
+        for start in range(0, len(github), QUERY_BATCH):
+            batch = github[start : start + QUERY_BATCH]
+            command = f"gh api graphql -f query={shlex.quote(_query(batch))}"
+            try:
+                proc = subprocess_run(
+                    command=command,
+                    msg=f"Listing open PRs in {len(batch)} repositories...",
+                    output=config.output,
+                    verbose=config.args.verbose,
+                    capture=True,
+                )
+            except subprocess.CalledProcessError as exc:
+                err = f"Unable to list the open PRs, new PRs will be made: {exc.stderr}"
+                config.output.warning(err)
+                continue
+            except subprocess.TimeoutExpired as exc:
+                names = ", ".join(repo.name for repo in batch)
+                err = (
+                    f"Unable to list the open PRs of {names}, new PRs will be made:"
+                    f" the query timed out after {exc.timeout:.0f}s."
+                )
+                config.output.warning(err)
+                continue
+            data = json.loads(proc.stdout or "{}").get("data") or {}
+            for position, repo in enumerate(batch):
+                nodes = ((data.get(f"r{position}") or {}).get("pullRequests") or {}).get("nodes")
+                if nodes is None:
+                    continue
+                index._prs[repo.name] = [
+                    pr
+                    for node in nodes
+                    if (pr := to_pull_request(pr=node, origin_owner=repo.origin_owner))
+                ]
+        return index
+
+    def for_file(self: PrIndex, repo_name: str, file_name: str) -> list[PullRequest]:
+        """Return the open ftf pull requests updating a file.
+
+        Args:
+            repo_name: The name of the repository
+            file_name: The file
+
+        Returns:
+            The pull requests, newest first
+        """
+        return [pr for pr in self._prs.get(repo_name, []) if pr.file == file_name]
+
+    def record(self: PrIndex, repo_name: str, pr: PullRequest, closed: list[PullRequest]) -> None:
+        """Record a pull request made or updated during the run.
+
+        Args:
+            repo_name: The name of the repository
+            pr: The pull request made or updated
+            closed: The pull requests closed in its favor
+        """
+        numbers = {pr.number, *(closed_pr.number for closed_pr in closed)}
+        prs = [known for known in self._prs.get(repo_name, []) if known.number not in numbers]
+        self._prs[repo_name] = [pr, *prs]
+
+
+def _query(repos: list[Repo]) -> str:
+    """Build a GraphQL query for the open PRs of several repositories.
+
+    Args:
+        repos: The repositories
+
+    Returns:
+        The query, with the repositories aliased r0, r1, ...
+    """
+    parts = []
+    for position, repo in enumerate(repos):
+        owner, _, name = repo.upstream.partition("/")
+        parts.append(
+            f"r{position}: repository(owner: {json.dumps(owner)}, name: {json.dumps(name)})"
+            " { pullRequests(states: OPEN, first: 100,"
+            f" orderBy: {{field: CREATED_AT, direction: DESC}}) {{ nodes {{ {_PR_FIELDS} }} }} }}",
+        )
+    return "query { " + " ".join(parts) + " }"
+
+
+def open_prs(repo: Repo, ttl: float, quiet: bool = False) -> list[PullRequest]:  # noqa: FBT001, FBT002
+    """List the open ftf pull requests from the origin fork to the upstream repository.
+
+    Args:
+        repo: The repository
+        ttl: The number of seconds a cached listing is valid for
+        quiet: Do not show a spinner, used when running concurrently
+
+    Returns:
+        The open pull requests
+    """
+    cache_file = xdg_cache_home() / "prs" / f"{repo.upstream.replace('/', '__')}.json"
+    if cache_file.exists():
+        cached = json.loads(cache_file.read_text())
+        if time.time() - cached["timestamp"] < ttl:
+            return [PullRequest(**pr) for pr in cached["prs"]]
+
+    command = (
+        f"gh pr list --repo {repo.upstream} --state open --limit 200"
+        " --json number,title,url,body,headRefName,headRepositoryOwner"
+    )
+    proc = subprocess_run(
+        command=command,
+        msg=f"[{repo.name}] Listing open PRs...",
+        output=repo.config.output,
+        verbose=repo.config.args.verbose,
+        quiet=quiet,
+        capture=True,
+    )
+    prs = [
+        pr
+        for data in json.loads(proc.stdout or "[]")
+        if (pr := to_pull_request(pr=data, origin_owner=repo.origin_owner))
+    ]
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    cache_file.write_text(
+        json.dumps({"timestamp": time.time(), "prs": [asdict(pr) for pr in prs]}),
+    )
+    return prs
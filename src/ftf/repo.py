@@ -2,6 +2,9 @@
 
 from __future__ import annotations
 
+import shlex
+import subprocess
+
 from dataclasses import dataclass
 from pathlib import Path
 from typing import TYPE_CHECKING
@@ -10,7 +13,6 @@ from ftf.utils import subprocess_run
 
 
 if TYPE_CHECKING:
-
     from ftf.config import Config
 
 
@@ -24,17 +26,27 @@ class Repo:
     name: str
 
     origin_uri: str = ""
-    upstream_uti: str = ""
+    upstream_uri: str = ""
     work_dir: Path = Path()
     origin_owner: str = ""
+    failed: str = ""
 
     def __post_init__(self: Repo) -> None:
         """Post initialization."""
-        self.origin_uri = f"git@github.com:{self.origin}.git"
-        self.upstream_uri = f"git@github.com{self.upstream}.git"
+        self.origin_uri = remote_uri(self.origin)
+        self.upstream_uri = remote_uri(self.upstream)
         self.origin_owner = self.origin.split("/")[0]
         self.work_dir = self.config.tmp_path.joinpath(self.name)
 
+    @property
+    def on_github(self: Repo) -> bool:
+        """Determine if the upstream repository is hosted on GitHub.
+
+        Returns:
+            True if the upstream is an owner/name slug on GitHub.
+        """
+        return self.upstream_uri.startswith("git@github.com:")
+
     def clone_origin(self: Repo) -> None:
         """Clone the origin repository."""
         if self.work_dir.exists():
@@ -74,58 +86,123 @@ class Repo:
             verbose=self.config.args.verbose,
         )
 
-    def ensure_main(self: Repo) -> None:
-        """Checkout, main, reset the repository to the upstream/main branch.
+    def remote_heads(self: Repo, remote: str, quiet: bool = False) -> dict[str, str]:  # noqa: FBT001, FBT002
+        """Collect all branch heads of a remote with a single ls-remote.
 
-        Push to origin main
+        Args:
+            remote: The name or URI of the remote.
+            quiet: Do not show a spinner, used when running concurrently.
+
+        Returns:
+            The commit SHA of each branch, keyed by the branch name.
         """
-        msg = f"[{self.name}] Checkout main..."
-        command = "git checkout main"
-        subprocess_run(
+        command = f"git ls-remote --heads {remote}"
+        msg = f"[{self.name}] Listing {remote} branches..."
+        proc = subprocess_run(
             command=command,
-            cwd=self.work_dir,
+            cwd=self.work_dir if self.work_dir.exists() else self.config.tmp_path,
             msg=msg,
             output=self.config.output,
             verbose=self.config.args.verbose,
+            quiet=quiet,
+            capture=True,
         )
+        heads = {}
+        for line in (proc.stdout or "").splitlines():
+            sha, _, ref = line.partition("\t")
+            if ref.startswith("refs/heads/"):
+                heads[ref.removeprefix("refs/heads/")] = sha
+        return heads
 
-        msg = f"[{self.name}] Resetting to upstream/main..."
-        command = "git reset --hard upstream/main"
-        subprocess_run(
-            command=command,
-            cwd=self.work_dir,
-            msg=msg,
-            output=self.config.output,
-            verbose=self.config.args.verbose,
-        )
+    def ref_state(self: Repo) -> RefState:
+        """Collect the state of the main branch locally and in both remotes.
 
-        msg = f"[{self.name}] Pull upstream/main..."
-        command = "git pull upstream main"
-        subprocess_run(
-            command=command,
-            cwd=self.work_dir,
-            msg=msg,
-            output=self.config.output,
-            verbose=self.config.args.verbose,
-        )
+        Returns:
+            The state of the main branch.
+        """
+        command = "git status --porcelain=v2 --branch --untracked-files=no"
+        msg = f"[{self.name}] Reading local state..."
+        state = RefState()
+
+        def read_status(line: str) -> None:
+            """Read a line of the status, without keeping the changed files.
+
+            Args:
+                line: The line
+            """
+            line = line.rstrip("\n")
+            if line.startswith("# branch.head "):
+                state.branch = line.removeprefix("# branch.head ")
+            elif line.startswith("# branch.oid "):
+                state.main = line.removeprefix("# branch.oid ")
+            elif line and not line.startswith("#"):
+                state.dirty = True
 
-        msg = f"[{self.name}] Pushing to origin/main..."
-        command = "git push origin main --force"
         subprocess_run(
             command=command,
             cwd=self.work_dir,
             msg=msg,
             output=self.config.output,
             verbose=self.config.args.verbose,
+            on_line=read_status,
         )
 
-    def branch_in_origin(self: Repo, new_branch: str) -> None:
+        if state.branch != "main":
+            command = "git rev-parse --verify --quiet refs/heads/main"
+            msg = f"[{self.name}] Reading local main..."
+            try:
+                proc = subprocess_run(
+                    command=command,
+                    cwd=self.work_dir,
+                    msg=msg,
+                    output=self.config.output,
+                    verbose=self.config.args.verbose,
+                    capture=True,
+                )
+            except subprocess.CalledProcessError:
+                # No local main yet, e.g. the default branch of the clone has another name
+                state.main = ""
+            else:
+                state.main = (proc.stdout or "").strip()
+
+        state.origin = self.remote_heads("origin").get("main", "")
+        state.upstream = self.remote_heads("upstream").get("main", "")
+        return state
+
+    def ensure_main(self: Repo) -> None:
+        """Checkout main, reset the repository to the upstream/main branch.
+
+        Push to origin main. Only the commands needed to reach that state
+        are run, based on the SHAs of main locally and in both remotes. If
+        upstream has no main branch, nothing is run and the repository is
+        marked failed.
+        """
+        state = self.ref_state()
+        if not state.upstream:
+            self.failed = "upstream has no main branch."
+            self.config.output.error(f"[{self.name}] Unable to sync main, {self.failed}")
+            return
+        steps = plan_sync(state)
+        if not steps:
+            self.config.output.info(f"[{self.name}] main is in sync with upstream/main.")
+            return
+        for action, command in steps:
+            subprocess_run(
+                command=command,
+                cwd=self.work_dir,
+                msg=f"[{self.name}] {action}...",
+                output=self.config.output,
+                verbose=self.config.args.verbose,
+            )
+
+    def branch_in_origin(self: Repo, new_branch: str, reset: bool = False) -> None:  # noqa: FBT001, FBT002
         """Create a new branch in the origin repository.
 
         Args:
             new_branch: The name of the new branch.
+            reset: Reset the branch if it already exists, used to update an open PR.
         """
-        command = f"git checkout -t -b {new_branch}"
+        command = f"git checkout -t -{'B' if reset else 'b'} {new_branch}"
         msg = f"[{self.name}] Creating a new tracking branch {new_branch}..."
         subprocess_run(
             command=command,
@@ -167,47 +244,164 @@ class Repo:
             verbose=self.config.args.verbose,
         )
 
-    def push_origin(self: Repo, new_branch: str) -> None:
+    def push_origin(
+        self: Repo,
+        new_branch: str,
+        force: bool = False,  # noqa: FBT001, FBT002
+        quiet: bool = False,  # noqa: FBT001, FBT002
+    ) -> None:
         """Push changes to the origin repository.
 
         Args:
             new_branch: The name of the new branch.
+            force: Replace the branch in origin, used to update an open PR.
+            quiet: Do not show a spinner, used when running concurrently.
         """
-        command = f"git push origin {new_branch}"
+        command = f"git push {'--force ' if force else ''}origin {new_branch}"
         msg = f"[{self.name}] Pushing changes to origin..."
-        subprocess_run(
-            command=command,
-            cwd=self.work_dir,
-            msg=msg,
-            output=self.config.output,
-            verbose=self.config.args.verbose,
-        )
+        self._submit(command=command, msg=msg, quiet=quiet)
 
     def create_pr(
         self: Repo,
         file_name: str,
         new_branch: str,
-        commit_text_file: Path,
-    ) -> None:
+        body_file: Path,
+        quiet: bool = False,  # noqa: FBT001, FBT002
+    ) -> str:
         """Create a pull request in the origin repository.
 
         Args:
             file_name: The name of the file to check.
             new_branch: The name of the new branch.
-            commit_text_file: The path to the file with the commit message.
+            body_file: The path to the file with the PR body.
+            quiet: Do not show a spinner, used when running concurrently.
+
+        Returns:
+            The URL of the pull request.
         """
         title = f"chore: Update {file_name}"
         command = (
             f'gh pr create --repo {self.upstream} --title "{title}"'
-            f" --base main --head {self.origin_owner}:{new_branch} --body-file {commit_text_file}"
+            f" --base main --head {self.origin_owner}:{new_branch} --body-file {body_file}"
         )
         msg = f"[{self.name}] Creating PR..."
-        subprocess_run(
-            command=command,
-            cwd=self.work_dir,
-            msg=msg,
-            output=self.config.output,
-            verbose=self.config.args.verbose,
+        proc = self._submit(command=command, msg=msg, quiet=quiet, capture=True)
+        pr_url = (proc.stdout or "").strip().rsplit("\n", maxsplit=1)[-1]
+
+        self.config.output.info(f"[{self.name}] PR created. {pr_url}")
+        return pr_url
+
+    def edit_pr(self: Repo, number: int, body_file: Path, quiet: bool = False) -> None:  # noqa: FBT001, FBT002
+        """Replace the body of an open pull request, after its branch was updated.
+
+        Args:
+            number: The number of the pull request.
+            body_file: The path to the file with the PR body.
+            quiet: Do not show a spinner, used when running concurrently.
+        """
+        command = f"gh pr edit {number} --repo {self.upstream} --body-file {body_file}"
+        msg = f"[{self.name}] Updating PR #{number}..."
+        self._submit(command=command, msg=msg, quiet=quiet)
+
+    def close_pr(self: Repo, number: int, comment: str, quiet: bool = False) -> None:  # noqa: FBT001, FBT002
+        """Close an open pull request with a comment.
+
+        Args:
+            number: The number of the pull request.
+            comment: The comment explaining why it was closed.
+            quiet: Do not show a spinner, used when running concurrently.
+        """
+        command = (
+            f"gh pr close {number} --repo {self.upstream}"
+            f" --comment {shlex.quote(comment)}"
+        )
+        msg = f"[{self.name}] Closing PR #{number}..."
+        self._submit(command=command, msg=msg, quiet=quiet)
+        self.config.output.info(f"[{self.name}] PR #{number} closed. {comment}")
+
+    def _submit(
+        self: Repo,
+        command: str,
+        msg: str,
+        quiet: bool,  # noqa: FBT001
+        capture: bool = False,  # noqa: FBT001, FBT002
+    ) -> subprocess.CompletedProcess[str]:
+        """Run a command changing GitHub through the submission queue, paced and retried.
+
+        Args:
+            command: The command to run.
+            msg: The message to display.
+            quiet: Do not show a spinner, used when running concurrently.
+            capture: Keep all of the output, for commands whose output is parsed.
+
+        Returns:
+            The completed process.
+        """
+        return self.config.submit_queue.submit(
+            lambda: subprocess_run(
+                command=command,
+                cwd=self.work_dir,
+                msg=msg,
+                output=self.config.output,
+                verbose=self.config.args.verbose,
+                quiet=quiet,
+                capture=capture,
+            ),
         )
 
-        self.config.output.info(f"[{self.name}] PR created.")
+
+def remote_uri(remote: str) -> str:
+    """Convert an owner/name slug to a GitHub URI, other URIs and paths are kept.
+
+    Args:
+        remote: The owner/name slug, URI or path of the repository.
+
+    Returns:
+        The URI of the repository.
+    """
+    if "://" in remote or remote.startswith(("/", ".", "~", "git@")):
+        return remote
+    return f"git@github.com:{remote}.git"
+
+
+@dataclass
+class RefState:
+    """The state of the main branch locally and in the remotes."""
+
+    #: The checked out branch
+    branch: str = ""
+    #: The SHA of the local main branch
+    main: str = ""
+    #: Whether the working tree has changes to tracked files
+    dirty: bool = False
+    #: The SHA of main in origin
+    origin: str = ""
+    #: The SHA of main in upstream
+    upstream: str = ""
+
+
+def plan_sync(state: RefState) -> list[tuple[str, str]]:
+    """Plan the commands needed to bring main in sync with upstream/main.
+
+    Nothing is planned if upstream has no main branch.
+
+    Args:
+        state: The state of the main branch locally and in the remotes.
+
+    Returns:
+        The action descriptions and commands to run, in order.
+    """
+    if not state.upstream:
+        return []
+    steps = []
+    if state.branch != "main":
+        force = " --force" if state.dirty else ""
+        steps.append(("Checkout main", f"git checkout{force} main"))
+    elif state.dirty and state.main == state.upstream:
+        steps.append(("Discarding local changes", "git reset --hard"))
+    if state.main != state.upstream:
+        steps.append(("Fetch upstream/main", "git fetch upstream main"))
+        steps.append(("Resetting to upstream/main", f"git reset --hard {state.upstream}"))
+    if state.origin != state.upstream:
+        steps.append(("Pushing to origin/main", "git push origin main --force"))
+    return steps
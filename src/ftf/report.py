@@ -0,0 +1,310 @@
+"""Run reports, a compact record of the outcome of each check for each repository."""
+
+from __future__ import annotations
+
+import contextlib
+import gzip
+import json
+import time
+
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from typing import TYPE_CHECKING, Any, TextIO, cast
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+    from pathlib import Path
+
+    from ftf.history import RunHistory
+    from ftf.profiling import Profiler
+
+
+REPORT_FORMAT = "ftf-report"
+REPORT_VERSION = 1
+
+
+class Status(Enum):
+    """The outcome of a check for a repository."""
+
+    CURRENT = "current"
+    DRIFT = "drift"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+    UPDATED = "updated"
+
+
+@dataclass
+class CheckResult:
+    """The outcome of a check for a single repository."""
+
+    #: The name of the repository
+    repo: str
+    #: The name of the check
+    check: str
+    #: The file checked
+    file: str
+    #: The outcome
+    status: Status = Status.CURRENT
+    #: The sha256 of the template, if any
+    base_hash: str = ""
+    #: The sha256 of the repository file
+    repo_hash: str = ""
+    #: The sha256 of the desired repository file
+    desired_hash: str = ""
+    #: The diff shown to the user
+    diff: list[str] = field(default_factory=list)
+    #: The URL of the PR made
+    pr_url: str = ""
+    #: The time spent in seconds
+    duration: float = 0.0
+
+    def to_record(self: CheckResult) -> dict[str, Any]:
+        """Convert the result to a report record.
+
+        Returns:
+            The report record
+        """
+        record = asdict(self)
+        record["status"] = self.status.value
+        record["type"] = "result"
+        return record
+
+
+def open_report(path: Path, mode: str) -> TextIO:
+    """Open a report file, gzip compressed if the name ends with .gz.
+
+    Args:
+        path: The path to the report
+        mode: The mode, r or w
+
+    Returns:
+        The open text stream
+    """
+    if path.suffix == ".gz":
+        return cast("TextIO", gzip.open(path, mode=f"{mode}t", encoding="utf-8"))
+    return cast("TextIO", path.open(mode=mode, encoding="utf-8"))
+
+
+class Report:
+    """Record the results of a run, optionally streaming them to a report file."""
+
+    def __init__(
+        self: Report,
+        path: Path | None,
+        session_id: str,
+        shard: tuple[int, int] | None = None,
+    ) -> None:
+        """Initialize the report.
+
+        Args:
+            path: The path to the report file, nothing is written if None
+            session_id: The session ID of the run
+            shard: The shard of the run, if any
+        """
+        self.session_id = session_id
+        self.shard = f"{shard[0]}/{shard[1]}" if shard else ""
+        self.history: RunHistory | None = None
+        self.profiler: Profiler | None = None
+        self.counts: dict[tuple[str, str], int] = {}
+        self.durations: dict[str, float] = {}
+        self.phases: dict[str, float] = {}
+        self._start = time.monotonic()
+        self._started = time.time()
+        self._stream: TextIO | None = None
+        if path is not None:
+            self._stream = open_report(path=path, mode="w")
+            self._write(
+                {
+                    "type": "header",
+                    "format": REPORT_FORMAT,
+                    "version": REPORT_VERSION,
+                    "session_id": session_id,
+                    "shard": self.shard,
+                    "started": self._started,
+                },
+            )
+
+    def record(self: Report, result: CheckResult) -> None:
+        """Record the result of a check for a repository.
+
+        Args:
+            result: The result
+        """
+        key = (result.check, result.status.value)
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.durations[result.check] = self.durations.get(result.check, 0.0) + result.duration
+        if self.history is not None:
+            self.history.add_result(result)
+        self._write(result.to_record())
+
+    @property
+    def duration(self: Report) -> float:
+        """Return the time since the run started.
+
+        Returns:
+            The duration in seconds
+        """
+        return time.monotonic() - self._start
+
+    @contextlib.contextmanager
+    def phase(self: Report, name: str) -> Iterator[None]:
+        """Time a phase of the run, and profile it if profiling, repeated phases accumulate.
+
+        Args:
+            name: The name of the phase
+
+        Yields:
+            Nothing
+        """
+        profile = self.profiler.phase(name) if self.profiler else contextlib.nullcontext()
+        start = time.monotonic()
+        try:
+            with profile:
+                yield
+        finally:
+            duration = time.monotonic() - start
+            self.phases[name] = self.phases.get(name, 0.0) + duration
+            if self.history is not None:
+                self.history.add_phase(name=name, duration=duration)
+            self._write({"type": "phase", "name": name, "duration": duration})
+
+    def latency(self: Report, commands: dict[str, dict[str, float]]) -> None:
+        """Record the latencies of the commands run, by command type.
+
+        Args:
+            commands: The latency summary of each command type
+        """
+        self._write({"type": "latency", "commands": commands})
+
+    def close(self: Report) -> None:
+        """Write the footer, close the report file and save the run to the history."""
+        if self._stream is not None:
+            self._write({"type": "footer", "duration": self.duration})
+            self._stream.close()
+            self._stream = None
+        if self.history is not None:
+            history, self.history = self.history, None
+            history.save(
+                session_id=self.session_id,
+                shard=self.shard,
+                started=self._started,
+                duration=self.duration,
+            )
+
+    def _write(self: Report, record: dict[str, Any]) -> None:
+        """Write a record to the report file.
+
+        Args:
+            record: The record
+        """
+        if self._stream is None:
+            return
+        self._stream.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+
+def read_report(path: Path) -> Iterator[dict[str, Any]]:
+    """Stream the records of a report file.
+
+    Args:
+        path: The path to the report
+
+    Raises:
+        ValueError: If the file is not a report or the version is not supported
+
+    Yields:
+        The records, starting with the header
+    """
+    with open_report(path=path, mode="r") as stream:
+        header = json.loads(stream.readline() or "{}")
+        if header.get("format") != REPORT_FORMAT:
+            err = f"{path} is not an ftf report."
+            raise ValueError(err)
+        if header.get("version", 0) > REPORT_VERSION:
+            err = f"{path} is report version {header['version']}, {REPORT_VERSION} is supported."
+            raise ValueError(err)
+        yield header
+        for line in stream:
+            if line.strip():
+                yield json.loads(line)
+
+
+def merge_reports(paths: Iterable[Path], merged: Path | None = None) -> dict[str, Any]:
+    """Merge report files into a fleet summary.
+
+    The reports are streamed one record at a time, only the aggregates are kept
+    in memory. If a merged report path is provided, the result records of all
+    reports are copied to it.
+
+    Args:
+        paths: The report files
+        merged: The path to write the merged report to, if any
+
+    Returns:
+        The fleet summary
+    """
+    summary: dict[str, Any] = {
+        "format": REPORT_FORMAT,
+        "version": REPORT_VERSION,
+        "reports": 0,
+        "sessions": [],
+        "results": 0,
+        "statuses": {},
+        "checks": {},
+        "phases": {},
+        "prs": 0,
+        "duration": 0.0,
+        "commands": {},
+    }
+    with contextlib.ExitStack() as stack:
+        out = stack.enter_context(open_report(path=merged, mode="w")) if merged else None
+        if out:
+            header = {"type": "header", "format": REPORT_FORMAT, "version": REPORT_VERSION}
+            out.write(json.dumps(header, separators=(",", ":")) + "\n")
+        for path in paths:
+            summary["reports"] += 1
+            session_id = ""
+            for record in read_report(path=path):
+                _merge_record(summary=summary, record=record)
+                if record["type"] == "header":
+                    session_id = record.get("session_id", "")
+                elif out and record["type"] == "result":
+                    record["session_id"] = session_id
+                    out.write(json.dumps(record, separators=(",", ":")) + "\n")
+    return summary
+
+
+def _merge_record(summary: dict[str, Any], record: dict[str, Any]) -> None:
+    """Merge a single report record into the fleet summary.
+
+    Args:
+        summary: The fleet summary
+        record: The report record
+    """
+    kind = record.get("type")
+    if kind == "header":
+        shard = f" ({record['shard']})" if record.get("shard") else ""
+        summary["sessions"].append(f"{record.get('session_id', '')}{shard}")
+    elif kind == "result":
+        status = record["status"]
+        summary["results"] += 1
+        summary["statuses"][status] = summary["statuses"].get(status, 0) + 1
+        check = summary["checks"].setdefault(record["check"], {"duration": 0.0})
+        check[status] = check.get(status, 0) + 1
+        check["duration"] += record.get("duration", 0.0)
+        summary["prs"] += 1 if record.get("pr_url") else 0
+    elif kind == "phase":
+        phase = summary["phases"].setdefault(record["name"], {"total": 0.0, "max": 0.0})
+        phase["total"] += record["duration"]
+        phase["max"] = max(phase["max"], record["duration"])
+    elif kind == "latency":
+        for name, stats in record["commands"].items():
+            command = summary["commands"].setdefault(
+                name,
+                {"count": 0, "timeouts": 0, "max": 0.0},
+            )
+            command["count"] += stats["count"]
+            command["timeouts"] += stats["timeouts"]
+            command["max"] = max(command["max"], stats["max"])
+    elif kind == "footer":
+        summary["duration"] = max(summary["duration"], record["duration"])
@@ -0,0 +1,343 @@
+"""Scratch space for the files of a session, and the clean up of earlier sessions."""
+
+from __future__ import annotations
+
+import atexit
+import contextlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from ftf.settings import SCRATCH_POOL_SIZE
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+
+#: The prefix of everything ftf makes in the temporary directory
+TMP_PREFIX = "ftf_"
+#: The prefix of the scratch directory of a session, followed by its process ID
+SCRATCH_PREFIX = f"{TMP_PREFIX}scratch_"
+#: The name of a scratch directory
+SCRATCH_DIR = re.compile(rf"^{SCRATCH_PREFIX}(?P<pid>\d+)_")
+#: The file marking a temporary directory made by ftf, holding the process ID of the session
+#: using it, or 0 once released
+OWNER_FILE = ".ftf_owner"
+
+
+class Scratch:
+    """The scratch files of a session, in a directory removed at exit.
+
+    Released files are truncated and kept in a small pool, handed out again
+    before any new file is made.
+    """
+
+    def __init__(
+        self: Scratch,
+        pool_size: int = SCRATCH_POOL_SIZE,
+        root: Path | None = None,
+    ) -> None:
+        """Initialize the scratch space, the directory is made on first use.
+
+        Args:
+            pool_size: The released files kept for reuse, per suffix
+            root: The directory the scratch directory is made in, the system default if None
+        """
+        self._pool_size = pool_size
+        self._root = root
+        self._directory: Path | None = None
+        self._pool: dict[str, list[Path]] = {}
+        self._suffixes: dict[Path, str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self: Scratch) -> Path:
+        """Return the scratch directory, making it if needed.
+
+        Returns:
+            The scratch directory of the session
+        """
+        with self._lock:
+            if self._directory is None:
+                self._directory = Path(
+                    tempfile.mkdtemp(prefix=f"{SCRATCH_PREFIX}{os.getpid()}_", dir=self._root),
+                )
+                atexit.register(self.cleanup)
+            return self._directory
+
+    def file(self: Scratch, suffix: str = "") -> Path:
+        """Return an empty file, from the pool if one was released.
+
+        Args:
+            suffix: The suffix of the file
+
+        Returns:
+            The file
+        """
+        directory = self.directory
+        with self._lock:
+            pooled = self._pool.get(suffix)
+            if pooled:
+                return pooled.pop()
+            fd, name = tempfile.mkstemp(prefix=TMP_PREFIX, suffix=suffix, dir=directory)
+            os.close(fd)
+            path = Path(name)
+            self._suffixes[path] = suffix
+            return path
+
+    def release(self: Scratch, path: Path) -> None:
+        """Return a file no longer needed, it is truncated or removed.
+
+        Args:
+            path: The file, from this scratch space
+        """
+        with self._lock:
+            suffix = self._suffixes.get(path)
+            if suffix is None:
+                return
+            pool = self._pool.setdefault(suffix, [])
+            if path in pool:
+                return
+            if len(pool) < self._pool_size:
+                with contextlib.suppress(OSError):
+                    os.truncate(path, 0)
+                    pool.append(path)
+                    return
+            del self._suffixes[path]
+        path.unlink(missing_ok=True)
+
+    @contextlib.contextmanager
+    def borrow(self: Scratch, suffix: str = "") -> Iterator[Path]:
+        """Use a file within the context, released on exit.
+
+        Args:
+            suffix: The suffix of the file
+
+        Yields:
+            The file
+        """
+        path = self.file(suffix=suffix)
+        try:
+            yield path
+        finally:
+            self.release(path)
+
+    def cleanup(self: Scratch) -> int:
+        """Remove the scratch directory and all the files in it.
+
+        Returns:
+            The bytes reclaimed
+        """
+        with self._lock:
+            directory, self._directory = self._directory, None
+            self._pool = {}
+            self._suffixes = {}
+        if directory is None:
+            return 0
+        return _remove(directory)
+
+
+def claim(directory: Path) -> None:
+    """Mark a temporary directory as in use by this session, for as long as it runs.
+
+    Args:
+        directory: The directory, such as the one the repositories are cloned in
+    """
+    owner = directory / OWNER_FILE
+    pid = str(os.getpid())
+    owner.write_text(pid)
+
+    def release() -> None:
+        """Release the directory, unless another session claimed it since."""
+        with contextlib.suppress(OSError):
+            if owner.read_text() == pid:
+                owner.write_text("0")
+
+    atexit.register(release)
+
+
+@dataclass
+class Reclaimed:
+    """The temporary files and directories of earlier sessions removed."""
+
+    #: The paths removed
+    paths: list[Path] = field(default_factory=list)
+    #: The bytes reclaimed
+    size: int = 0
+
+
+def collect_garbage(
+    keep: Iterable[Path],
+    max_age: float,
+    max_size: int = 0,
+    root: Path | None = None,
+) -> Reclaimed:
+    """Remove the temporary files and directories left by earlier sessions.
+
+    Only the entries made by ftf are considered, the scratch directories and
+    the directories claimed by a session. Those of sessions no longer running
+    are removed, the scratch directories right away, as after a crash, the
+    others once older than max_age, then the oldest until all of them,
+    including those kept, fit in max_size.
+
+    Args:
+        keep: The paths in use by this session, never removed
+        max_age: The age in seconds after which an entry is removed, 0 for no limit
+        max_size: The most bytes all the entries may use, 0 for no limit
+        root: The temporary directory, the system default if None
+
+    Returns:
+        The entries removed and the space reclaimed
+    """
+    root = root or Path(tempfile.gettempdir())
+    keep = {path.resolve() for path in keep}
+    reclaimed = Reclaimed()
+    now = time.time()
+    candidates: list[tuple[float, Path]] = []
+    kept_size = 0
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if not entry.name.startswith(TMP_PREFIX):
+                continue
+            path = Path(entry.path)
+            owner = _owner(path)
+            if path.resolve() in keep or (owner is not None and _running(owner)):
+                kept_size += _tree_size(path) if max_size else 0
+            elif owner is None:
+                # Not made by ftf, such as the files of another tool with the same prefix
+                continue
+            elif SCRATCH_DIR.match(entry.name):
+                reclaimed.size += _remove(path)
+                reclaimed.paths.append(path)
+            else:
+                with contextlib.suppress(OSError):
+                    candidates.append((entry.stat(follow_symlinks=False).st_mtime, path))
+
+    remaining: list[tuple[Path, int]] = []
+    for mtime, path in sorted(candidates):
+        if max_age and now - mtime > max_age:
+            reclaimed.size += _remove(path)
+            reclaimed.paths.append(path)
+        elif max_size:
+            remaining.append((path, _tree_size(path)))
+
+    _fit(
+        remaining=remaining,
+        total=kept_size + sum(size for _, size in remaining),
+        max_size=max_size,
+        reclaimed=reclaimed,
+    )
+    return reclaimed
+
+
+def _fit(
+    remaining: list[tuple[Path, int]],
+    total: int,
+    max_size: int,
+    reclaimed: Reclaimed,
+) -> None:
+    """Remove the oldest entries until all of them fit in a size.
+
+    Args:
+        remaining: The entries that may be removed and their sizes, oldest first
+        total: The size of all the entries, including those kept
+        max_size: The most bytes all the entries may use
+        reclaimed: The entries removed and the space reclaimed, updated
+    """
+    for path, size in remaining:
+        if total <= max_size:
+            break
+        reclaimed.size += _remove(path)
+        reclaimed.paths.append(path)
+        total -= size
+
+
+def _owner(path: Path) -> int | None:
+    """Return the process ID of the session owning a temporary entry made by ftf.
+
+    Args:
+        path: The file or directory
+
+    Returns:
+        The process ID from the name of a scratch directory or the mark of a claimed
+        directory, 0 if released, None if the entry was not made by ftf
+    """
+    scratch = SCRATCH_DIR.match(path.name)
+    if scratch:
+        return int(scratch["pid"])
+    try:
+        return int((path / OWNER_FILE).read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _running(pid: int) -> bool:
+    """Determine if a process is running.
+
+    Args:
+        pid: The process ID
+
+    Returns:
+        True if the process exists, even if owned by another user
+    """
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _tree_size(path: Path) -> int:
+    """Sum the sizes of a file, or of all the files below a directory.
+
+    Args:
+        path: The file or directory
+
+    Returns:
+        The size in bytes, the entries that vanish are skipped
+    """
+    try:
+        stat = path.lstat()
+    except OSError:
+        return 0
+    if not path.is_dir() or path.is_symlink():
+        return stat.st_size
+    size = 0
+    for dir_path, _, file_names in os.walk(path):
+        for file_name in file_names:
+            with contextlib.suppress(OSError):
+                size += Path(dir_path, file_name).lstat().st_size
+    return size
+
+
+def _remove(path: Path) -> int:
+    """Remove a file or directory tree.
+
+    Args:
+        path: The file or directory
+
+    Returns:
+        The bytes reclaimed
+    """
+    size = _tree_size(path)
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        path.unlink(missing_ok=True)
+    return size - _tree_size(path)
+
+
+#: The scratch space of this process
+SCRATCH = Scratch()
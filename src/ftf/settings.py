@@ -88,3 +88,62 @@ PRE_COMMIT: dict[str, dict[str, list[str]]] = {
     "ansible-dev-tools": {"skip": ["https://github.com/jazzband/pip-tools"]},
     "molecule": {"skip": ["https://github.com/ansible/ansible-lint"]},
 }
+
+# Fields of the pre-commit config kept from the repository rather than the template,
+# keyed by a glob of the hook repository URI for the fields of the repository entry,
+# or <uri glob>#<hook id glob> for the fields of the hooks
+PRE_COMMIT_KEEP: dict[str, list[str]] = {
+    "*": ["rev"],
+    "*mypy.git#mypy": ["additional_dependencies"],
+    "*pylint.git#pylint": ["additional_dependencies"],
+}
+
+# Merge rules for pyproject.toml, keyed by TOML dotted path, actions:
+#   union: keep the base table, adding the keys only found in the repository
+#   repo: use the repository value if present, otherwise keep the base value
+#   require: use the repository value, an error if missing
+#   drop_if_missing: keep the base value, removed if missing from the repository
+# Options: sort (sort the resulting array), warn_unless_prefix (warn if the
+# repository value does not start with the base value)
+PY_PROJECT: dict[str, dict[str, str | bool]] = {
+    "project": {"action": "union"},
+    "tool.black": {"action": "union"},
+    "tool.coverage.report.fail_under": {"action": "require"},
+    "tool.coverage.run.source_pkgs": {"action": "require"},
+    "tool.mypy.exclude": {"action": "repo"},
+    "tool.mypy.overrides": {"action": "repo"},
+    "tool.pylint.master.ignore": {"action": "repo", "sort": True},
+    "tool.pytest.ini_options.addopts": {"action": "require", "warn_unless_prefix": True},
+    "tool.pytest.ini_options.markers": {"action": "repo"},
+    "tool.pytest.ini_options.norecursedirs": {"action": "repo"},
+    "tool.pytest.ini_options.tmp_path_retention_policy": {"action": "drop_if_missing"},
+    "tool.ruff.exclude": {"action": "repo"},
+    "tool.ruff.lint.isort.known-first-party": {"action": "repo"},
+    "tool.ruff.lint.per-file-ignores": {"action": "union"},
+    "tool.setuptools.dynamic": {"action": "require"},
+    "tool.setuptools_scm.write_to": {"action": "require"},
+}
+
+# The seconds a command may run, keyed by command prefix, the longest matching
+# prefix applies and the empty prefix is the default for other commands
+COMMAND_TIMEOUTS: dict[str, float] = {
+    "": 600,
+    "gh": 120,
+    "gh repo clone": 900,
+    "gh repo fork": 300,
+    "git": 120,
+    "git clone": 900,
+    "git fetch": 300,
+    "git ls-remote": 60,
+    "git pull": 300,
+    "git push": 300,
+}
+
+# The seconds all the commands for a single repository may run, per check
+REPO_TIMEOUT = 1800.0
+
+# The scratch files kept for reuse once released, per suffix
+SCRATCH_POOL_SIZE = 8
+
+# The days after which the temporary directories of earlier sessions are removed
+TMP_MAX_AGE = 7.0
@@ -0,0 +1,135 @@
+"""A read-only view of the fleet, without cloning any repository."""
+
+from __future__ import annotations
+
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
+
+from ftf.pull_requests import PullRequest, open_prs
+from ftf.utils import format_table
+
+
+if TYPE_CHECKING:
+    from ftf.repo import Repo
+
+
+@dataclass
+class RepoStatus:
+    """The state of a repository in the fleet."""
+
+    #: The name of the repository
+    name: str
+    #: The SHA of main in upstream
+    upstream: str = ""
+    #: The SHA of main in origin
+    origin: str = ""
+    #: The open ftf pull requests, None if not queried
+    prs: list[PullRequest] | None = None
+    #: Errors encountered while querying
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def sync(self: RepoStatus) -> str:
+        """Describe how origin/main relates to upstream/main.
+
+        Returns:
+            The description
+        """
+        if not self.upstream or not self.origin:
+            return "unknown"
+        if self.origin == self.upstream:
+            return "in sync"
+        return "out of sync"
+
+
+def repo_status(repo: Repo, pr_ttl: float, with_prs: bool) -> RepoStatus:  # noqa: FBT001
+    """Query the state of a single repository.
+
+    Args:
+        repo: The repository
+        pr_ttl: The number of seconds a cached PR listing is valid for
+        with_prs: Whether to list the open ftf pull requests
+
+    Returns:
+        The state of the repository
+    """
+    status = RepoStatus(name=repo.name)
+    try:
+        status.upstream = repo.remote_heads(repo.upstream_uri, quiet=True).get("main", "")
+        status.origin = repo.remote_heads(repo.origin_uri, quiet=True).get("main", "")
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as exc:
+        status.errors.append(f"ls-remote failed: {_error_line(exc)}")
+    if with_prs and repo.on_github:
+        try:
+            status.prs = open_prs(repo=repo, ttl=pr_ttl, quiet=True)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as exc:
+            status.errors.append(f"PR listing failed: {_error_line(exc)}")
+    return status
+
+
+def _error_line(exc: subprocess.CalledProcessError | subprocess.TimeoutExpired) -> str:
+    """Return the first line of the error output of a failed command.
+
+    Args:
+        exc: The exception raised by the command
+
+    Returns:
+        The first line of the error output, or the exception itself
+    """
+    if isinstance(exc, subprocess.TimeoutExpired):
+        return f"{exc.cmd} timed out after {exc.timeout:.0f}s."
+    lines = (exc.stderr or "").strip().splitlines()
+    return lines[0] if lines else str(exc)
+
+
+def fleet_status(
+    repo_list: list[Repo],
+    jobs: int,
+    pr_ttl: float,
+    with_prs: bool,  # noqa: FBT001
+) -> list[RepoStatus]:
+    """Query the state of all repositories concurrently.
+
+    Args:
+        repo_list: The repositories
+        jobs: The maximum number of repositories queried at once
+        pr_ttl: The number of seconds a cached PR listing is valid for
+        with_prs: Whether to list the open ftf pull requests
+
+    Returns:
+        The state of each repository, in the order of the repository list
+    """
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        return list(
+            executor.map(
+                lambda repo: repo_status(repo=repo, pr_ttl=pr_ttl, with_prs=with_prs),
+                repo_list,
+            ),
+        )
+
+
+def status_table(statuses: list[RepoStatus]) -> list[str]:
+    """Format the state of the repositories as a table.
+
+    Args:
+        statuses: The state of each repository
+
+    Returns:
+        The lines of the table
+    """
+    rows = [("Repository", "Upstream", "Origin", "Sync", "PRs", "Errors")]
+    rows.extend(
+        (
+            status.name,
+            status.upstream[:10],
+            status.origin[:10],
+            status.sync,
+            "-" if status.prs is None else str(len(status.prs)),
+            "; ".join(status.errors),
+        )
+        for status in statuses
+    )
+    return format_table(rows)
@@ -0,0 +1,239 @@
+"""A queue for the pushes and PR changes sent to GitHub, paced to stay under its rate limits."""
+
+from __future__ import annotations
+
+import random
+import re
+import subprocess
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, TypeVar
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+
+T = TypeVar("T")
+
+#: The error output of git and gh when GitHub rejects a request for exceeding a rate limit
+RATE_LIMITED = re.compile(
+    r"rate limit|abuse detection|HTTP 403|HTTP 429|\b403 Forbidden|\b429 Too Many",
+    re.IGNORECASE,
+)
+#: A retry-after hint in the error output, in seconds
+RETRY_AFTER = re.compile(r"retry[- ]after:?\s*(?P<seconds>\d+)", re.IGNORECASE)
+
+
+def rate_limit_delay(exc: subprocess.CalledProcessError) -> float | None:
+    """Determine if a command failed because of a rate limit.
+
+    Args:
+        exc: The exception raised by the command
+
+    Returns:
+        The seconds GitHub asked to wait, 0.0 if not given, None if not rate limited
+    """
+    error = f"{exc.stderr or ''}\n{exc.stdout or ''}"
+    if not RATE_LIMITED.search(error):
+        return None
+    retry_after = RETRY_AFTER.search(error)
+    return float(retry_after["seconds"]) if retry_after else 0.0
+
+
+class TokenBucket:
+    """Paces requests to a sustained rate, allowing short bursts."""
+
+    def __init__(self: TokenBucket, rate: float, burst: int) -> None:
+        """Initialize the bucket, full.
+
+        Args:
+            rate: The sustained number of requests per second
+            burst: The most requests sent back to back
+        """
+        self._rate = rate
+        self._burst = max(1, burst)
+        self._tokens = float(self._burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self: TokenBucket) -> None:
+        """Take a token, waiting for one if the bucket is empty."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._burst,
+                    self._tokens + (now - self._updated) * self._rate,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
+
+
+@dataclass
+class QueueStats:
+    """The requests sent through the queue during a run."""
+
+    #: The requests that succeeded
+    succeeded: int = 0
+    #: The requests that failed
+    failed: int = 0
+    #: The requests rejected for exceeding a rate limit, then retried
+    rate_limited: int = 0
+    #: The seconds spent backing off
+    backoff: float = 0.0
+    #: The lowest concurrency the queue backed off to
+    min_limit: int = 0
+
+
+class SubmitQueue:
+    """Sends requests to GitHub at a paced rate, with an adaptive concurrency limit.
+
+    The concurrency limit grows by one after a full window of successes and is
+    halved when a request is rate limited. A rate limited request pauses the
+    whole queue for a jittered, exponentially growing delay, or the delay
+    GitHub asked for, then it is retried.
+    """
+
+    def __init__(
+        self: SubmitQueue,
+        rate: float = 1.0,
+        max_jobs: int = 4,
+        max_retries: int = 5,
+        backoff: float = 2.0,
+        max_backoff: float = 120.0,
+    ) -> None:
+        """Initialize the queue.
+
+        Args:
+            rate: The sustained number of requests per second
+            max_jobs: The most requests in flight at once
+            max_retries: The most retries of a rate limited request
+            backoff: The initial backoff in seconds, doubled with each retry
+            max_backoff: The longest backoff in seconds
+        """
+        self._bucket = TokenBucket(rate=rate, burst=max_jobs)
+        self._max_jobs = max(1, max_jobs)
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._max_backoff = max_backoff
+        self._limit = self._max_jobs
+        self._active = 0
+        self._window = 0
+        self._paused_until = 0.0
+        self._condition = threading.Condition()
+        self.stats = QueueStats(min_limit=self._max_jobs)
+
+    @property
+    def limit(self: SubmitQueue) -> int:
+        """Return the current concurrency limit.
+
+        Returns:
+            The most requests currently allowed in flight
+        """
+        return self._limit
+
+    def submit(self: SubmitQueue, request: Callable[[], T]) -> T:
+        """Send a request, retrying it if rate limited.
+
+        Args:
+            request: Runs the git or gh command
+
+        Raises:
+            subprocess.CalledProcessError: If the command failed for another
+                reason, or was still rate limited after the last retry
+
+        Returns:
+            The result of the request
+        """
+        attempt = 0
+        while True:
+            self._enter()
+            try:
+                result = request()
+            except subprocess.CalledProcessError as exc:
+                delay = rate_limit_delay(exc)
+                if delay is None or attempt >= self._max_retries:
+                    self._leave(succeeded=False)
+                    raise
+                self._rate_limited(attempt=attempt, delay=delay)
+                attempt += 1
+                continue
+            except BaseException:
+                # Such as a command timing out, the slot is released whatever the outcome
+                self._leave(succeeded=False)
+                raise
+            self._leave(succeeded=True)
+            return result
+
+    def run_all(self: SubmitQueue, tasks: list[Callable[[], T]]) -> list[T]:
+        """Run tasks concurrently, their requests paced by the queue.
+
+        Args:
+            tasks: The tasks, each sending one or more requests through the queue
+
+        Returns:
+            The results of the tasks, in order
+        """
+        if len(tasks) < 2:  # noqa: PLR2004
+            return [task() for task in tasks]
+        with ThreadPoolExecutor(max_workers=self._max_jobs) as executor:
+            return list(executor.map(lambda task: task(), tasks))
+
+    def _enter(self: SubmitQueue) -> None:
+        """Wait for a free slot and any pause to end, then take a token."""
+        with self._condition:
+            while True:
+                pause = self._paused_until - time.monotonic()
+                if pause > 0:
+                    self._condition.wait(timeout=pause)
+                elif self._active >= self._limit:
+                    self._condition.wait()
+                else:
+                    break
+            self._active += 1
+        self._bucket.acquire()
+
+    def _leave(self: SubmitQueue, succeeded: bool) -> None:  # noqa: FBT001
+        """Release a slot, growing the limit after a full window of successes.
+
+        Args:
+            succeeded: Whether the request succeeded
+        """
+        with self._condition:
+            self._active -= 1
+            if succeeded:
+                self.stats.succeeded += 1
+                self._window += 1
+                if self._window >= self._limit:
+                    self._limit = min(self._max_jobs, self._limit + 1)
+                    self._window = 0
+            else:
+                self.stats.failed += 1
+            self._condition.notify_all()
+
+    def _rate_limited(self: SubmitQueue, attempt: int, delay: float) -> None:
+        """Release a slot, halve the limit and pause the queue.
+
+        Args:
+            attempt: The number of retries so far
+            delay: The seconds GitHub asked to wait, 0.0 if not given
+        """
+        ceiling = min(self._max_backoff, self._backoff * 2**attempt)
+        delay = max(delay, random.uniform(ceiling / 2, ceiling))  # noqa: S311
+        with self._condition:
+            self._active -= 1
+            self._window = 0
+            self._limit = max(1, self._limit // 2)
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self.stats.rate_limited += 1
+            self.stats.backoff += delay
+            self.stats.min_limit = min(self.stats.min_limit, self._limit)
+            self._condition.notify_all()
@@ -0,0 +1,152 @@
+"""The release tags of remote repositories, cached to avoid repeated ls-remote calls."""
+
+from __future__ import annotations
+
+import json
+import re
+import subprocess
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from ftf.utils import content_hash, subprocess_run, xdg_cache_home
+
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable
+
+    from ftf.config import Config
+
+
+#: A release tag, an optional v, dotted numbers and an optional pre-release suffix
+_VERSION = re.compile(
+    r"v?(?P<release>\d+(?:\.\d+)*)"
+    r"(?P<pre>[-.]?(?:a|b|rc|alpha|beta|dev|pre)\.?\d*)?",
+)
+
+
+def parse_version(tag: str) -> tuple[tuple[int, ...], bool] | None:
+    """Parse a release tag into a sortable version.
+
+    Args:
+        tag: The tag
+
+    Returns:
+        The release numbers and whether it is a pre-release, None if not a release tag
+    """
+    match = _VERSION.fullmatch(tag)
+    if match is None:
+        return None
+    return tuple(int(part) for part in match["release"].split(".")), bool(match["pre"])
+
+
+def latest_tag(tags: Iterable[str], current: str) -> str:
+    """Pick the tag to update to from the current rev.
+
+    Pre-releases are only considered if the current rev is one, and a rev is
+    never downgraded. Revs that are not release tags, such as commit SHAs,
+    are left as is.
+
+    Args:
+        tags: The tags of the remote
+        current: The current rev
+
+    Returns:
+        The rev to use
+    """
+    current_version = parse_version(current)
+    if current_version is None:
+        return current
+    best, best_key = current, (current_version[0], not current_version[1])
+    for tag in tags:
+        version = parse_version(tag)
+        if version is None or (version[1] and not current_version[1]):
+            continue
+        # A release sorts after the pre-releases of the same numbers
+        key = (version[0], not version[1])
+        if key > best_key:
+            best, best_key = tag, key
+    return best
+
+
+class TagIndex:
+    """The release tags of the hook repositories, one ls-remote per URI per TTL."""
+
+    def __init__(self: TagIndex, config: Config, ttl: float, jobs: int) -> None:
+        """Initialize the index.
+
+        Args:
+            config: The configuration object
+            ttl: The number of seconds cached tags are valid for
+            jobs: The maximum number of remotes queried at once
+        """
+        self._config = config
+        self._ttl = ttl
+        self._jobs = jobs
+        self._tags: dict[str, list[str]] = {}
+
+    def prefetch(self: TagIndex, uris: Iterable[str]) -> None:
+        """Load the tags of the URIs, querying the uncached ones concurrently.
+
+        Args:
+            uris: The repository URIs
+        """
+        missing = sorted(set(uris) - self._tags.keys())
+        with ThreadPoolExecutor(max_workers=max(1, self._jobs)) as executor:
+            self._tags.update(zip(missing, executor.map(self._load, missing), strict=True))
+
+    def update_rev(self: TagIndex, uri: str, current: str) -> str:
+        """Pick the rev to update to for a hook repository.
+
+        Args:
+            uri: The repository URI
+            current: The current rev
+
+        Returns:
+            The rev to use
+        """
+        if uri not in self._tags:
+            self.prefetch(uris=[uri])
+        return latest_tag(tags=self._tags[uri], current=current)
+
+    def _load(self: TagIndex, uri: str) -> list[str]:
+        """Load the tags of a URI from the cache or the remote.
+
+        Args:
+            uri: The repository URI
+
+        Returns:
+            The tags, empty if the remote could not be queried
+        """
+        cache_file = xdg_cache_home() / "tags" / f"{content_hash(uri)}.json"
+        if cache_file.exists():
+            cached = json.loads(cache_file.read_text())
+            if time.time() - cached["timestamp"] < self._ttl:
+                return list(cached["tags"])
+
+        try:
+            proc = subprocess_run(
+                command=f"git ls-remote --tags --refs {uri}",
+                msg=f"Listing {uri} tags...",
+                output=self._config.output,
+                verbose=self._config.args.verbose,
+                quiet=True,
+                capture=True,
+            )
+        except subprocess.CalledProcessError as exc:
+            error = next(iter((exc.stderr or "").strip().splitlines()), str(exc))
+            self._config.output.warning(f"Unable to list the tags of {uri}: {error}")
+            return []
+        except subprocess.TimeoutExpired as exc:
+            error = f"{exc.cmd} timed out after {exc.timeout:.0f}s."
+            self._config.output.warning(f"Unable to list the tags of {uri}: {error}")
+            return []
+        tags = [
+            ref.removeprefix("refs/tags/")
+            for _, _, ref in (line.partition("\t") for line in (proc.stdout or "").splitlines())
+            if ref.startswith("refs/tags/")
+        ]
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        cache_file.write_text(json.dumps({"timestamp": time.time(), "uri": uri, "tags": tags}))
+        return tags
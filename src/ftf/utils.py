@@ -2,10 +2,17 @@
 
 from __future__ import annotations
 
+import codecs
+import collections
+import contextlib
+import hashlib
 import importlib.resources
 import itertools
 import logging
 import os
+import shlex
+import shutil
+import signal
 import subprocess
 import sys
 import tempfile
@@ -13,12 +20,13 @@ import threading
 import time
 
 from pathlib import Path
-from typing import TYPE_CHECKING
+from typing import IO, TYPE_CHECKING, BinaryIO
 
-import subprocess_tee
 import tomllib
 
+from ftf.deadlines import LATENCY, command_timeout, command_type
 from ftf.output import Color, Output, TermFeatures
+from ftf.scratch import SCRATCH
 
 
 ScalarVal = bool | str | float | int | None
@@ -26,7 +34,7 @@ JSONVal = ScalarVal | list["JSONVal"] | dict[str, "JSONVal"]
 
 if TYPE_CHECKING:
 
-    from collections.abc import Iterator
+    from collections.abc import Callable, Iterable, Sequence
     from types import TracebackType
 
     from ftf.config import Config
@@ -63,6 +71,130 @@ def load_toml_file(file_path: Path) -> dict[str, JSONVal]:
         return tomllib.load(f)
 
 
+def content_hash(content: str | bytes) -> str:
+    """Return a content address for some text or bytes.
+
+    Args:
+        content: The content to hash.
+
+    Returns:
+        The sha256 hex digest of the content.
+    """
+    if isinstance(content, str):
+        content = content.encode()
+    return hashlib.sha256(content).hexdigest()
+
+
+#: The size of the blocks read when comparing, hashing and sniffing files
+CHUNK_SIZE = 1024 * 1024
+#: The FICLONE ioctl, clones a file on copy-on-write filesystems (btrfs, xfs)
+FICLONE = 0x40049409
+
+
+def file_hash(file_path: Path) -> str:
+    """Return a content address for a file without loading it into memory.
+
+    Args:
+        file_path: The path to the file.
+
+    Returns:
+        The sha256 hex digest of the file.
+    """
+    digest = hashlib.sha256()
+    with file_path.open(mode="rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def is_text_file(file_path: Path) -> bool:
+    """Determine if a file is text, by looking for a NUL byte at its start.
+
+    Args:
+        file_path: The path to the file.
+
+    Returns:
+        True if the file looks like UTF-8 text.
+    """
+    with file_path.open(mode="rb") as f:
+        head = f.read(CHUNK_SIZE)
+    if b"\0" in head:
+        return False
+    try:
+        # Incremental, a multi-byte character cut at the end of the block is fine
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def files_equal(left: Path, right: Path) -> bool:
+    """Compare two files byte for byte, stopping at the first difference.
+
+    Args:
+        left: The path to the first file.
+        right: The path to the second file.
+
+    Returns:
+        True if the files have the same content.
+    """
+    if left.stat().st_size != right.stat().st_size:
+        return False
+    with left.open(mode="rb") as left_f, right.open(mode="rb") as right_f:
+        while True:
+            left_chunk = left_f.read(CHUNK_SIZE)
+            if left_chunk != right_f.read(CHUNK_SIZE):
+                return False
+            if not left_chunk:
+                return True
+
+
+def copy_file(src: Path, dest: Path) -> None:
+    """Copy a file, sharing the blocks when the filesystem supports it.
+
+    A reflink is attempted first, then copy_file_range, so the data is not
+    copied through user space. Otherwise a regular copy is made. The
+    permission bits are copied as well.
+
+    Args:
+        src: The path to the source file.
+        dest: The path to the destination file.
+    """
+    with src.open(mode="rb") as src_f, dest.open(mode="wb") as dest_f:
+        try:
+            import fcntl  # pylint: disable=import-outside-toplevel # noqa: PLC0415
+
+            fcntl.ioctl(dest_f.fileno(), FICLONE, src_f.fileno())
+        except (ImportError, OSError):
+            _copy_range(src_f=src_f, dest_f=dest_f)
+    shutil.copymode(src, dest)
+
+
+def _copy_range(src_f: BinaryIO, dest_f: BinaryIO) -> None:
+    """Copy the content of an open file with copy_file_range, if available.
+
+    Args:
+        src_f: The source file.
+        dest_f: The destination file.
+    """
+    remaining = os.fstat(src_f.fileno()).st_size
+    if hasattr(os, "copy_file_range"):
+        try:
+            while remaining > 0:
+                copied = os.copy_file_range(src_f.fileno(), dest_f.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+        except OSError:
+            # Not supported between these filesystems, start over
+            src_f.seek(0)
+            dest_f.seek(0)
+            dest_f.truncate()
+        else:
+            return
+    shutil.copyfileobj(src_f, dest_f, CHUNK_SIZE)
+
+
 def path_to_data_file(name: str) -> Path:
     """Return the path to a data file.
 
@@ -86,7 +218,9 @@ def tmp_path() -> Path:
 
 
 def tmp_file(suffix: str | None = None) -> Path:
-    """Return a temporary file.
+    """Return a temporary file in the scratch space, removed at exit.
+
+    Release it with ``SCRATCH.release`` once no longer needed, for reuse.
 
     Args:
         suffix: The suffix for the file.
@@ -94,29 +228,62 @@ def tmp_file(suffix: str | None = None) -> Path:
     Returns:
         The temporary file.
     """
-    return Path(tempfile.mkstemp(prefix="ftf_", suffix=suffix)[1])
+    return SCRATCH.file(suffix=suffix or "")
 
 
-def render_diff(diff: Iterator[str]) -> None:
-    """Render the diff between the base and repo content.
+DIFF_COLORS = (
+    ("---", Color.BRIGHT_MAGENTA),
+    ("+++", Color.BRIGHT_CYAN),
+    ("@@", Color.BRIGHT_YELLOW),
+    ("-", Color.BRIGHT_RED),
+    ("+", Color.BRIGHT_GREEN),
+)
+
+
+def format_diff(diff: Iterable[str], color: bool) -> str:  # noqa: FBT001
+    """Format the diff between the base and repo content as a single string.
 
     Args:
-        diff: The diff object.
+        diff: The diff lines
+        color: Whether to color the lines
+
+    Returns:
+        The formatted diff
     """
+    if not color:
+        return "".join(f"{line}\n" for line in diff)
+    parts = []
     for line in diff:
-        if line.startswith("---"):
-            color = Color.BRIGHT_MAGENTA
-        elif line.startswith("+++"):
-            color = Color.BRIGHT_CYAN
-        elif line.startswith("@@"):
-            color = Color.BRIGHT_YELLOW
-        elif line.startswith("-"):
-            color = Color.BRIGHT_RED
-        elif line.startswith("+"):
-            color = Color.BRIGHT_GREEN
+        line_color = next(
+            (code for prefix, code in DIFF_COLORS if line.startswith(prefix)),
+            Color.GREY,
+        )
+        parts.append(f"{line_color}{line}{Color.END}\n")
+    return "".join(parts)
+
+
+def render_diff(diff: Iterable[str], term_features: TermFeatures) -> None:
+    """Render the diff between the base and repo content.
+
+    The diff is written at once, or through $PAGER (default less -R) when
+    stdout is a terminal and the diff is taller than it.
+
+    Args:
+        diff: The diff lines
+        term_features: The terminal features
+    """
+    text = format_diff(diff=diff, color=term_features.color)
+    pager = os.environ.get("PAGER", "less -R")
+    if pager and sys.stdout.isatty() and text.count("\n") >= shutil.get_terminal_size().lines:
+        sys.stdout.flush()
+        try:
+            subprocess.run(shlex.split(pager), input=text, text=True, check=False)  # noqa: S603
+        except OSError:
+            pass
         else:
-            color = Color.GREY
-        print(f"{color}{line}{Color.END}")  # noqa: T201
+            return
+    sys.stdout.write(text)
+    sys.stdout.flush()
 
 
 class Spinner:  # pylint: disable=too-many-instance-attributes
@@ -234,15 +401,65 @@ class Spinner:  # pylint: disable=too-many-instance-attributes
         sys.stdout.write("\033[?25h")
 
 
+#: The seconds to wait for the output of a finished or killed process to be read
+READER_GRACE = 5.0
+#: The lines of output kept per stream of a command not captured, for error reports
+OUTPUT_TAIL_LINES = 200
+#: The longest line read at once, longer lines are split
+OUTPUT_LINE_LIMIT = 8192
+
+
+class OutputTail:
+    """The last lines of an output stream, older lines are dropped."""
+
+    def __init__(self: OutputTail, max_lines: int | None) -> None:
+        """Initialize the tail.
+
+        Args:
+            max_lines: The number of lines kept, None to keep all of them
+        """
+        self._lines: collections.deque[str] = collections.deque(maxlen=max_lines)
+        self.dropped = 0
+
+    def append(self: OutputTail, line: str) -> None:
+        """Add a line, dropping the oldest one if full.
+
+        Args:
+            line: The line
+        """
+        if self._lines.maxlen is not None and len(self._lines) == self._lines.maxlen:
+            self.dropped += 1
+        self._lines.append(line)
+
+    def text(self: OutputTail) -> str:
+        """Return the lines kept, noting how many were dropped.
+
+        Returns:
+            The lines kept
+        """
+        dropped = f"[{self.dropped} earlier lines dropped]\n" if self.dropped else ""
+        return dropped + "".join(self._lines)
+
+
 def subprocess_run(  # noqa: PLR0913
     command: str,
     verbose: int,
     msg: str,
     output: Output,
+    *,
     cwd: Path | None = None,
     env: dict[str, str] | None = None,
+    quiet: bool = False,
+    capture: bool = False,
+    on_line: Callable[[str], None] | None = None,
 ) -> subprocess.CompletedProcess[str]:
-    """Run a subprocess command.
+    """Run a subprocess command, killed if it outlives its timeout.
+
+    The timeout is the sooner of the one for the command type in the settings
+    and the deadline of the current repository, if any. The output is read
+    line by line, only the last OUTPUT_TAIL_LINES of each stream are kept
+    unless the stdout is captured. At debug verbosity the output is also
+    written to the terminal, and to the log file when it logs debug messages.
 
     Args:
         command: The command to run
@@ -251,31 +468,188 @@ def subprocess_run(  # noqa: PLR0913
         output: The output object
         cwd: The current working directory
         env: The environment variables
+        quiet: Do not show a spinner, used when commands run concurrently
+        capture: Keep all of the stdout, for commands whose output is parsed
+        on_line: Called with each line of stdout as it is read
     Returns:
-        The completed process
+        The completed process, the stderr and uncaptured stdout are their tails
     """
     cmd = f"Running command: {command}"
     output.debug(cmd)
+    timeout = command_timeout(command)
     log_level = logging.ERROR - (verbose * 10)
-    if log_level == logging.DEBUG:
-        return subprocess_tee.run(
-            command,
-            check=True,
-            cwd=cwd,
-            env=env,
-            shell=True,  # noqa: S604
-            text=True,
-        )
-    with Spinner(message=msg, term_features=output.term_features):
-        return subprocess.run(
-            command,
-            check=True,
-            cwd=cwd,
-            env=env,
-            shell=True,  # noqa: S602
-            capture_output=True,
-            text=True,
+    tee = log_level == logging.DEBUG
+    log = output.log_to_file and output.logger.isEnabledFor(logging.DEBUG)
+    name = command_type(command)
+
+    def read(stream: IO[str], line: str) -> None:
+        """Pass a line of output on, as configured.
+
+        Args:
+            stream: The terminal stream matching the output stream
+            line: The line
+        """
+        if tee:
+            stream.write(line)
+            stream.flush()
+        if log:
+            output.logger.debug("%s: %s", name, line.rstrip("\n"))
+        if on_line is not None and stream is sys.stdout:
+            on_line(line)
+
+    term_features = (
+        TermFeatures(color=False, links=False) if quiet or tee else output.term_features
+    )
+    start = time.monotonic()
+    timed_out = False
+    try:
+        with Spinner(message=msg, term_features=term_features):
+            return _run_process(
+                command=command,
+                cwd=cwd,
+                env=env,
+                timeout=timeout,
+                capture=capture,
+                on_line=read if tee or log or on_line else None,
+            )
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        raise
+    finally:
+        LATENCY.record(command=command, seconds=time.monotonic() - start, timed_out=timed_out)
+
+
+def _run_process(  # noqa: PLR0913
+    command: str,
+    cwd: Path | None,
+    env: dict[str, str] | None,
+    timeout: float | None,
+    *,
+    capture: bool,
+    on_line: Callable[[IO[str], str], None] | None,
+) -> subprocess.CompletedProcess[str]:
+    """Run a command in its own process group, killing the group on timeout.
+
+    Args:
+        command: The command to run
+        cwd: The current working directory
+        env: The environment variables
+        timeout: The seconds the command may run, None for no timeout
+        capture: Keep all of the stdout rather than its tail
+        on_line: Called with the terminal stream and each line as it is read
+
+    Raises:
+        subprocess.TimeoutExpired: If the command outlived its timeout
+        subprocess.CalledProcessError: If the command failed
+
+    Returns:
+        The completed process
+    """
+    stdout = OutputTail(max_lines=None if capture else OUTPUT_TAIL_LINES)
+    stderr = OutputTail(max_lines=OUTPUT_TAIL_LINES)
+    with subprocess.Popen(  # noqa: S602
+        command,
+        cwd=cwd,
+        env=env,
+        shell=True,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        start_new_session=True,
+    ) as proc:
+        readers = [
+            threading.Thread(target=_drain, args=(stream, tail, echo, on_line), daemon=True)
+            for stream, tail, echo in (
+                (proc.stdout, stdout, sys.stdout),
+                (proc.stderr, stderr, sys.stderr),
+            )
+        ]
+        for reader in readers:
+            reader.start()
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            with contextlib.suppress(ProcessLookupError):
+                os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+            for reader in readers:
+                reader.join(timeout=READER_GRACE)
+            raise subprocess.TimeoutExpired(
+                cmd=command,
+                timeout=timeout or 0,
+                output=stdout.text(),
+                stderr=stderr.text(),
+            ) from None
+        for reader in readers:
+            reader.join(timeout=READER_GRACE)
+    if proc.returncode:
+        raise subprocess.CalledProcessError(
+            returncode=proc.returncode,
+            cmd=command,
+            output=stdout.text(),
+            stderr=stderr.text(),
         )
+    return subprocess.CompletedProcess(
+        args=command,
+        returncode=proc.returncode,
+        stdout=stdout.text(),
+        stderr=stderr.text(),
+    )
+
+
+def _drain(
+    stream: IO[str],
+    tail: OutputTail,
+    echo: IO[str],
+    on_line: Callable[[IO[str], str], None] | None,
+) -> None:
+    """Read a stream of a process line by line until it closes.
+
+    Args:
+        stream: The stdout or stderr of the process
+        tail: Keeps the last lines
+        echo: The matching terminal stream, passed on with each line
+        on_line: Called with the terminal stream and each line, if any
+    """
+    while line := stream.readline(OUTPUT_LINE_LIMIT):
+        tail.append(line)
+        if on_line is not None:
+            on_line(echo, line)
+
+
+def format_size(size: float) -> str:
+    """Format a size in bytes.
+
+    Args:
+        size: The size in bytes
+
+    Returns:
+        The size in the largest unit under 1024
+    """
+    value = float(size)
+    for unit in ("B", "KiB", "MiB"):
+        if abs(value) < 1024:  # noqa: PLR2004
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GiB"
+
+
+def format_table(rows: Sequence[Sequence[str]]) -> list[str]:
+    """Format rows as a table with aligned columns.
+
+    Args:
+        rows: The rows, starting with the header
+
+    Returns:
+        The lines of the table
+    """
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    return [
+        "  ".join(cell.ljust(width) for cell, width in zip(row, widths, strict=True)).rstrip()
+        for row in rows
+    ]
 
 
 def ask_yes_no(question: str) -> bool:
@@ -313,6 +687,7 @@ def get_commit_msg(config: Config, commit_msg: str) -> tuple[str, Path | None]:
     with commit_text_file.open(mode="r") as f:
         commit_msg = f.read().strip()
     if initial_ts == post_ts:
+        SCRATCH.release(commit_text_file)
         return "", None
     return commit_msg, commit_text_file
 
@@ -0,0 +1,81 @@
+"""The fixtures shared by the tests."""
+
+from __future__ import annotations
+
+from argparse import Namespace
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ftf.config import Config
+from ftf.inventory import Inventory
+from ftf.output import Output, TermFeatures
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+
+@pytest.fixture(name="output")
+def fixture_output() -> Output:
+    """Provide an output without a log file or color.
+
+    Returns:
+        The output
+    """
+    return Output(
+        log_file="",
+        log_level="notset",
+        log_append="true",
+        term_features=TermFeatures(color=False, links=False),
+        verbosity=0,
+    )
+
+
+@pytest.fixture(name="config")
+def fixture_config(tmp_path: Path, output: Output, monkeypatch: pytest.MonkeyPatch) -> Config:
+    """Provide a configuration with the built-in inventory, caching in the temporary directory.
+
+    Args:
+        tmp_path: The temporary directory
+        output: The output fixture
+        monkeypatch: The pytest monkeypatch fixture
+
+    Returns:
+        The configuration
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    return Config(
+        args=Namespace(verbose=0, shard="", dry_run=False),
+        editor="true",
+        inventory=Inventory.from_settings(),
+        output=output,
+        tmp_path=tmp_path,
+    )
+
+
+@pytest.fixture(name="stub_command")
+def fixture_stub_command(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> Callable[[str, str], None]:
+    """Put stub commands first on the PATH.
+
+    Args:
+        tmp_path: The temporary directory
+        monkeypatch: The pytest monkeypatch fixture
+
+    Returns:
+        Writes a stub command, given its name and shell script body
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+
+    def write(name: str, script: str) -> None:
+        stub = bin_dir / name
+        stub.write_text(f"#!/bin/sh\n{script}\n")
+        stub.chmod(0o755)
+
+    return write
@@ -0,0 +1,129 @@
+"""Test the external memory sort."""
+
+from __future__ import annotations
+
+import random
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ftf import extsort
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+#: The memory of a run, a handful of short lines, so the runs are spilled
+TINY_MEMORY = extsort.STR_OVERHEAD * 4
+
+
+def lower(line: str) -> str | None:
+    """Lowercase a line, dropping the blank ones, as sort_lower does.
+
+    Args:
+        line: The line
+
+    Returns:
+        The lowercased line, None if blank
+    """
+    return line.strip().lower() or None
+
+
+@pytest.fixture(name="spills")
+def fixture_spills(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    """Record the number of runs spilled by each sort.
+
+    Args:
+        monkeypatch: The pytest monkeypatch fixture
+
+    Returns:
+        The number of runs of each sort, appended to as they are spilled
+    """
+    counts: list[int] = []
+    spill_runs = extsort._spill_runs
+
+    def spy(**kwargs: object) -> list[Path]:
+        runs = spill_runs(**kwargs)  # type: ignore[arg-type]
+        counts.append(len(runs))
+        return runs
+
+    monkeypatch.setattr(extsort, "_spill_runs", spy)
+    return counts
+
+
+@pytest.mark.parametrize("fan_in", (extsort.MAX_FAN_IN, 2), ids=("one_pass", "several_passes"))
+def test_spilled_matches_sorted(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    spills: list[int],
+    fan_in: int,
+) -> None:
+    """Test the spill and merge path gives the same lines as sorted(set(...)).
+
+    The words are repeated throughout the file, so the duplicates fall in
+    different runs and are only dropped by the merge.
+
+    Args:
+        tmp_path: The temporary directory
+        monkeypatch: The pytest monkeypatch fixture
+        spills: The spilled runs fixture
+        fan_in: The most runs merged at once
+    """
+    monkeypatch.setattr(extsort, "MAX_FAN_IN", fan_in)
+    rng = random.Random(42)  # noqa: S311
+    words = [f"Word{index}" for index in range(50)]
+    lines = [rng.choice(words) for _ in range(500)] + ["", "  ", "WORD1", "word1 "]
+    rng.shuffle(lines)
+    src = tmp_path / "src.txt"
+    src.write_text("".join(f"{line}\n" for line in lines))
+    dest = tmp_path / "dest.txt"
+
+    extsort.sort_unique(
+        src=src,
+        dest=dest,
+        transform=lower,
+        max_memory=TINY_MEMORY,
+        tmp_dir=tmp_path,
+    )
+
+    expected = sorted({value for line in lines if (value := lower(line)) is not None})
+    assert dest.read_text().splitlines() == expected
+    assert spills[0] > fan_in
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["dest.txt", "src.txt"]
+
+
+def test_duplicates_across_boundaries(tmp_path: Path, spills: list[int]) -> None:
+    """Test a line repeated at the end of a run and the start of the next is written once.
+
+    Args:
+        tmp_path: The temporary directory
+        spills: The spilled runs fixture
+    """
+    lines = ["d", "c", "b", "a", "a", "e", "d", "c", "b", "a", "f", "e", "d"]
+    src = tmp_path / "src.txt"
+    src.write_text("".join(f"{line}\n" for line in lines))
+    dest = tmp_path / "dest.txt"
+
+    extsort.sort_unique(src=src, dest=dest, transform=lower, max_memory=TINY_MEMORY)
+
+    assert dest.read_text() == "a\nb\nc\nd\ne\nf\n"
+    assert spills[0] > 1
+
+
+def test_single_run_not_spilled(tmp_path: Path, spills: list[int]) -> None:
+    """Test a file fitting in memory is written straight to the destination.
+
+    Args:
+        tmp_path: The temporary directory
+        spills: The spilled runs fixture
+    """
+    src = tmp_path / "src.txt"
+    src.write_text("b\na\nb\n\n")
+    dest = tmp_path / "dest.txt"
+
+    extsort.sort_unique(src=src, dest=dest, transform=lower)
+
+    assert dest.read_text() == "a\nb\n"
+    assert spills == [0]
@@ -0,0 +1,141 @@
+"""Test the selection and sharding of the inventory."""
+
+from __future__ import annotations
+
+import itertools
+
+import pytest
+
+from ftf.inventory import Inventory, RepoEntry, parse_shard
+
+
+#: The number of repositories in the inventory
+REPO_COUNT = 25
+
+
+@pytest.fixture(name="inventory")
+def fixture_inventory() -> Inventory:
+    """Provide an inventory of tagged repositories.
+
+    Returns:
+        The inventory
+    """
+    repos = {}
+    for index in range(REPO_COUNT):
+        name = f"{'ansible' if index % 2 else 'pytest'}-{index}"
+        tags = frozenset({"even" if index % 2 == 0 else "odd", f"group{index % 3}"})
+        repos[name] = RepoEntry(
+            name=name,
+            origin=f"git@github.com:{{origin_org}}/{name}.git",
+            upstream=f"https://github.com/example/{name}.git",
+            tags=tags,
+        )
+    return Inventory(repos=repos)
+
+
+@pytest.mark.parametrize("count", (1, 2, 3, 7, REPO_COUNT, REPO_COUNT + 5))
+def test_shards_partition(inventory: Inventory, count: int) -> None:
+    """Test the shards are disjoint, cover every repository and are balanced.
+
+    Args:
+        inventory: The inventory
+        count: The number of shards
+    """
+    shards = [set(inventory.shard(index, count).repos) for index in range(1, count + 1)]
+    for first, second in itertools.combinations(shards, 2):
+        assert not first & second
+    assert set().union(*shards) == set(inventory.repos)
+    sizes = [len(shard) for shard in shards]
+    assert max(sizes) - min(sizes) <= 1
+
+
+def test_shards_deterministic(inventory: Inventory) -> None:
+    """Test a shard does not depend on the order of the inventory.
+
+    Args:
+        inventory: The inventory
+    """
+    reordered = Inventory(repos=dict(reversed(inventory.repos.items())))
+    for index in range(1, 4):
+        shard = set(inventory.shard(index, 3).repos)
+        assert set(inventory.shard(index, 3).repos) == shard
+        assert set(reordered.shard(index, 3).repos) == shard
+
+
+def test_shard_keeps_order(inventory: Inventory) -> None:
+    """Test a shard keeps the repositories in the order of the inventory.
+
+    Args:
+        inventory: The inventory
+    """
+    shard = list(inventory.shard(2, 3).repos)
+    assert shard == [name for name in inventory.repos if name in shard]
+
+
+@pytest.mark.parametrize(
+    ("select", "exclude", "expected"),
+    (
+        pytest.param([], [], {f"{index}" for index in range(REPO_COUNT)}, id="all"),
+        pytest.param(
+            ["ansible-*"],
+            [],
+            {f"{index}" for index in range(1, REPO_COUNT, 2)},
+            id="name",
+        ),
+        pytest.param(
+            ["pytest-1?", "ansible-1?"],
+            [],
+            {f"1{index}" for index in range(10)},
+            id="names",
+        ),
+        pytest.param(
+            ["tag:odd"],
+            ["tag:group0", "ansible-1?"],
+            {"1", "5", "7", "23"},
+            id="tag_excluded",
+        ),
+        pytest.param([], ["tag:group*"], set(), id="exclude_all"),
+        pytest.param(["tag:missing"], [], set(), id="unknown_tag"),
+    ),
+)
+def test_select(
+    inventory: Inventory,
+    select: list[str],
+    exclude: list[str],
+    expected: set[str],
+) -> None:
+    """Test the select and exclude patterns are applied to the names and tags.
+
+    Args:
+        inventory: The inventory
+        select: The select patterns
+        exclude: The exclude patterns
+        expected: The indexes of the repositories expected
+    """
+    selected = inventory.select(select=select, exclude=exclude)
+    assert {name.partition("-")[2] for name in selected.repos} == expected
+
+
+@pytest.mark.parametrize(
+    ("value", "expected"),
+    (("1/1", (1, 1)), ("2/5", (2, 5))),
+)
+def test_parse_shard(value: str, expected: tuple[int, int]) -> None:
+    """Test a valid shard specification is parsed.
+
+    Args:
+        value: The shard specification
+        expected: The shard index and count
+    """
+    assert parse_shard(value) == expected
+
+
+@pytest.mark.parametrize("value", ("0/2", "3/2", "1", "a/b", "1/0"))
+def test_parse_shard_invalid(value: str) -> None:
+    """Test an invalid shard specification is rejected.
+
+    Args:
+        value: The shard specification
+    """
+    with pytest.raises(ValueError, match=f"Invalid shard {value}"):
+        parse_shard(value)
@@ -0,0 +1,239 @@
+"""Test the declarative merge rules for TOML documents."""
+
+from __future__ import annotations
+
+import copy
+
+from typing import Any
+
+import pytest
+import tomllib
+
+from ftf.checks.merge_rules import apply_plan, compile_rules, split_path
+from ftf.output import Level
+from ftf.settings import PY_PROJECT
+from ftf.utils import path_to_data_file
+
+
+def merge(
+    rules: dict[str, dict[str, Any]],
+    base: dict[str, Any],
+    repo: dict[str, Any],
+) -> list[tuple[Level, str]]:
+    """Merge a repository document into the base with the rules.
+
+    Args:
+        rules: The rules, keyed by dotted path
+        base: The base document, updated to the desired document
+        repo: The repository document
+
+    Returns:
+        The messages, as level and text pairs
+    """
+    messages = apply_plan(plan=compile_rules(rules), base=base, repo=repo, new_table=dict)
+    return [(message.prefix, message.message) for message in messages]
+
+
+@pytest.mark.parametrize(
+    ("path", "keys"),
+    (
+        ("tool.black", ["tool", "black"]),
+        ('tool.ruff.lint."tests/**"', ["tool", "ruff", "lint", "tests/**"]),
+        ('"a.b".c', ["a.b", "c"]),
+    ),
+)
+def test_split_path(path: str, keys: list[str]) -> None:
+    """Test a dotted path is split into keys, quoted keys may contain dots.
+
+    Args:
+        path: The dotted path
+        keys: The keys expected
+    """
+    assert split_path(path) == keys
+
+
+@pytest.mark.parametrize(
+    ("rules", "error"),
+    (
+        ({"a..b": {"action": "repo"}}, "Invalid dotted path 'a..b'."),
+        ({"a": {"action": "keep"}}, "Unknown action 'keep' in the merge rule for a."),
+        ({"a": {"action": "repo", "sorted": 1}}, "Unknown option sorted in the merge rule for a."),
+    ),
+)
+def test_invalid_rules(rules: dict[str, dict[str, Any]], error: str) -> None:
+    """Test an invalid rule is rejected.
+
+    Args:
+        rules: The rules
+        error: The error expected
+    """
+    with pytest.raises(ValueError, match=error.replace(".", r"\.")):
+        compile_rules(rules)
+
+
+def test_union() -> None:
+    """Test a union keeps the base table, adding the keys only in the repository."""
+    base = {"t": {"shared": "base", "base_only": 1}}
+    repo = {"t": {"shared": "repo", "repo_only": 2}}
+    assert not merge({"t": {"action": "union"}}, base, repo)
+    assert base == {"t": {"shared": "base", "base_only": 1, "repo_only": 2}}
+
+
+def test_union_missing_from_base() -> None:
+    """Test a union copies a table missing from the base."""
+    base: dict[str, Any] = {}
+    assert not merge({"t": {"action": "union"}}, base, {"t": {"a": 1}})
+    assert base == {"t": {"a": 1}}
+
+
+@pytest.mark.parametrize(
+    ("repo", "expected"),
+    (
+        ({"k": ["b", "a"]}, {"k": ["a", "b"]}),
+        ({}, {"k": ["base"]}),
+    ),
+    ids=("present", "missing"),
+)
+def test_repo(repo: dict[str, Any], expected: dict[str, Any]) -> None:
+    """Test the repository value is used, sorted, the base value kept if missing.
+
+    Args:
+        repo: The repository table
+        expected: The desired table
+    """
+    base = {"k": ["base"]}
+    assert not merge({"k": {"action": "repo", "sort": True}}, base, repo)
+    assert base == expected
+
+
+def test_require() -> None:
+    """Test a required value is taken from the repository, an error if missing."""
+    base = {"k": 1}
+    assert not merge({"k": {"action": "require"}}, base, {"k": 2})
+    assert base == {"k": 2}
+    assert merge({"k": {"action": "require"}}, base, {}) == [
+        (Level.ERROR, "k not found in the repository, check manually."),
+    ]
+
+
+def test_require_warn_unless_prefix() -> None:
+    """Test a warning when the repository value does not extend the base value."""
+    rules = {"k": {"action": "require", "warn_unless_prefix": True}}
+    base = {"k": "-ra"}
+    assert not merge(rules, base, {"k": "-ra -v"})
+    assert base == {"k": "-ra -v"}
+    base = {"k": "-ra"}
+    assert merge(rules, base, {"k": "-v"}) == [(Level.WARNING, "Check k manually.")]
+    assert base == {"k": "-v"}
+
+
+@pytest.mark.parametrize(
+    ("repo", "expected", "messages"),
+    (
+        ({"k": "repo"}, {"k": "base"}, []),
+        ({}, {}, [(Level.WARNING, "k removed.")]),
+    ),
+    ids=("present", "missing"),
+)
+def test_drop_if_missing(
+    repo: dict[str, Any],
+    expected: dict[str, Any],
+    messages: list[tuple[Level, str]],
+) -> None:
+    """Test the base value is kept, unless missing from the repository.
+
+    Args:
+        repo: The repository table
+        expected: The desired table
+        messages: The messages expected
+    """
+    base = {"k": "base"}
+    assert merge({"k": {"action": "drop_if_missing"}}, base, repo) == messages
+    assert base == expected
+
+
+def test_nested_table_not_created_when_empty() -> None:
+    """Test a table missing from both documents is not created."""
+    base: dict[str, Any] = {}
+    assert not merge({"a.b.c": {"action": "repo"}}, base, {})
+    assert base == {}
+
+
+@pytest.fixture(name="template")
+def fixture_template() -> dict[str, Any]:
+    """Provide the data of the pyproject.toml template.
+
+    Returns:
+        The data
+    """
+    return tomllib.loads(path_to_data_file("pyproject.toml").read_text())
+
+
+@pytest.fixture(name="unchanged")
+def fixture_unchanged(template: dict[str, Any]) -> dict[str, Any]:
+    """Provide the data of a repository following the template.
+
+    Args:
+        template: The template data
+
+    Returns:
+        The data
+    """
+    repo = copy.deepcopy(template)
+    repo["project"]["name"] = "example"
+    repo["tool"]["coverage"]["report"]["fail_under"] = 90
+    return repo
+
+
+def test_golden_unchanged(template: dict[str, Any], unchanged: dict[str, Any]) -> None:
+    """Test a repository following the template is left as is.
+
+    Args:
+        template: The template data
+        unchanged: The repository data
+    """
+    assert not merge(PY_PROJECT, template, copy.deepcopy(unchanged))
+    assert template == unchanged
+
+
+def test_golden_drifted(template: dict[str, Any], unchanged: dict[str, Any]) -> None:
+    """Test the merge of a drifted repository, as the hand written merge did.
+
+    Args:
+        template: The template data
+        unchanged: The repository data
+    """
+    repo = copy.deepcopy(unchanged)
+    tool = repo["tool"]
+    tool["black"]["line-length"] = 120
+    tool["black"]["skip-string-normalization"] = True
+    tool["coverage"]["run"]["source_pkgs"] = ["example"]
+    tool["mypy"]["strict"] = False
+    tool["mypy"]["exclude"] = ["build"]
+    tool["pylint"]["master"]["ignore"] = ["vendor", "_version.py"]
+    tool["pytest"]["ini_options"]["addopts"] = "-v"
+    tool["pytest"]["ini_options"]["markers"] = ["slow"]
+    del tool["pytest"]["ini_options"]["tmp_path_retention_policy"]
+    tool["ruff"]["line-length"] = 120
+    tool["ruff"]["lint"]["per-file-ignores"]["tests/**"] = ["S101"]
+    tool["ruff"]["lint"]["per-file-ignores"]["docs/**"] = ["D100"]
+    tool["setuptools_scm"]["write_to"] = "src/example/_version.py"
+    tool["other"] = {"key": "value"}
+
+    expected = copy.deepcopy(unchanged)
+    tool = expected["tool"]
+    tool["black"]["skip-string-normalization"] = True
+    tool["coverage"]["run"]["source_pkgs"] = ["example"]
+    tool["mypy"]["exclude"] = ["build"]
+    tool["pylint"]["master"]["ignore"] = ["_version.py", "vendor"]
+    tool["pytest"]["ini_options"]["addopts"] = "-v"
+    tool["pytest"]["ini_options"]["markers"] = ["slow"]
+    del tool["pytest"]["ini_options"]["tmp_path_retention_policy"]
+    tool["ruff"]["lint"]["per-file-ignores"]["docs/**"] = ["D100"]
+    tool["setuptools_scm"]["write_to"] = "src/example/_version.py"
+
+    assert merge(PY_PROJECT, template, repo) == [
+        (Level.WARNING, "Check tool.pytest.ini_options.addopts manually."),
+        (Level.WARNING, "tool.pytest.ini_options.tmp_path_retention_policy removed."),
+    ]
+    assert template == expected
@@ -0,0 +1,47 @@
+"""Test the output."""
+
+from __future__ import annotations
+
+import logging
+import queue
+import time
+
+from typing import TYPE_CHECKING
+
+from ftf import output
+from ftf.output import BatchedFileHandler, FlushingListener
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+    import pytest
+
+
+def test_trickle_flushed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test records trickling in faster than the interval are still flushed in time.
+
+    Args:
+        tmp_path: The temporary directory
+        monkeypatch: The pytest monkeypatch fixture
+    """
+    interval = 0.2
+    monkeypatch.setattr(output, "LOG_FLUSH_INTERVAL", interval)
+    log_file = tmp_path / "ftf.log"
+    handler = BatchedFileHandler(filename=str(log_file), max_bytes=0, backups=0)
+    records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    listener = FlushingListener(records, handler)
+    listener.start()
+    try:
+        logger = logging.getLogger("test_trickle_flushed")
+        written = 0
+        deadline = time.monotonic() + interval * 3
+        while time.monotonic() < deadline:
+            records.put(logger.makeRecord(logger.name, logging.INFO, "", 0, "line", (), None))
+            written += 1
+            time.sleep(interval / 4)
+        assert log_file.read_text().splitlines()
+    finally:
+        listener.stop()
+        handler.close()
+    assert len(log_file.read_text().splitlines()) == written
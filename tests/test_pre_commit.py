@@ -0,0 +1,249 @@
+"""Test the merge of the pre-commit repositories."""
+
+from __future__ import annotations
+
+import copy
+
+from typing import Any
+
+import pytest
+
+from ftf.checks.pre_commit import KeepRules, merge
+from ftf.output import Level
+from ftf.settings import PRE_COMMIT_KEEP
+
+
+HOOKS = "https://github.com/pre-commit/pre-commit-hooks"
+MYPY = "https://github.com/pre-commit/mirrors-mypy.git"
+UNKNOWN = "https://github.com/example/unknown"
+
+
+@pytest.fixture(name="keep")
+def fixture_keep() -> KeepRules:
+    """Provide the built-in keep rules.
+
+    Returns:
+        The keep rules
+    """
+    return KeepRules({key: frozenset(fields) for key, fields in PRE_COMMIT_KEEP.items()})
+
+
+@pytest.fixture(name="base")
+def fixture_base() -> dict[str, Any]:
+    """Provide the base data, as from the template.
+
+    Returns:
+        The base data
+    """
+    return {
+        "repos": [
+            {"repo": HOOKS, "rev": "v4.6.0", "hooks": [{"id": "end-of-file-fixer"}]},
+            {
+                "repo": MYPY,
+                "rev": "v1.10.0",
+                "hooks": [{"id": "mypy", "additional_dependencies": ["base"], "args": ["--base"]}],
+            },
+            {
+                "repo": UNKNOWN,
+                "rev": "v1.0.0",
+                "hooks": [{"id": "lint", "additional_dependencies": ["base"], "args": ["--base"]}],
+            },
+        ],
+    }
+
+
+def run_merge(
+    base: dict[str, Any],
+    repo: dict[str, Any],
+    keep: KeepRules,
+    skips: frozenset[str] = frozenset(),
+) -> list[tuple[Level, str]]:
+    """Merge the repository data into the base.
+
+    Args:
+        base: The base data, updated to the desired data
+        repo: The repository data
+        keep: The keep rules
+        skips: The pre-commit repositories to keep as found in the repository
+
+    Returns:
+        The messages, as level and text pairs
+    """
+    messages = merge(base, repo, skips=skips, keep=keep, file_name=".pre-commit-config.yaml")
+    return [(message.prefix, message.message) for message in messages]
+
+
+def test_keep_rules() -> None:
+    """Test the fields of the matching rules are combined, for entries and hooks."""
+    keep = KeepRules(
+        {
+            "*": frozenset({"rev"}),
+            "*mypy*": frozenset({"exclude"}),
+            "*mypy.git#my*": frozenset({"additional_dependencies"}),
+            "*#*": frozenset({"args"}),
+        },
+    )
+    assert keep.repo_fields(MYPY) == {"rev", "exclude"}
+    assert keep.repo_fields(UNKNOWN) == {"rev"}
+    assert keep.hook_fields(uri=MYPY, hook_id="mypy") == {"additional_dependencies", "args"}
+    assert keep.hook_fields(uri=MYPY, hook_id="stubtest") == {"args"}
+    assert keep.hook_fields(uri=UNKNOWN, hook_id="mypy") == {"args"}
+
+
+def test_mypy_keeps_dependencies(base: dict[str, Any], keep: KeepRules) -> None:
+    """Test the mypy hook keeps its dependencies from the repository, the rest from the template.
+
+    Args:
+        base: The base data
+        keep: The keep rules
+    """
+    repo = copy.deepcopy(base)
+    repo["repos"][1]["rev"] = "v1.9.0"
+    repo["repos"][1]["hooks"][0] = {
+        "id": "mypy",
+        "additional_dependencies": ["repo"],
+        "args": ["--repo"],
+    }
+    assert not run_merge(base, repo, keep)
+    assert base["repos"][1] == {
+        "repo": MYPY,
+        "rev": "v1.9.0",
+        "hooks": [{"id": "mypy", "additional_dependencies": ["repo"], "args": ["--base"]}],
+    }
+
+
+def test_unknown_hook_keeps_only_rev(base: dict[str, Any], keep: KeepRules) -> None:
+    """Test a hook without rules takes everything but the rev from the template.
+
+    Args:
+        base: The base data
+        keep: The keep rules
+    """
+    repo = copy.deepcopy(base)
+    repo["repos"][2] = {
+        "repo": UNKNOWN,
+        "rev": "v0.9.0",
+        "hooks": [{"id": "lint", "additional_dependencies": ["repo"], "args": ["--repo"]}],
+    }
+    assert not run_merge(base, repo, keep)
+    assert base["repos"][2] == {
+        "repo": UNKNOWN,
+        "rev": "v0.9.0",
+        "hooks": [{"id": "lint", "additional_dependencies": ["base"], "args": ["--base"]}],
+    }
+
+
+def test_repeated_uri(base: dict[str, Any], keep: KeepRules) -> None:
+    """Test the entries repeated for a URI are merged into one, the first rev is kept.
+
+    Args:
+        base: The base data
+        keep: The keep rules
+    """
+    repo = copy.deepcopy(base)
+    repo["repos"][1:2] = [
+        {
+            "repo": MYPY,
+            "rev": "v1.8.0",
+            "hooks": [{"id": "mypy", "additional_dependencies": ["first"]}],
+        },
+        {
+            "repo": MYPY,
+            "rev": "v1.9.0",
+            "hooks": [{"id": "mypy", "additional_dependencies": ["second"]}],
+        },
+    ]
+    assert run_merge(base, repo, keep) == [
+        (
+            Level.WARNING,
+            f"Entries for {MYPY} in .pre-commit-config.yaml differ in rev, using the first.",
+        ),
+    ]
+    assert [pc_repo["repo"] for pc_repo in base["repos"]] == [HOOKS, MYPY, UNKNOWN]
+    assert base["repos"][1]["rev"] == "v1.8.0"
+    assert base["repos"][1]["hooks"] == [
+        {"id": "mypy", "additional_dependencies": ["first"], "args": ["--base"]},
+    ]
+
+
+def test_repeated_hook_ids(base: dict[str, Any], keep: KeepRules) -> None:
+    """Test repeated hook ids are matched in order, across the repeated entries of a URI.
+
+    Args:
+        base: The base data
+        keep: The keep rules
+    """
+    base["repos"][1]["hooks"] = [
+        {"id": "mypy", "args": ["src"]},
+        {"id": "mypy", "args": ["tests"]},
+    ]
+    repo = copy.deepcopy(base)
+    repo["repos"][1:2] = [
+        {
+            "repo": MYPY,
+            "rev": "v1.10.0",
+            "hooks": [{"id": "mypy", "additional_dependencies": [dep]}],
+        }
+        for dep in ("a", "b")
+    ]
+    assert not run_merge(base, repo, keep)
+    assert base["repos"][1]["hooks"] == [
+        {"id": "mypy", "args": ["src"], "additional_dependencies": ["a"]},
+        {"id": "mypy", "args": ["tests"], "additional_dependencies": ["b"]},
+    ]
+
+
+def test_skipped_repeated_uri(base: dict[str, Any], keep: KeepRules) -> None:
+    """Test the entries of a skipped URI are kept as found, each of them.
+
+    Args:
+        base: The base data
+        keep: The keep rules
+    """
+    repo = copy.deepcopy(base)
+    entries = [
+        {"repo": MYPY, "rev": "v1.8.0", "hooks": [{"id": "mypy"}]},
+        {"repo": MYPY, "rev": "v1.9.0", "hooks": [{"id": "mypy", "args": ["tests"]}]},
+    ]
+    repo["repos"][1:2] = copy.deepcopy(entries)
+    assert not run_merge(base, repo, keep, skips=frozenset({MYPY}))
+    assert base["repos"][1:3] == entries
+
+
+def test_missing_entry(base: dict[str, Any], keep: KeepRules) -> None:
+    """Test an entry missing from the repository is added from the template, with an error.
+
+    Args:
+        base: The base data
+        keep: The keep rules
+    """
+    repo = copy.deepcopy(base)
+    del repo["repos"][2]
+    expected = copy.deepcopy(base)
+    assert run_merge(base, repo, keep) == [
+        (Level.ERROR, f"Entry not found for {UNKNOWN} in .pre-commit-config.yaml."),
+    ]
+    assert base == expected
+
+
+def test_update_rev(base: dict[str, Any], keep: KeepRules) -> None:
+    """Test the revs are updated after the rev is kept from the repository.
+
+    Args:
+        base: The base data
+        keep: The keep rules
+    """
+    repo = copy.deepcopy(base)
+    repo["repos"][0]["rev"] = "v4.5.0"
+    messages = merge(
+        base,
+        repo,
+        skips=frozenset(),
+        keep=keep,
+        file_name=".pre-commit-config.yaml",
+        update_rev=lambda uri, current: "v5.0.0" if uri == HOOKS else current,
+    )
+    assert [(message.prefix, message.message) for message in messages] == [
+        (Level.INFO, f"{HOOKS} rev updated from v4.5.0 to v5.0.0."),
+    ]
+    assert base["repos"][0]["rev"] == "v5.0.0"
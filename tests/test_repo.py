@@ -0,0 +1,116 @@
+"""Test the planning of the sync of main with upstream/main."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ftf.repo import RefState, Repo, plan_sync
+
+
+if TYPE_CHECKING:
+    from ftf.config import Config
+
+
+UPSTREAM = "1" * 40
+OLD = "2" * 40
+DIVERGED = "3" * 40
+
+CHECKOUT = ("Checkout main", "git checkout main")
+FORCE_CHECKOUT = ("Checkout main", "git checkout --force main")
+DISCARD = ("Discarding local changes", "git reset --hard")
+FETCH = ("Fetch upstream/main", "git fetch upstream main")
+RESET = ("Resetting to upstream/main", f"git reset --hard {UPSTREAM}")
+PUSH = ("Pushing to origin/main", "git push origin main --force")
+
+
+@pytest.mark.parametrize(
+    ("state", "expected"),
+    (
+        pytest.param(
+            RefState(branch="main", main=UPSTREAM, origin=UPSTREAM, upstream=UPSTREAM),
+            [],
+            id="in_sync",
+        ),
+        pytest.param(
+            RefState(branch="main", main=UPSTREAM, origin=OLD, upstream=UPSTREAM),
+            [PUSH],
+            id="origin_behind",
+        ),
+        pytest.param(
+            RefState(branch="main", main=UPSTREAM, origin=DIVERGED, upstream=UPSTREAM),
+            [PUSH],
+            id="origin_diverged",
+        ),
+        pytest.param(
+            RefState(branch="main", main=OLD, origin=OLD, upstream=UPSTREAM),
+            [FETCH, RESET, PUSH],
+            id="main_and_origin_behind",
+        ),
+        pytest.param(
+            RefState(branch="main", main=OLD, origin=UPSTREAM, upstream=UPSTREAM),
+            [FETCH, RESET],
+            id="local_main_behind",
+        ),
+        pytest.param(
+            RefState(branch="master", main="", origin=OLD, upstream=UPSTREAM),
+            [CHECKOUT, FETCH, RESET, PUSH],
+            id="local_main_missing",
+        ),
+        pytest.param(
+            RefState(branch="feature", main=UPSTREAM, origin=UPSTREAM, upstream=UPSTREAM),
+            [CHECKOUT],
+            id="other_branch_in_sync",
+        ),
+        pytest.param(
+            RefState(
+                branch="feature",
+                main=UPSTREAM,
+                dirty=True,
+                origin=UPSTREAM,
+                upstream=UPSTREAM,
+            ),
+            [FORCE_CHECKOUT],
+            id="other_branch_dirty",
+        ),
+        pytest.param(
+            RefState(branch="main", main=UPSTREAM, dirty=True, origin=UPSTREAM, upstream=UPSTREAM),
+            [DISCARD],
+            id="main_dirty_in_sync",
+        ),
+        pytest.param(
+            RefState(branch="main", main=OLD, dirty=True, origin=OLD, upstream=UPSTREAM),
+            [FETCH, RESET, PUSH],
+            id="main_dirty_behind",
+        ),
+        pytest.param(
+            RefState(branch="main", main=OLD, origin=OLD, upstream=""),
+            [],
+            id="upstream_main_missing",
+        ),
+    ),
+)
+def test_plan_sync(state: RefState, expected: list[tuple[str, str]]) -> None:
+    """Test only the commands needed to bring main in sync are planned.
+
+    Args:
+        state: The state of main locally and in the remotes
+        expected: The steps planned
+    """
+    assert plan_sync(state) == expected
+
+
+def test_ensure_main_upstream_missing(config: Config, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test the repository is marked failed, and nothing run, if upstream has no main.
+
+    Args:
+        config: The configuration fixture
+        monkeypatch: The pytest monkeypatch fixture
+    """
+    repo = Repo(config=config, origin="me/repo", upstream="org/repo", name="repo")
+    state = RefState(branch="main", main=OLD, origin=OLD, upstream="")
+    monkeypatch.setattr(repo, "ref_state", lambda: state)
+    monkeypatch.setattr("ftf.repo.subprocess_run", pytest.fail)
+    repo.ensure_main()
+    assert repo.failed == "upstream has no main branch."
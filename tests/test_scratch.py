@@ -0,0 +1,101 @@
+"""Test the clean up of the temporary directories of earlier sessions."""
+
+from __future__ import annotations
+
+import os
+import subprocess
+import sys
+import time
+
+from typing import TYPE_CHECKING
+
+from ftf.scratch import OWNER_FILE, SCRATCH_PREFIX, claim, collect_garbage
+
+
+if TYPE_CHECKING:
+    from pathlib import Path
+
+
+def exited_pid() -> int:
+    """Return the process ID of a process that has exited.
+
+    Returns:
+        The process ID
+    """
+    proc = subprocess.run(
+        [sys.executable, "-c", "import os; print(os.getpid())"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return int(proc.stdout)
+
+
+def make_dir(root: Path, name: str, owner: int | None = None) -> Path:
+    """Make a temporary directory with a file in it.
+
+    Args:
+        root: The temporary directory
+        name: The name of the directory
+        owner: The process ID of the session claiming it, if any
+
+    Returns:
+        The directory
+    """
+    path = root / name
+    path.mkdir()
+    (path / "content").write_text("x" * 1024)
+    if owner is not None:
+        (path / OWNER_FILE).write_text(str(owner))
+    return path
+
+
+def test_claimed_by_running_session_kept(tmp_path: Path) -> None:
+    """Test only the directories of sessions still running survive a size limit.
+
+    Args:
+        tmp_path: The temporary directory
+    """
+    dead = exited_pid()
+    live_clones = make_dir(tmp_path, "ftf_live", owner=os.getpid())
+    dead_clones = make_dir(tmp_path, "ftf_dead", owner=dead)
+    released = make_dir(tmp_path, "ftf_released", owner=0)
+    live_scratch = make_dir(tmp_path, f"{SCRATCH_PREFIX}{os.getpid()}_x")
+    dead_scratch = make_dir(tmp_path, f"{SCRATCH_PREFIX}{dead}_x")
+
+    reclaimed = collect_garbage(keep=[], max_age=0, max_size=1, root=tmp_path)
+
+    assert sorted(reclaimed.paths) == sorted([dead_clones, released, dead_scratch])
+    assert live_clones.exists()
+    assert live_scratch.exists()
+
+
+def test_not_made_by_ftf_kept(tmp_path: Path) -> None:
+    """Test old entries with the prefix that ftf did not make are never removed.
+
+    Args:
+        tmp_path: The temporary directory
+    """
+    old = time.time() - 30 * 86400
+    released = make_dir(tmp_path, "ftf_released", owner=0)
+    unmarked = make_dir(tmp_path, "ftf_unmarked")
+    other_file = tmp_path / "ftf_other_tool.log"
+    other_file.write_text("x")
+    for path in (released, unmarked, other_file):
+        os.utime(path, (old, old))
+
+    reclaimed = collect_garbage(keep=[], max_age=7 * 86400, max_size=1, root=tmp_path)
+
+    assert reclaimed.paths == [released]
+    assert unmarked.exists()
+    assert other_file.exists()
+
+
+def test_claim(tmp_path: Path) -> None:
+    """Test a claimed directory is marked with the process ID of the session.
+
+    Args:
+        tmp_path: The temporary directory
+    """
+    claim(tmp_path)
+    assert (tmp_path / OWNER_FILE).read_text() == str(os.getpid())
@@ -0,0 +1,26 @@
+"""Test the status of the fleet."""
+
+from __future__ import annotations
+
+from ftf.status import RepoStatus, status_table
+
+
+def test_status_table() -> None:
+    """Test the table shows the SHA of each remote next to the sync state."""
+    statuses = [
+        RepoStatus(name="alpha", upstream="a" * 40, origin="a" * 40, prs=[]),
+        RepoStatus(name="beta", upstream="b" * 40, origin="c" * 40),
+        RepoStatus(name="gamma", errors=["ls-remote failed: timed out"]),
+    ]
+    header, *lines = status_table(statuses)
+    columns = ("Repository", "Upstream", "Origin", "Sync", "PRs", "Errors")
+    starts = [header.index(column) for column in columns]
+    cells = [
+        [line[start:end].strip() for start, end in zip(starts, [*starts[1:], None], strict=True)]
+        for line in lines
+    ]
+    assert cells == [
+        ["alpha", "a" * 10, "a" * 10, "in sync", "0", ""],
+        ["beta", "b" * 10, "c" * 10, "out of sync", "-", ""],
+        ["gamma", "", "", "unknown", "-", "ls-remote failed: timed out"],
+    ]
@@ -0,0 +1,233 @@
+"""Test the submission queue against a stub gh that injects rate limit responses."""
+
+from __future__ import annotations
+
+import subprocess
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ftf.output import Output, TermFeatures
+from ftf.submit_queue import SubmitQueue, rate_limit_delay
+from ftf.utils import subprocess_run
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+    from pathlib import Path
+
+
+STUB_GH = """#!/bin/sh
+count=$(cat "$STUB_STATE" 2>/dev/null || echo 0)
+echo $((count + 1)) > "$STUB_STATE"
+if [ "$count" -lt "$STUB_FAILURES" ]; then
+  echo "$STUB_ERROR" >&2
+  exit 1
+fi
+echo "https://github.com/org/repo/pull/1"
+"""
+#: The rate limited responses before the stub succeeds
+FAILURES = 2
+#: The most requests in flight at once
+MAX_JOBS = 4
+#: The retries of a rate limited request before giving up
+MAX_RETRIES = 3
+
+
+@pytest.fixture(name="stub_gh")
+def fixture_stub_gh(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> Callable[[int, str], Path]:
+    """Put a stub gh on the PATH, failing a number of times before succeeding.
+
+    Args:
+        tmp_path: The temporary directory
+        monkeypatch: The pytest monkeypatch fixture
+
+    Returns:
+        Configures the failures and error output, returning the file counting the calls
+    """
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    stub = bin_dir / "gh"
+    stub.write_text(STUB_GH)
+    stub.chmod(0o755)
+    state = tmp_path / "calls"
+    monkeypatch.setenv("PATH", f"{bin_dir}:/usr/bin:/bin")
+    monkeypatch.setenv("STUB_STATE", str(state))
+
+    def configure(failures: int, error: str) -> Path:
+        monkeypatch.setenv("STUB_FAILURES", str(failures))
+        monkeypatch.setenv("STUB_ERROR", error)
+        return state
+
+    return configure
+
+
+def gh_request() -> subprocess.CompletedProcess[str]:
+    """Run the stub gh, as a PR is made.
+
+    Returns:
+        The completed process
+    """
+    output = Output(
+        log_file="",
+        log_level="notset",
+        log_append="true",
+        term_features=TermFeatures(color=False, links=False),
+        verbosity=0,
+    )
+    return subprocess_run(
+        command="gh pr create --fill",
+        verbose=0,
+        msg="Creating a PR",
+        output=output,
+        quiet=True,
+        capture=True,
+    )
+
+
+def fast_queue(max_jobs: int = MAX_JOBS, max_retries: int = 5) -> SubmitQueue:
+    """Create a queue with short backoffs.
+
+    Args:
+        max_jobs: The most requests in flight at once
+        max_retries: The most retries of a rate limited request
+
+    Returns:
+        The queue
+    """
+    return SubmitQueue(
+        rate=1000.0,
+        max_jobs=max_jobs,
+        max_retries=max_retries,
+        backoff=0.01,
+        max_backoff=0.02,
+    )
+
+
+@pytest.mark.parametrize(
+    "error",
+    (
+        "HTTP 429: Too Many Requests",
+        "HTTP 403: You have exceeded a secondary rate limit",
+        "API rate limit exceeded for user",
+    ),
+)
+def test_retried_until_success(stub_gh: Callable[[int, str], Path], error: str) -> None:
+    """Test a rate limited request is retried, halving the concurrency each time.
+
+    Args:
+        stub_gh: The stub gh fixture
+        error: The error output of the rate limited responses
+    """
+    state = stub_gh(FAILURES, error)
+    queue = fast_queue()
+    proc = queue.submit(gh_request)
+    assert proc.stdout.strip() == "https://github.com/org/repo/pull/1"
+    assert state.read_text().strip() == str(FAILURES + 1)
+    assert queue.stats.rate_limited == FAILURES
+    assert queue.stats.succeeded == 1
+    assert queue.stats.min_limit == 1
+    assert queue.stats.backoff > 0
+
+
+def test_limit_grows_back(stub_gh: Callable[[int, str], Path]) -> None:
+    """Test the concurrency limit grows by one after a window of successes.
+
+    Args:
+        stub_gh: The stub gh fixture
+    """
+    stub_gh(1, "HTTP 429: Too Many Requests")
+    queue = fast_queue()
+    queue.submit(gh_request)
+    halved = queue.limit
+    assert halved == MAX_JOBS // 2
+    queue.submit(gh_request)
+    queue.submit(gh_request)
+    assert queue.limit == halved + 1
+
+
+def test_other_failure_not_retried(stub_gh: Callable[[int, str], Path]) -> None:
+    """Test a failure other than a rate limit is raised without a retry.
+
+    Args:
+        stub_gh: The stub gh fixture
+    """
+    state = stub_gh(1, "GraphQL: Could not resolve to a Repository")
+    queue = fast_queue()
+    with pytest.raises(subprocess.CalledProcessError):
+        queue.submit(gh_request)
+    assert state.read_text().strip() == "1"
+    assert queue.stats.failed == 1
+    assert queue.stats.rate_limited == 0
+
+
+def test_retries_exhausted(stub_gh: Callable[[int, str], Path]) -> None:
+    """Test a request still rate limited after the last retry is raised.
+
+    Args:
+        stub_gh: The stub gh fixture
+    """
+    state = stub_gh(100, "HTTP 429: Too Many Requests")
+    queue = fast_queue(max_retries=MAX_RETRIES)
+    with pytest.raises(subprocess.CalledProcessError):
+        queue.submit(gh_request)
+    assert state.read_text().strip() == str(MAX_RETRIES + 1)
+    assert queue.stats.rate_limited == MAX_RETRIES
+    assert queue.stats.failed == 1
+
+
+@pytest.mark.parametrize(
+    ("error", "expected"),
+    (
+        ("HTTP 429: Too Many Requests\nRetry-After: 7", 7.0),
+        ("HTTP 403: secondary rate limit, retry after 30", 30.0),
+        ("HTTP 429: Too Many Requests", 0.0),
+        ("HTTP 404: Not Found", None),
+    ),
+)
+def test_rate_limit_delay(
+    stub_gh: Callable[[int, str], Path],
+    error: str,
+    expected: float | None,
+) -> None:
+    """Test the retry-after hint is read from the error output of gh.
+
+    Args:
+        stub_gh: The stub gh fixture
+        error: The error output
+        expected: The delay expected, None if not rate limited
+    """
+    stub_gh(1, error)
+    with pytest.raises(subprocess.CalledProcessError) as exc_info:
+        gh_request()
+    assert rate_limit_delay(exc_info.value) == expected
+
+
+def test_retry_after_honored(stub_gh: Callable[[int, str], Path]) -> None:
+    """Test the queue waits at least the delay GitHub asked for.
+
+    Args:
+        stub_gh: The stub gh fixture
+    """
+    stub_gh(1, "HTTP 429: Too Many Requests\nRetry-After: 1")
+    queue = fast_queue()
+    queue.submit(gh_request)
+    assert queue.stats.backoff >= 1.0
+
+
+def test_timeout_releases_slot() -> None:
+    """Test a request timing out releases its slot, later requests still go through."""
+    queue = fast_queue()
+
+    def hung() -> None:
+        raise subprocess.TimeoutExpired(cmd="gh pr create --fill", timeout=1)
+
+    for _ in range(MAX_JOBS + 1):
+        with pytest.raises(subprocess.TimeoutExpired):
+            queue.submit(hung)
+    assert queue.stats.failed == MAX_JOBS + 1
+    assert queue.submit(lambda: "done") == "done"
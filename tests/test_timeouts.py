@@ -0,0 +1,67 @@
+"""Test a command outliving its timeout fails only its repository or URI."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+import pytest
+
+from ftf import settings
+from ftf.repo import Repo
+from ftf.status import repo_status
+from ftf.tags import TagIndex
+
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from ftf.config import Config
+
+
+#: A git whose ls-remote of the slow remote hangs, the tags of other remotes are listed
+HANGING_GIT = """case "$*" in
+  *example-slow*) sleep 5;;
+  *) printf 'abc123\\trefs/tags/v1.0.0\\n';;
+esac"""
+#: The command timing out for the repository
+COMMAND = "git ls-remote --heads https://example-slow/slow"
+
+
+@pytest.fixture(autouse=True)
+def _short_timeout(
+    monkeypatch: pytest.MonkeyPatch,
+    stub_command: Callable[[str, str], None],
+) -> None:
+    """Put a git on the PATH whose ls-remote of the slow remote hangs past a short timeout.
+
+    Args:
+        monkeypatch: The pytest monkeypatch fixture
+        stub_command: The stub command fixture
+    """
+    monkeypatch.setitem(settings.COMMAND_TIMEOUTS, "git ls-remote", 1.0)
+    stub_command("git", HANGING_GIT)
+
+
+def test_tags_timeout(config: Config) -> None:
+    """Test a hook remote timing out has no tags, the others are still listed.
+
+    Args:
+        config: The configuration fixture
+    """
+    index = TagIndex(config=config, ttl=0, jobs=2)
+    slow, fast = "https://example-slow/hook", "https://example-fast/hook"
+    index.prefetch(uris=[slow, fast])
+    assert index.update_rev(uri=slow, current="v0.9.0") == "v0.9.0"
+    assert index.update_rev(uri=fast, current="v0.9.0") == "v1.0.0"
+
+
+def test_status_timeout(config: Config) -> None:
+    """Test a repository timing out is listed with the error.
+
+    Args:
+        config: The configuration fixture
+    """
+    repo = Repo(config=config, origin="me/slow", upstream="https://example-slow/slow", name="slow")
+    status = repo_status(repo=repo, pr_ttl=0, with_prs=False)
+    assert status.upstream == ""
+    assert status.errors == [f"ls-remote failed: {COMMAND} timed out after 1s."]
@@ -0,0 +1,27 @@
+"""Test the utilities."""
+
+from __future__ import annotations
+
+from ftf.output import Output, TermFeatures
+from ftf.utils import subprocess_run
+
+
+def test_on_line_stdout_only() -> None:
+    """Test only the lines of stdout are passed to on_line, not those of stderr."""
+    output = Output(
+        log_file="",
+        log_level="notset",
+        log_append="true",
+        term_features=TermFeatures(color=False, links=False),
+        verbosity=0,
+    )
+    lines: list[str] = []
+    subprocess_run(
+        command="echo out; echo warning: err >&2; echo more",
+        verbose=0,
+        msg="Echoing",
+        output=output,
+        quiet=True,
+        on_line=lines.append,
+    )
+    assert lines == ["out\n", "more\n"]